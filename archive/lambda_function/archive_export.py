@@ -0,0 +1,602 @@
+"""Streams a day's archive straight into S3, without staging files in /tmp
+
+The CSV is gzipped on the fly into a multipart upload whose parts are sent from
+background threads while rows are still being read from the database. The
+rows arrive grouped by plant, so each plant's rows are collected as typed
+Arrow batches and uploaded as that plant's Parquet partition as soon as the
+next plant's rows begin.
+
+Per-plant hourly and daily rollups are uploaded alongside, so long-range
+trends read a few kilobytes per day instead of every reading.
+
+Every export also records the day's keys, row count, time range and per-plant
+reading statistics in `manifest.json`, so readers find a day without listing
+the bucket.
+
+In incremental mode, small Parquet segments of the newest rows are uploaded
+under `segments/` instead, and compacted into the same daily objects once
+their day is over.
+"""
+from os import environ as ENV
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import date
+from functools import partial
+from io import BytesIO, TextIOWrapper
+from itertools import batched
+from typing import Callable, Iterable
+import csv
+import gzip
+import json
+import logging
+
+ARCHIVE_BUCKET = "c15-cacareco-archive"
+WATERMARK_KEY = "state/watermark.json"
+MANIFEST_KEY = "manifest.json"
+# Rollup name: the period each row of it covers
+ROLLUPS = {"hourly": "hour", "daily": "day"}
+CSV_COLUMNS = ("plant_id",
+               "plant_name",
+               "botanist_name",
+               "city_name",
+               "time_zone",
+               "country_code",
+               "recording_taken",
+               "soil_moisture",
+               "temperature",
+               "last_watered")
+
+
+def get_export_settings() -> dict:
+    """read the archive export options from the environment"""
+    return {
+        "bucket": ENV.get("ARCHIVE_BUCKET", ARCHIVE_BUCKET),
+        "formats": {fmt.strip() for fmt in
+                    ENV.get("ARCHIVE_FORMATS", "csv,parquet,rollups").split(",")},
+        "chunk_rows": int(ENV.get("ARCHIVE_FETCH_SIZE", 5000)),
+        "part_size": int(ENV.get("ARCHIVE_PART_SIZE", 8 * 1024 * 1024)),
+        "upload_threads": int(ENV.get("ARCHIVE_UPLOAD_THREADS", 4))
+    }
+
+
+class S3MultipartWriter:
+    """write-only file object that uploads to S3 as a multipart upload
+
+    Full parts are uploaded from background threads. At most `threads` parts are
+    in flight, so memory stays around `part_size * (threads + 1)` however much
+    is written. S3 requires every part but the last to be at least 5 MiB.
+    """
+
+    def __init__(self, s3, bucket: str, key: str, part_size: int = 8 * 1024 * 1024,
+                 threads: int = 4):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.threads = threads
+        self.buffer = bytearray()
+        self.parts = []
+        self.closed = False
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        self.upload_id = s3.create_multipart_upload(Bucket=bucket, Key=key)["UploadId"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def writable(self) -> bool:
+        """file object protocol"""
+        return True
+
+    def flush(self):
+        """parts are only sent once full"""
+
+    def write(self, data: bytes) -> int:
+        """buffer the data, sending each full part"""
+        self.buffer += data
+        while len(self.buffer) >= self.part_size:
+            self.send_part(bytes(self.buffer[:self.part_size]))
+            del self.buffer[:self.part_size]
+        return len(data)
+
+    def send_part(self, body: bytes):
+        """upload a part in the background, first waiting if too many are in flight"""
+        in_flight = [part for part in self.parts if not part.done()]
+        if len(in_flight) >= self.threads:
+            in_flight[0].result()
+        self.parts.append(self.executor.submit(self.upload_part, len(self.parts) + 1, body))
+
+    def upload_part(self, number: int, body: bytes) -> dict:
+        """upload one part and return its completion entry"""
+        response = self.s3.upload_part(Bucket=self.bucket, Key=self.key,
+                                       UploadId=self.upload_id, PartNumber=number, Body=body)
+        return {"ETag": response["ETag"], "PartNumber": number}
+
+    def close(self):
+        """send the last part and complete the upload"""
+        if self.closed:
+            return
+        if self.buffer or not self.parts:
+            self.send_part(bytes(self.buffer))
+            self.buffer.clear()
+        try:
+            parts = [part.result() for part in self.parts]
+        except Exception:
+            self.abort()
+            raise
+        self.closed = True
+        self.executor.shutdown()
+        self.s3.complete_multipart_upload(Bucket=self.bucket, Key=self.key,
+                                          UploadId=self.upload_id,
+                                          MultipartUpload={"Parts": parts})
+        logging.info("Uploaded %s in %s parts", self.key, len(parts))
+
+    def abort(self):
+        """discard every uploaded part"""
+        if self.closed:
+            return
+        self.closed = True
+        self.executor.shutdown(cancel_futures=True)
+        self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key,
+                                       UploadId=self.upload_id)
+        logging.error("Aborted upload of %s", self.key)
+
+
+def arrow_schema():
+    """the typed schema of the archive's rows"""
+    import pyarrow as pa  # pylint: disable=import-outside-toplevel
+    return pa.schema([("plant_id", pa.int32()),
+                      ("plant_name", pa.string()),
+                      ("botanist_name", pa.string()),
+                      ("city_name", pa.string()),
+                      ("time_zone", pa.string()),
+                      ("country_code", pa.string()),
+                      ("recording_taken", pa.timestamp("ms")),
+                      ("soil_moisture", pa.float64()),
+                      ("temperature", pa.float64()),
+                      ("last_watered", pa.timestamp("ms"))])
+
+
+def rows_to_batch(rows: tuple[tuple], schema):
+    """convert a chunk of row tuples to a typed Arrow record batch"""
+    import pyarrow as pa  # pylint: disable=import-outside-toplevel
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, field.type) for column, field in zip(zip(*rows), schema)],
+        schema=schema)
+
+
+def csv_key(day: date) -> str:
+    """the S3 key of a day's gzipped CSV"""
+    return f"{day:%Y/%m/%d}_hist.csv.gz"
+
+
+def parquet_key(day: date, plant_id: int) -> str:
+    """the S3 key of one plant's Parquet partition for a day"""
+    return f"parquet/date={day:%Y-%m-%d}/plant_id={plant_id}/part-0.parquet"
+
+
+def plant_runs(table) -> Iterable[tuple]:
+    """split rows grouped by plant into (plant_id, rows) slices, in the order they came"""
+    import pyarrow.compute as pc  # pylint: disable=import-outside-toplevel
+
+    if table.num_rows == 0:
+        return
+    plant_ids = table["plant_id"]
+    changes = pc.indices_nonzero(pc.not_equal(plant_ids[1:], plant_ids[:-1]))
+    starts = [0] + [index + 1 for index in changes.to_pylist()]
+    for start, end in zip(starts, starts[1:] + [table.num_rows]):
+        yield plant_ids[start].as_py(), table.slice(start, end - start)
+
+
+class PlantPartitions:
+    """collects rows grouped by plant, handing each plant's rows to `on_plant` in turn
+
+    Only the current plant's rows are held, so memory stays around one plant's
+    day however many plants there are, and no file or writer is kept open per
+    plant. A plant whose rows come back after another plant's raises ValueError.
+    """
+
+    def __init__(self, on_plant: Callable):
+        self.on_plant = on_plant
+        self.plant_id = None
+        self.pending = []
+        self.done = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        return False
+
+    def write(self, batch):
+        """add a record batch of rows grouped by plant"""
+        import pyarrow as pa  # pylint: disable=import-outside-toplevel
+
+        for plant_id, rows in plant_runs(pa.Table.from_batches([batch])):
+            if plant_id != self.plant_id:
+                self.flush()
+                if plant_id in self.done:
+                    raise ValueError(f"Rows of plant {plant_id} are not grouped by plant_id")
+                self.plant_id = plant_id
+            self.pending.append(rows)
+
+    def flush(self):
+        """hand the current plant's rows on"""
+        import pyarrow as pa  # pylint: disable=import-outside-toplevel
+
+        if self.plant_id is None:
+            return
+        self.on_plant(self.plant_id, pa.concat_tables(self.pending))
+        self.done.add(self.plant_id)
+        self.plant_id, self.pending = None, []
+
+    def close(self):
+        """hand on the last plant's rows"""
+        self.flush()
+
+
+def with_plant_id(table, plant_id: int):
+    """a partition's rows with the plant_id column its key stands for"""
+    import pyarrow as pa  # pylint: disable=import-outside-toplevel
+    return table.add_column(0, pa.field("plant_id", pa.int32()),
+                            pa.array([plant_id] * table.num_rows, pa.int32()))
+
+
+def plant_rows(table, plant_id: int):
+    """one plant's rows without the plant_id column, as its partition holds them"""
+    import pyarrow.compute as pc  # pylint: disable=import-outside-toplevel
+    return table.filter(pc.equal(table["plant_id"], plant_id)).drop_columns(["plant_id"])
+
+
+def export_day(rows: Iterable[tuple], day: date, s3, settings: dict = None) -> list[str]:
+    """stream a day's rows to S3 in the configured formats, returning the uploaded keys
+
+    Rows are consumed once, `chunk_rows` at a time, and must be grouped by
+    plant_id as the archive queries return them. A failure aborts the CSV's
+    multipart upload and leaves the manifest untouched; partitions already
+    uploaded are overwritten by the retry. Each plant's partition, statistics
+    and rollups are made as soon as its rows are complete, with at most
+    `upload_threads` partitions uploading at once.
+    """
+    settings = settings or get_export_settings()
+    formats = settings["formats"]
+    keys, partition_keys, uploads = [], [], []
+    summaries, rollups = [], {name: [] for name in ROLLUPS}
+    schema = arrow_schema()
+
+    with ExitStack() as stack:
+        executor = stack.enter_context(ThreadPoolExecutor(settings["upload_threads"]))
+
+        def add_plant(plant_id: int, table):
+            summaries.append(summarise_day(table))
+            if "rollups" in formats:
+                for name, unit in ROLLUPS.items():
+                    rollups[name].append(rollup(table, unit))
+            if "parquet" in formats:
+                in_flight = [upload for upload in uploads if not upload.done()]
+                if len(in_flight) >= settings["upload_threads"]:
+                    in_flight[0].result()
+                partition_keys.append(parquet_key(day, plant_id))
+                uploads.append(executor.submit(write_table, s3, settings["bucket"],
+                                               partition_keys[-1],
+                                               table.drop_columns(["plant_id"])))
+
+        csv_writer = None
+        if "csv" in formats:
+            keys.append(csv_key(day))
+            upload = stack.enter_context(S3MultipartWriter(
+                s3, settings["bucket"], keys[-1], settings["part_size"],
+                settings["upload_threads"]))
+            text = stack.enter_context(TextIOWrapper(
+                gzip.GzipFile(fileobj=upload, mode="wb", compresslevel=6),
+                encoding="utf-8", newline=""))
+            csv_writer = csv.writer(text)
+            csv_writer.writerow(CSV_COLUMNS)
+        partitions = stack.enter_context(PlantPartitions(add_plant))
+        for chunk in batched(rows, settings["chunk_rows"]):
+            if csv_writer is not None:
+                csv_writer.writerows(chunk)
+            partitions.write(rows_to_batch(chunk, schema))
+        partitions.close()
+        for upload in uploads:
+            upload.result()
+    keys.extend(partition_keys)
+    if "parquet" in formats:
+        logging.info("%s Parquet partitions uploaded for %s", len(partition_keys), day)
+
+    entry = {"keys": keys, **merge_summaries(summaries)}
+    if "rollups" in formats:
+        entry["rollups"] = upload_rollups(s3, settings["bucket"], rollups, day)
+    update_manifest(s3, settings["bucket"], day, entry)
+    return keys
+
+
+def rollup(table, unit: str):
+    """per-plant reading statistics for each hour or day of the table, in a column of that name
+
+    Watering events count the distinct last_watered times that fall in the period.
+    """
+    # pylint: disable=import-outside-toplevel
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    period = pc.floor_temporal(table["recording_taken"], unit=unit)
+    watered = pc.if_else(pc.equal(pc.floor_temporal(table["last_watered"], unit=unit), period),
+                         table["last_watered"], pa.scalar(None, table["last_watered"].type))
+    readings = pa.table({"plant_id": table["plant_id"], "period": period,
+                         "soil_moisture": table["soil_moisture"],
+                         "temperature": table["temperature"], "watered": watered})
+    stats = readings.group_by(["plant_id", "period"]).aggregate(
+        [("period", "count")] +
+        [(column, agg) for column in ("soil_moisture", "temperature")
+         for agg in ("min", "max", "mean", "stddev")] +
+        [("watered", "count_distinct")])
+    stats = stats.rename_columns({"period": unit, "period_count": "readings",
+                                  "watered_count_distinct": "watering_events"})
+    if unit == "day":
+        stats = stats.set_column(stats.schema.get_field_index("day"), "day",
+                                 pc.cast(stats["day"], pa.date32()))
+    return stats.sort_by([("plant_id", "ascending"), (unit, "ascending")])
+
+
+def rollup_key(name: str, day: date) -> str:
+    """the S3 key of a day's hourly or daily rollup"""
+    return f"rollups/{name}/date={day:%Y-%m-%d}/part-0.parquet"
+
+
+def upload_rollups(s3, bucket: str, rollups: dict, day: date) -> dict:
+    """upload the day's hourly and daily rollups, returning their keys by name
+
+    `rollups` holds each rollup's per-plant tables, in plant_id order.
+    """
+    import pyarrow as pa  # pylint: disable=import-outside-toplevel
+
+    keys = {}
+    for name, unit in ROLLUPS.items():
+        keys[name] = rollup_key(name, day)
+        tables = rollups[name] or [rollup(arrow_schema().empty_table(), unit)]
+        write_table(s3, bucket, keys[name], pa.concat_tables(tables))
+    logging.info("Rollups uploaded for %s", day)
+    return keys
+
+
+def summarise_day(table) -> dict:
+    """the row count, time range and per-plant reading statistics of a day's rows"""
+    import pyarrow.compute as pc  # pylint: disable=import-outside-toplevel
+
+    span = pc.min_max(table["recording_taken"]).as_py()
+    stats = table.group_by("plant_id").aggregate(
+        [("recording_taken", "count")] +
+        [(column, agg) for column in ("soil_moisture", "temperature")
+         for agg in ("min", "max", "mean")])
+    plants = {}
+    for plant in sorted(stats.to_pylist(), key=lambda plant: plant["plant_id"]):
+        plant_id = plant.pop("plant_id")
+        plants[str(plant_id)] = {
+            "rows": plant.pop("recording_taken_count"),
+            **{name: None if value is None else round(value, 3)
+               for name, value in plant.items()}}
+    return {"rows": table.num_rows,
+            "first_reading": None if span["min"] is None else str(span["min"]),
+            "last_reading": None if span["max"] is None else str(span["max"]),
+            "plants": plants}
+
+
+def merge_summaries(summaries: list[dict]) -> dict:
+    """combine the summaries of each plant's rows into the day's"""
+    first = [summary["first_reading"] for summary in summaries if summary["first_reading"]]
+    last = [summary["last_reading"] for summary in summaries if summary["last_reading"]]
+    return {"rows": sum(summary["rows"] for summary in summaries),
+            "first_reading": min(first, default=None),
+            "last_reading": max(last, default=None),
+            "plants": {plant_id: plant for summary in summaries
+                       for plant_id, plant in summary["plants"].items()}}
+
+
+def read_json(s3, bucket: str, key: str, default: dict) -> dict:
+    """a JSON object from the bucket, or the default if it does not exist yet"""
+    from botocore.exceptions import ClientError  # pylint: disable=import-outside-toplevel
+    try:
+        body = s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "NoSuchKey":
+            raise
+        return default
+    return json.loads(body)
+
+
+def update_manifest(s3, bucket: str, day: date, entry: dict):
+    """record a day's archive objects and statistics in the manifest
+
+    Only one archive run writes at a time, so a read-modify-write is safe.
+    """
+    manifest = read_json(s3, bucket, MANIFEST_KEY, {"days": {}})
+    manifest["days"][f"{day:%Y-%m-%d}"] = entry
+    manifest["days"] = dict(sorted(manifest["days"].items()))
+    s3.put_object(Bucket=bucket, Key=MANIFEST_KEY, ContentType="application/json",
+                  Body=json.dumps(manifest, separators=(",", ":")).encode("utf-8"))
+    logging.info("Manifest updated for %s", day)
+
+
+def read_watermark(s3, bucket: str) -> int:
+    """the highest plant_status_id already uploaded in a segment, 0 before the first"""
+    return read_json(s3, bucket, WATERMARK_KEY, {"plant_status_id": 0})["plant_status_id"]
+
+
+def read_gaps(s3, bucket: str) -> list[list]:
+    """the [first, last, first seen] plant_status_id ranges below the watermark not yet in a segment"""
+    return read_json(s3, bucket, WATERMARK_KEY, {}).get("gaps", [])
+
+
+def write_watermark(s3, bucket: str, watermark: int, gaps: list[list] = ()):
+    """record that every row up to the watermark, except those in the gaps, is in a segment"""
+    s3.put_object(Bucket=bucket, Key=WATERMARK_KEY,
+                  Body=json.dumps({"plant_status_id": watermark,
+                                   "gaps": list(gaps)}).encode("utf-8"))
+    logging.info("Archive watermark moved to plant_status_id %s with %s gaps",
+                 watermark, len(gaps))
+
+
+def segment_key(day: date, after: int) -> str:
+    """the S3 key of a day's segment of the rows after a watermark
+
+    A retried run starts from the same watermark, so it overwrites rather than
+    duplicates the segments of a run that failed before moving the watermark.
+    """
+    return f"segments/date={day:%Y-%m-%d}/after-{after:012d}.parquet"
+
+
+def write_table(s3, bucket: str, key: str, table):
+    """upload an Arrow table as a zstd Parquet object"""
+    # pylint: disable=import-outside-toplevel
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink, compression="zstd")
+    s3.put_object(Bucket=bucket, Key=key, Body=sink.getvalue().to_pybytes())
+
+
+def read_table(s3, bucket: str, key: str):
+    """download a Parquet object as an Arrow table"""
+    import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+    return pq.read_table(BytesIO(s3.get_object(Bucket=bucket, Key=key)["Body"].read()))
+
+
+def write_segments(rows: Iterable[tuple], after: int, s3, settings: dict = None) -> list[str]:
+    """upload the rows after a watermark as one Parquet segment per day they were taken"""
+    # pylint: disable=import-outside-toplevel
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    settings = settings or get_export_settings()
+    schema = arrow_schema()
+    batches = [rows_to_batch(chunk, schema) for chunk in batched(rows, settings["chunk_rows"])]
+    table = pa.Table.from_batches(batches, schema)
+    days = pc.cast(table["recording_taken"], pa.date32())
+    keys = []
+    for day in sorted(pc.unique(days).to_pylist()):
+        keys.append(segment_key(day, after))
+        write_table(s3, settings["bucket"], keys[-1], table.filter(pc.equal(days, day)))
+    logging.info("%s rows uploaded in %s segments", table.num_rows, len(keys))
+    return keys
+
+
+def list_keys(s3, bucket: str, prefix: str) -> list[str]:
+    """every key under a prefix, across as many listing pages as it takes"""
+    pages = s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix)
+    return [obj["Key"] for page in pages for obj in page.get("Contents", [])]
+
+
+def segment_days(s3, bucket: str) -> list[date]:
+    """the days that have segments waiting to be compacted"""
+    keys = list_keys(s3, bucket, "segments/date=")
+    return sorted({date.fromisoformat(key.split("date=")[1][:10]) for key in keys})
+
+
+def drop_duplicates(table):
+    """keep one reading per plant and recording time, as plant_status does"""
+    # pylint: disable=import-outside-toplevel
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    table = table.sort_by([("plant_id", "ascending"), ("recording_taken", "ascending")])
+    if table.num_rows < 2:
+        return table
+    plant_ids, taken = table["plant_id"], table["recording_taken"]
+    repeated = pc.and_(pc.equal(plant_ids[1:], plant_ids[:-1]),
+                       pc.equal(taken[1:], taken[:-1]))
+    return table.filter(pa.concat_arrays([pa.array([True]),
+                                          pc.invert(repeated).combine_chunks()]))
+
+
+def table_rows(table) -> Iterable[tuple]:
+    """a table's rows as CSV-ordered tuples, one record batch at a time"""
+    for batch in table.to_batches():
+        yield from zip(*(batch.column(column).to_pylist() for column in CSV_COLUMNS))
+
+
+def compacted_rows(segments, partitions: dict[int, Callable]) -> Iterable[tuple]:
+    """each plant's archived and segment rows without duplicates, one plant at a time
+
+    `partitions` maps each archived plant to a function loading its rows.
+    """
+    # pylint: disable=import-outside-toplevel
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    schema = arrow_schema()
+    plant_ids = set(partitions) | set(pc.unique(segments["plant_id"]).to_pylist())
+    for plant_id in sorted(plant_ids):
+        tables = [segments.filter(pc.equal(segments["plant_id"], plant_id))]
+        if plant_id in partitions:
+            tables.append(with_plant_id(partitions[plant_id](), plant_id))
+        yield from table_rows(drop_duplicates(pa.concat_tables(
+            [table.select(schema.names).cast(schema) for table in tables])))
+
+
+def read_archived_csv(s3, bucket: str, day: date):
+    """a day's archived CSV as an Arrow table, None if the day has none
+
+    Days archived before Parquet was enabled only have a CSV, gzipped or, from
+    the first archive runs, plain.
+    """
+    # pylint: disable=import-outside-toplevel
+    from botocore.exceptions import ClientError
+    from pyarrow import csv as arrow_csv
+
+    for key in (csv_key(day), csv_key(day).removesuffix(".gz")):
+        try:
+            body = s3.get_object(Bucket=bucket, Key=key)["Body"]
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "NoSuchKey":
+                raise
+            continue
+        stream = gzip.GzipFile(fileobj=body) if key.endswith(".gz") else body
+        return arrow_csv.read_csv(
+            stream, convert_options=arrow_csv.ConvertOptions(column_types=arrow_schema()))
+    return None
+
+
+def compact_day(day: date, s3, settings: dict = None) -> list[str]:
+    """merge a day's segments into its daily archive objects, then delete the segments
+
+    Segments that arrive after the day was compacted, such as late readings, are
+    merged with its existing Parquet partitions or, without them, with its CSV.
+    Only the segments and one plant's archived rows are held in memory at a
+    time, except for a day archived only as CSV, which is read whole.
+    """
+    # pylint: disable=import-outside-toplevel
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    settings = settings or get_export_settings()
+    bucket = settings["bucket"]
+    schema = arrow_schema()
+    segments = list_keys(s3, bucket, f"segments/date={day:%Y-%m-%d}/")
+    segment_rows = pa.concat_tables(
+        [schema.empty_table()] +
+        [read_table(s3, bucket, key).select(schema.names).cast(schema) for key in segments])
+    partitions = {int(key.split("plant_id=")[1].split("/")[0]): partial(read_table, s3, bucket, key)
+                  for key in list_keys(s3, bucket, f"parquet/date={day:%Y-%m-%d}/")}
+
+    if not partitions:
+        archived = read_archived_csv(s3, bucket, day)
+        if archived is not None:
+            logging.info("No Parquet for %s; merging with its CSV", day)
+            partitions = {plant_id: partial(plant_rows, archived, plant_id)
+                          for plant_id in pc.unique(archived["plant_id"]).to_pylist()}
+    keys = export_day(compacted_rows(segment_rows, partitions), day, s3, settings)
+    for chunk in batched(segments, 1000):
+        s3.delete_objects(Bucket=bucket,
+                          Delete={"Objects": [{"Key": key} for key in chunk]})
+    logging.info("Compacted %s segments of %s", len(segments), day)
+    return keys
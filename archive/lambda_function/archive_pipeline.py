@@ -1,41 +1,27 @@
-"""Handler for extracting most recent data from an RDS and uploading it to a CSV in an S3 bucket"""
-from os import environ as ENV, path, makedirs
-import csv
-from datetime import datetime
+"""Handler for extracting most recent data from an RDS and streaming it to an S3 bucket"""
+from os import environ as ENV, path
+from datetime import datetime, date, time, timedelta
 import logging
+import sys
 
 from dotenv import load_dotenv
-import boto3
-from botocore.exceptions import ClientError
 import pymssql
 
-from logger_config import setup_logging
+from archive_export import (export_day, get_export_settings, read_watermark, read_gaps,
+                            write_watermark, write_segments, segment_days, compact_day)
 
+# logger_config is copied next to this file in the Lambda image; locally it
+# lives in the repository's shared directory.
+try:
+    from logger_config import setup_logging, flush_logging
+except ModuleNotFoundError:
+    sys.path.append(path.join(path.dirname(path.abspath(__file__)), "..", "..", "shared"))
+    from logger_config import setup_logging, flush_logging
 
-def query_db(query: str, params: list) -> tuple:
-    """Query a MS SQL Server Database"""
-    conn = pymssql.connect(ENV["DB_HOST"],
-                           ENV["DB_USER"],
-                           ENV["DB_PASSWORD"],
-                           ENV["DB_NAME"])
-    cursor = conn.cursor()
-
-    q = f"""
-        ALTER USER
-            {ENV["DB_USER"]}
-        WITH
-            DEFAULT_SCHEMA = {ENV["SCHEMA_NAME"]}
-        """
-    cursor.execute(q)
-
-    cursor.execute(query, params)
-    output = cursor.fetchall()
-    return output
+# SQL Server's earliest DATETIME, the open lower bound of a purge.
+DATETIME_MIN = datetime(1753, 1, 1)
 
-
-def get_daily_data():
-    """get today's data from the RDS"""
-    q = """
+ARCHIVE_COLUMNS = """
         SELECT 
             p.plant_id, 
             p.plant_name, 
@@ -46,7 +32,9 @@ def get_daily_data():
             ps.recording_taken, 
             ps.soil_moisture, 
             ps.temperature, 
-            ps.last_watered
+            ps.last_watered"""
+
+ARCHIVE_FROM = """
         FROM 
             plant_status AS ps
         JOIN plant AS p 
@@ -59,73 +47,367 @@ def get_daily_data():
             ON (c.city_id = ol.city_id)
         JOIN country AS co 
             ON (co.country_id = c.country_id)
-        WHERE 
-            DATENAME(year, ps.recording_taken) = DATENAME(year, CURRENT_TIMESTAMP)
-            AND 
-            DATENAME(month, ps.recording_taken) = DATENAME(month, CURRENT_TIMESTAMP)
-            AND
-            DATENAME(day, ps.recording_taken) = DATENAME(day, CURRENT_TIMESTAMP);
         """
 
-    data_today = query_db(q, [])
-    logging.info("Data successfully fetched from Database")
-    return data_today
-
-
-def tuples_to_csv(tuple_data: list[tuple]) -> str:
-    """write a list of tuples to a csv file and returns the target S3 filepath"""
-    directories = "/tmp/" + datetime.now().strftime("%Y/%m")
-    s3_filepath = f"{datetime.now().strftime("%Y/%m/%d")}_hist.csv"
-    local_filepath = f"/tmp/{s3_filepath}"
-    if not path.exists(directories):
-        makedirs(directories)
-        logging.info("path '%s' created", directories)
-    with open(local_filepath, "w", encoding='utf-8') as file:
-        csv_writer = csv.writer(file)
-        csv_writer.writerow(("plant_id",
-                             "plant_name",
-                             "botanist_name",
-                             "city_name",
-                             "time_zone",
-                             "country_code",
-                             "recording_taken",
-                             "soil_moisture",
-                             "temperature",
-                             "last_watered"))
-        csv_writer.writerows(tuple_data)
-        logging.info("Rows successfully written to CSV")
-    return s3_filepath
-
-
-def write_to_s3(filepath: str, s3) -> bool:
-    """write a csv file to an S3 bucket"""
-    local_path = "/tmp/" + filepath
+_STATE = {"conn": None}
+
+
+def get_connection():
+    """Connect to the MS SQL Server Database using the configured schema"""
+    conn = pymssql.connect(ENV["DB_HOST"],
+                           ENV["DB_USER"],
+                           ENV["DB_PASSWORD"],
+                           ENV["DB_NAME"])
+    cursor = conn.cursor()
+
+    q = f"""
+        ALTER USER
+            {ENV["DB_USER"]}
+        WITH
+            DEFAULT_SCHEMA = {ENV["SCHEMA_NAME"]}
+        """
+    cursor.execute(q)
+    conn.commit()
+    return conn
+
+
+def is_healthy(conn) -> bool:
+    """Checks a warm connection with the cheapest possible round trip"""
     try:
-        s3.upload_file(local_path,
-                       "c15-cacareco-archive", filepath)
-    except ClientError as e:
-        logging.error(e)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+    except (pymssql.Error, OSError):
         return False
     return True
 
 
-def truncate_plant_status():
-    """Truncate the plant_status table"""
-    q = "TRUNCATE TABLE plant_status"
-    query_db(q, [])
-    logging.info("plant_status table truncated successfully")
+def get_db_connection():
+    """The connection kept warm across invocations, reconnecting if it has dropped
+
+    The schema is only set once per connection rather than once per query.
+    """
+    conn = _STATE["conn"]
+    if conn is not None and is_healthy(conn):
+        return conn
+    reset_db_connection()
+    _STATE["conn"] = get_connection()
+    return _STATE["conn"]
+
+
+def reset_db_connection():
+    """Discards the warm connection, e.g. after a failed invocation"""
+    conn, _STATE["conn"] = _STATE["conn"], None
+    if conn is None:
+        return
+    try:
+        conn.rollback()
+        conn.close()
+    except (pymssql.Error, OSError):
+        pass
+
+
+def query_db(query: str, params: list) -> tuple:
+    """Query a MS SQL Server Database"""
+    with get_db_connection().cursor() as cursor:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+
+def get_fetch_size() -> int:
+    """rows fetched from the database per round trip while streaming"""
+    return int(ENV.get("ARCHIVE_FETCH_SIZE", 5000))
+
+
+def stream_query(query: str, params: list, fetch_size: int = None):
+    """Query a MS SQL Server Database, yielding rows `fetch_size` at a time
+
+    Only one chunk is held in memory, however many rows the query returns.
+    """
+    fetch_size = fetch_size or get_fetch_size()
+    streamed = 0
+    with get_db_connection().cursor() as cursor:
+        cursor.execute(query, params)
+        while rows := cursor.fetchmany(fetch_size):
+            streamed += len(rows)
+            yield from rows
+    logging.info("Streamed %s rows from Database", streamed)
+
+
+def get_archive_mode(event) -> str:
+    """'daily' exports a whole day at once, 'incremental' only the rows since the last run"""
+    return (event or {}).get("mode") or ENV.get("ARCHIVE_MODE", "daily")
+
+
+def get_archive_day(event) -> date:
+    """The day to archive: the event's or ARCHIVE_DATE's 'YYYY-MM-DD' date, else today"""
+    requested = (event or {}).get("date") or ENV.get("ARCHIVE_DATE")
+    if requested:
+        return date.fromisoformat(requested)
+    return datetime.now().date()
+
+
+def day_range(day: date) -> tuple[datetime, datetime]:
+    """the half-open [start, end) datetime range covering a day"""
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+def get_watermark(day: date) -> int:
+    """the highest plant_status_id recorded for a day when the archive starts, 0 if none
+
+    Readings inserted after this are left out of the export and the purge.
+    """
+    start, end = day_range(day)
+    watermark = query_db("""
+        SELECT MAX(plant_status_id)
+        FROM plant_status
+        WHERE recording_taken >= %s AND recording_taken < %s;
+        """, [start, end])[0][0] or 0
+    logging.info("Archiving %s up to plant_status_id %s", day, watermark)
+    return watermark
+
+
+def get_daily_data(day: date = None, fetch_size: int = None, watermark: int = None):
+    """stream a day's data from the RDS up to the watermark, today's by default
+
+    The range filter on the bare column lets SQL Server seek
+    ix_plant_status_recording_taken instead of scanning plant_status. Rows come
+    grouped by plant, as export_day needs them.
+    """
+    q = ARCHIVE_COLUMNS + ARCHIVE_FROM + """
+        WHERE 
+            ps.recording_taken >= %s
+            AND
+            ps.recording_taken < %s
+            AND
+            ps.plant_status_id <= %s
+        ORDER BY
+            ps.plant_id,
+            ps.recording_taken;
+        """
+
+    day = day or datetime.now().date()
+    if watermark is None:
+        watermark = get_watermark(day)
+    start, end = day_range(day)
+    logging.info("Streaming data for %s from Database", day)
+    return stream_query(q, [start, end, watermark], fetch_size)
+
+
+def get_leftover_watermark(before: datetime) -> int:
+    """the highest plant_status_id of the readings taken before `before` still in plant_status
+
+    These are readings an earlier daily run left behind because they were
+    inserted after its watermark. 0 if there are none.
+    """
+    watermark = query_db("""
+        SELECT MAX(plant_status_id)
+        FROM plant_status
+        WHERE recording_taken < %s;
+        """, [before])[0][0] or 0
+    if watermark:
+        logging.info("Readings before %s left in plant_status up to plant_status_id %s",
+                     before, watermark)
+    return watermark
+
+
+def get_leftover_data(before: datetime, watermark: int, fetch_size: int = None):
+    """stream the readings taken before `before` up to the watermark"""
+    q = ARCHIVE_COLUMNS + ARCHIVE_FROM + """
+        WHERE 
+            ps.recording_taken < %s
+            AND
+            ps.plant_status_id <= %s;
+        """
+    return stream_query(q, [before, watermark], fetch_size)
+
+
+def get_high_water_mark() -> int:
+    """the newest plant_status_id, 0 for an empty table"""
+    return query_db("SELECT MAX(plant_status_id) FROM plant_status;", [])[0][0] or 0
+
+
+def get_new_data(ranges: list[list[int]], fetch_size: int = None):
+    """stream the rows whose plant_status_id is in any [first, last] range, in id order
+
+    Each row ends with its plant_status_id. The ranges seek the primary key.
+    """
+    q = ARCHIVE_COLUMNS + """,
+            ps.plant_status_id""" + ARCHIVE_FROM + """
+        WHERE 
+            """ + "\n            OR\n            ".join(
+                ["ps.plant_status_id BETWEEN %s AND %s"] * len(ranges)) + """
+        ORDER BY
+            ps.plant_status_id;
+        """
+    logging.info("Streaming plant_status_id ranges %s from Database", ranges)
+    return stream_query(q, [bound for id_range in ranges for bound in id_range], fetch_size)
+
+
+def get_gap_hours() -> float:
+    """how long a missing plant_status_id is waited for before it is taken as rolled back"""
+    return float(ENV.get("ARCHIVE_GAP_HOURS", 1))
+
+
+def strip_ids(rows, exported: list[list[int]]):
+    """yield rows without their trailing plant_status_id, recording the ids as [first, last] runs
+
+    Rows must arrive in plant_status_id order.
+    """
+    for *row, plant_status_id in rows:
+        if exported and exported[-1][1] == plant_status_id - 1:
+            exported[-1][1] = plant_status_id
+        else:
+            exported.append([plant_status_id, plant_status_id])
+        yield tuple(row)
+
+
+def subtract_ranges(ranges: list[list], removed: list[list[int]]) -> list[list]:
+    """the parts of each sorted [first, last, *extra] range not in the sorted `removed` ranges"""
+    left = []
+    for first, last, *extra in ranges:
+        for removed_first, removed_last in removed:
+            if removed_last < first or removed_first > last:
+                continue
+            if removed_first > first:
+                left.append([first, removed_first - 1, *extra])
+            first = removed_last + 1
+        if first <= last:
+            left.append([first, last, *extra])
+    return left
+
+
+def get_purge_batch_size() -> int:
+    """rows deleted per purge transaction, kept under SQL Server's 5000-lock escalation"""
+    return int(ENV.get("ARCHIVE_PURGE_BATCH", 2000))
+
+
+def purge_archived(start: datetime, end: datetime, watermark: int,
+                   batch_size: int = None, gaps: list[list[int]] = ()) -> int:
+    """delete archived readings taken in [start, end) from plant_status, a batch at a time
+
+    Only rows up to the watermark and outside the [first, last] id gaps are
+    deleted, the exact set that was exported. Each batch is its own short
+    transaction holding row locks, so the minutely pipeline keeps inserting
+    while the purge runs.
+    """
+    batch_size = batch_size or get_purge_batch_size()
+    q = """
+        DELETE TOP (%s)
+        FROM plant_status
+        WHERE
+            recording_taken >= %s
+            AND
+            recording_taken < %s
+            AND
+            plant_status_id <= %s""" + "".join("""
+            AND
+            plant_status_id NOT BETWEEN %s AND %s""" for _ in gaps) + ";\n        "
+    params = [batch_size, start, end, watermark] + [bound for gap in gaps for bound in gap]
+    conn = get_db_connection()
+    purged = 0
+    with conn.cursor() as cursor:
+        while True:
+            cursor.execute(q, params)
+            deleted = cursor.rowcount
+            conn.commit()
+            purged += deleted
+            if deleted < batch_size:
+                break
+    logging.info("%s archived rows purged from plant_status", purged)
+    return purged
+
+
+def archive_leftovers(before: datetime, s3, settings: dict):
+    """merge readings of earlier days still in plant_status into their archives, then purge them
+
+    The leftovers go through the same segments and compaction as incremental
+    mode, so each day's archive is extended rather than replaced. A day with
+    no archive yet, such as one whose run failed, is archived from them whole.
+    """
+    watermark = get_leftover_watermark(before)
+    if not watermark:
+        return
+    # Named after 0, so a retried run overwrites the segments of a failed one.
+    write_segments(get_leftover_data(before, watermark, settings["chunk_rows"]), 0, s3, settings)
+    for day in segment_days(s3, settings["bucket"]):
+        if day < before.date():
+            compact_day(day, s3, settings)
+    purge_archived(DATETIME_MIN, before, watermark)
+
+
+def archive_day(day: date, s3, settings: dict):
+    """export a whole day, purging it from plant_status if it is today
+
+    Readings inserted after the watermark are left in plant_status. The next
+    day's run merges them, and any other readings of earlier days still in the
+    table, into their days' archives before purging them.
+    """
+    # Upload errors propagate, so a failed archive never reaches the purge.
+    watermark = get_watermark(day)
+    keys = export_day(get_daily_data(day, settings["chunk_rows"], watermark), day, s3, settings)
+    logging.info("Archived %s to %s objects", day, len(keys))
+    if day == datetime.now().date():
+        archive_leftovers(day_range(day)[0], s3, settings)
+        purge_archived(*day_range(day), watermark)
+    else:
+        logging.info("Backfilled %s; plant_status left untouched", day)
+
+
+def archive_increment(s3, settings: dict, today: date = None):
+    """upload the rows since the stored watermark as segments and compact finished days
+
+    The watermark is the highest committed plant_status_id, but a transaction
+    holding a lower id can still commit after it is read. Ids below it that
+    were not exported are kept as gaps: they are read again on later runs and
+    never purged, until their rows arrive or, after ARCHIVE_GAP_HOURS, they
+    are taken as rolled back.
+
+    The watermark only moves once the segments are uploaded. Rows of earlier
+    days are purged once they are in a segment; today's stay for the live
+    dashboard and alerts.
+    """
+    now = datetime.now()
+    today = today or now.date()
+    bucket = settings["bucket"]
+    previous = read_watermark(s3, bucket)
+    gaps = [gap for gap in read_gaps(s3, bucket)
+            if now - datetime.fromisoformat(gap[2]) < timedelta(hours=get_gap_hours())]
+    watermark = get_high_water_mark()
+    if watermark > previous:
+        ranges = [gap[:2] for gap in gaps] + [[previous + 1, watermark]]
+        exported = []
+        write_segments(strip_ids(get_new_data(ranges, settings["chunk_rows"]), exported),
+                       previous, s3, settings)
+        gaps = subtract_ranges(gaps + [[previous + 1, watermark, now.isoformat()]], exported)
+        write_watermark(s3, bucket, watermark, gaps)
+    for day in segment_days(s3, bucket):
+        if day < today:
+            compact_day(day, s3, settings)
+    purge_archived(DATETIME_MIN, day_range(today)[0], max(watermark, previous),
+                   gaps=[gap[:2] for gap in gaps])
 
 
 def handler(event, context):
     """lambda handler"""
     setup_logging("console")
     load_dotenv()
+    # boto3 is the slowest import in this Lambda, so it is only loaded once the handler runs.
+    import boto3  # pylint: disable=import-outside-toplevel
     s3 = boto3.client("s3", aws_access_key_id=ENV["AWS_ACCESS_ID"],
                       aws_secret_access_key=ENV["AWS_ACCESS_SECRET"])
-    data = get_daily_data()
-    filepath = tuples_to_csv(data)
-    write_to_s3(filepath, s3)
-    truncate_plant_status()
+    settings = get_export_settings()
+    try:
+        if get_archive_mode(event) == "incremental":
+            archive_increment(s3, settings)
+        else:
+            archive_day(get_archive_day(event), s3, settings)
+    except Exception:
+        reset_db_connection()
+        raise
+    finally:
+        flush_logging()
 
 
 if __name__ == "__main__":
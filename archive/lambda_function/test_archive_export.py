@@ -0,0 +1,227 @@
+"""Tests archive_export.py against moto's in-memory S3"""
+from datetime import datetime, date
+from io import BytesIO
+import csv
+import gzip
+
+import boto3
+import pytest
+import pyarrow as pa
+from pyarrow import parquet as pq
+from moto import mock_aws
+
+from archive_export import (export_day, S3MultipartWriter, CSV_COLUMNS, read_watermark,
+                            read_gaps, write_watermark, write_segments, segment_days, compact_day,
+                            list_keys, read_json, MANIFEST_KEY, read_table)
+
+BUCKET = "test-archive"
+DAY = date(2025, 2, 7)
+
+
+def make_rows(count: int) -> list[tuple]:
+    """a day of readings for two plants, in the order the archive query returns them"""
+    rows = [(i % 2 + 1, f"plant_{i % 2 + 1}", "Gertrude", "Split", "Europe/Zagreb", "HR",
+             datetime(2025, 2, 7, i // 60 % 24, i % 60), None if i == 1 else i / 4,
+             12.5, datetime(2025, 2, 6, 9)) for i in range(count)]
+    return sorted(rows, key=lambda row: (row[0], row[6]))
+
+
+def settings(**overrides) -> dict:
+    """export settings for the test bucket"""
+    return {"bucket": BUCKET, "formats": {"csv", "parquet"}, "chunk_rows": 100,
+            "part_size": 8 * 1024 * 1024, "upload_threads": 2, **overrides}
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    """a boto3 client for moto's S3 with an empty archive bucket"""
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "eu-west-2")
+    with mock_aws():
+        client = boto3.client("s3", region_name="eu-west-2")
+        client.create_bucket(Bucket=BUCKET,
+                             CreateBucketConfiguration={"LocationConstraint": "eu-west-2"})
+        yield client
+
+
+def read_csv(s3, key: str) -> list[list[str]]:
+    """download and gunzip an archived csv"""
+    body = s3.get_object(Bucket=BUCKET, Key=key)["Body"].read()
+    return list(csv.reader(gzip.decompress(body).decode("utf-8").splitlines()))
+
+
+def read_csv_rows(rows: list[tuple]) -> list[list[str]]:
+    """rows as the csv writer formats them"""
+    return [["" if value is None else str(value) for value in row] for row in rows]
+
+
+def test_export_day_streams_gzipped_csv_in_parts(s3, monkeypatch):
+    """the csv is uploaded in several parts and gunzips to every row"""
+    monkeypatch.setattr("moto.s3.models.S3_UPLOAD_PART_MIN_SIZE", 1024)
+    rows = make_rows(3000)
+    keys = export_day(iter(rows), DAY, s3, settings(formats={"csv"}, part_size=4096))
+    assert keys == ["2025/02/07_hist.csv.gz"]
+
+    head = s3.head_object(Bucket=BUCKET, Key=keys[0], PartNumber=1)
+    assert head["PartsCount"] > 1
+    lines = read_csv(s3, keys[0])
+    assert tuple(lines[0]) == CSV_COLUMNS
+    assert len(lines) == len(rows) + 1
+    assert lines[len(rows) // 2 + 1] == ["2", "plant_2", "Gertrude", "Split", "Europe/Zagreb", "HR",
+                        "2025-02-07 00:01:00", "", "12.5", "2025-02-06 09:00:00"]
+
+
+def test_export_day_uploads_a_typed_parquet_partition_per_plant(s3):
+    """each plant's rows land in their own zstd Parquet object under date and plant_id"""
+    keys = export_day(make_rows(10), DAY, s3, settings(formats={"parquet"}))
+    assert keys == ["parquet/date=2025-02-07/plant_id=1/part-0.parquet",
+                    "parquet/date=2025-02-07/plant_id=2/part-0.parquet"]
+
+    body = s3.get_object(Bucket=BUCKET, Key=keys[1])["Body"].read()
+    parquet = pq.ParquetFile(BytesIO(body))
+    assert parquet.metadata.row_group(0).column(0).compression == "ZSTD"
+    table = parquet.read()
+    assert "plant_id" not in table.column_names
+    assert table.num_rows == 5
+    assert table.schema.field("recording_taken").type == pa.timestamp("ms")
+    assert table.column("soil_moisture").to_pylist()[0] is None
+    assert table.column("last_watered").to_pylist()[0] == datetime(2025, 2, 6, 9)
+
+
+def test_export_day_writes_each_plant_across_chunks_as_one_partition(s3):
+    """a plant's rows spanning several chunks end up in one partition of one row group"""
+    keys = export_day(make_rows(1000), DAY, s3, settings(formats={"parquet"}, chunk_rows=100))
+    body = s3.get_object(Bucket=BUCKET, Key=keys[0])["Body"].read()
+    metadata = pq.ParquetFile(BytesIO(body)).metadata
+    assert metadata.num_rows == 500
+    assert metadata.num_row_groups == 1
+    assert read_json(s3, BUCKET, MANIFEST_KEY, {})["days"]["2025-02-07"]["rows"] == 1000
+
+
+def test_export_day_rejects_rows_not_grouped_by_plant(s3):
+    """a plant coming back after another one fails rather than overwriting its partition"""
+    rows = make_rows(10)
+    with pytest.raises(ValueError):
+        export_day(rows[5:] + rows[:5] + rows[5:6], DAY, s3, settings())
+    assert read_json(s3, BUCKET, MANIFEST_KEY, {}) == {}
+    assert "Uploads" not in s3.list_multipart_uploads(Bucket=BUCKET)
+
+
+def test_export_day_aborts_the_upload_when_rows_fail(s3):
+    """a failure while reading leaves neither an object nor an open upload behind"""
+    def failing_rows():
+        yield from make_rows(5)
+        raise ConnectionError("database went away")
+
+    with pytest.raises(ConnectionError):
+        export_day(failing_rows(), DAY, s3, settings())
+    assert read_json(s3, BUCKET, MANIFEST_KEY, {}) == {}
+    assert "Contents" not in s3.list_objects_v2(Bucket=BUCKET)
+    assert "Uploads" not in s3.list_multipart_uploads(Bucket=BUCKET)
+
+
+def test_multipart_writer_uploads_an_empty_object(s3):
+    """closing without writes still completes the upload"""
+    with S3MultipartWriter(s3, BUCKET, "empty", part_size=1024):
+        pass
+    assert s3.get_object(Bucket=BUCKET, Key="empty")["Body"].read() == b""
+
+
+def test_watermark_round_trip(s3):
+    """the watermark starts at 0 and reads back what was written"""
+    assert read_watermark(s3, BUCKET) == 0
+    write_watermark(s3, BUCKET, 150)
+    assert read_watermark(s3, BUCKET) == 150
+    assert read_gaps(s3, BUCKET) == []
+    write_watermark(s3, BUCKET, 200, [[120, 121, "2025-02-07T10:00:00"]])
+    assert read_gaps(s3, BUCKET) == [[120, 121, "2025-02-07T10:00:00"]]
+
+
+def test_write_segments_splits_rows_by_day(s3):
+    """a run spanning midnight writes one segment per day, named after the watermark"""
+    rows = make_rows(4)
+    rows[3] = (1, *rows[3][1:6], datetime(2025, 2, 8, 0, 1), *rows[3][7:])
+    keys = write_segments(rows, 100, s3, settings())
+    assert keys == ["segments/date=2025-02-07/after-000000000100.parquet",
+                    "segments/date=2025-02-08/after-000000000100.parquet"]
+    assert segment_days(s3, BUCKET) == [date(2025, 2, 7), date(2025, 2, 8)]
+
+
+def test_compact_day_merges_segments_and_late_readings(s3):
+    """segments become the daily objects, and late segments merge without duplicates"""
+    rows = make_rows(10)
+    write_segments(rows[:6], 0, s3, settings())
+    write_segments(rows[6:], 6, s3, settings())
+    compact_day(DAY, s3, settings())
+    assert list_keys(s3, BUCKET, "segments/") == []
+    assert len(read_csv(s3, "2025/02/07_hist.csv.gz")) == 11
+
+    # A retried run re-sends a reading alongside a late one.
+    late = (2, *rows[0][1:6], datetime(2025, 2, 7, 23, 59), *rows[0][7:])
+    write_segments([rows[9], late], 9, s3, settings())
+    compact_day(DAY, s3, settings())
+    lines = read_csv(s3, "2025/02/07_hist.csv.gz")
+    assert len(lines) == 12
+    assert lines[-1][6] == "2025-02-07 23:59:00"
+    assert list_keys(s3, BUCKET, "parquet/") == [
+        "parquet/date=2025-02-07/plant_id=1/part-0.parquet",
+        "parquet/date=2025-02-07/plant_id=2/part-0.parquet"]
+
+
+def test_compact_day_keeps_archived_rows_without_parquet(s3):
+    """with only a CSV archived, late segments are merged with its rows rather than replacing them"""
+    rows = make_rows(10)
+    csv_only = settings(formats={"csv"})
+    write_segments(rows[:6], 0, s3, csv_only)
+    compact_day(DAY, s3, csv_only)
+    write_segments(rows[6:], 6, s3, csv_only)
+    compact_day(DAY, s3, csv_only)
+
+    lines = read_csv(s3, "2025/02/07_hist.csv.gz")
+    assert len(lines) == 11
+    assert sorted(lines[1:]) == sorted(read_csv_rows(rows))
+    assert list_keys(s3, BUCKET, "parquet/") == []
+
+
+def test_export_day_records_the_day_in_the_manifest(s3):
+    """the manifest holds the day's keys, time range and per-plant statistics"""
+    keys = export_day(make_rows(10), DAY, s3, settings(formats={"csv", "parquet"}))
+    export_day(make_rows(2), date(2025, 2, 6), s3, settings(formats={"csv"}))
+    manifest = read_json(s3, BUCKET, MANIFEST_KEY, {})
+    assert list(manifest["days"]) == ["2025-02-06", "2025-02-07"]
+    entry = manifest["days"]["2025-02-07"]
+    assert entry["keys"] == keys
+    assert entry["rows"] == 10
+    assert entry["first_reading"] == "2025-02-07 00:00:00"
+    assert entry["last_reading"] == "2025-02-07 00:09:00"
+    assert entry["plants"]["2"] == {"rows": 5, "soil_moisture_min": 0.75,
+                                    "soil_moisture_max": 2.25, "soil_moisture_mean": 1.5,
+                                    "temperature_min": 12.5, "temperature_max": 12.5,
+                                    "temperature_mean": 12.5}
+
+
+def test_export_day_uploads_hourly_and_daily_rollups(s3):
+    """each plant's readings are summarised per hour and per day"""
+    rows = make_rows(120)
+    rows[0] = (*rows[0][:9], datetime(2025, 2, 7, 0, 0))
+    rows[2] = (*rows[2][:9], datetime(2025, 2, 7, 0, 1))
+    export_day(rows, DAY, s3, settings(formats={"rollups"}))
+    entry = read_json(s3, BUCKET, MANIFEST_KEY, {})["days"]["2025-02-07"]
+    assert entry["rollups"] == {"hourly": "rollups/hourly/date=2025-02-07/part-0.parquet",
+                                "daily": "rollups/daily/date=2025-02-07/part-0.parquet"}
+
+    hourly = read_table(s3, BUCKET, entry["rollups"]["hourly"]).to_pylist()
+    assert len(hourly) == 4
+    first = hourly[0]
+    assert (first["plant_id"], first["hour"], first["readings"]) == (1, datetime(2025, 2, 7), 30)
+    assert first["soil_moisture_min"] == 0
+    assert first["soil_moisture_max"] == 14.5
+    assert first["temperature_stddev"] == 0
+    assert first["watering_events"] == 2
+
+    daily = read_table(s3, BUCKET, entry["rollups"]["daily"]).to_pylist()
+    assert [(row["plant_id"], row["day"], row["readings"]) for row in daily] == [
+        (1, DAY, 60), (2, DAY, 60)]
+    moisture = [i / 4 for i in range(3, 120, 2)]
+    assert daily[1]["soil_moisture_mean"] == pytest.approx(sum(moisture) / len(moisture))
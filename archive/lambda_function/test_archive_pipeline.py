@@ -1,39 +1,263 @@
-"""Tests to_csv.py"""
+"""Tests archive_pipeline.py"""
 from unittest.mock import patch
-from datetime import datetime
+from datetime import datetime, date
 
 import pytest
 
-from archive_pipeline import tuples_to_csv
-
-
-@pytest.fixture
-def sample_tuple_data():
-    """returns example tuple data fetched from an RDS"""
-    return [("plant_name_1",
-             "botanist_name_1",
-             "region_name_1",
-             "city_name_1",
-             "country_name_1",
-             "recording_taken_1",
-             "soil_moisture_1",
-             "temperature_1",
-             "last_watered_1"),
-            ("plant_name_2",
-             "botanist_name_2",
-             "region_name_2",
-             "city_name_2",
-             "country_name_2",
-             "recording_taken_2",
-             "soil_moisture_2",
-             "temperature_2",
-             "last_watered_2")]
-
-
-@patch("builtins.open")
-def test_tuples_to_csv(mock_open, sample_tuple_data):
-    """tests correct function input and output"""
-    filepath = f"{datetime.now().strftime("%Y/%m/%d")}_hist.csv"
-    assert tuples_to_csv(sample_tuple_data) == filepath
-    mock_open.assert_called_once_with(
-        '/tmp/2025/02/07_hist.csv', 'w', encoding='utf-8')
+from archive_pipeline import (get_archive_day, day_range, get_daily_data, get_watermark,
+                              purge_archived, handler, get_db_connection, archive_increment,
+                              get_archive_mode, get_new_data, strip_ids, subtract_ranges,
+                              archive_leftovers, DATETIME_MIN, _STATE)
+
+
+def test_get_archive_day(monkeypatch):
+    """the event's date wins over ARCHIVE_DATE, which wins over today"""
+    monkeypatch.delenv("ARCHIVE_DATE", raising=False)
+    assert get_archive_day(None) == datetime.now().date()
+    monkeypatch.setenv("ARCHIVE_DATE", "2025-02-06")
+    assert get_archive_day({}) == date(2025, 2, 6)
+    assert get_archive_day({"date": "2025-01-31"}) == date(2025, 1, 31)
+
+
+def test_day_range_is_half_open():
+    """the range starts at midnight and stops before the next one"""
+    assert day_range(date(2025, 2, 28)) == (datetime(2025, 2, 28), datetime(2025, 3, 1))
+
+
+@patch("archive_pipeline.stream_query", return_value=iter([]))
+def test_get_daily_data_filters_on_range(mock_stream_query):
+    """the day is passed as range parameters rather than computed per row"""
+    get_daily_data(date(2025, 2, 7), watermark=42)
+    query, params, _ = mock_stream_query.call_args[0]
+    assert "DATENAME" not in query
+    assert "ps.recording_taken >= %s" in query
+    assert params == [datetime(2025, 2, 7), datetime(2025, 2, 8), 42]
+
+
+@patch("archive_pipeline.get_db_connection")
+def test_stream_query_fetches_in_chunks(mock_get_db_connection):
+    """rows are fetched `fetch_size` at a time over the warm connection, left open"""
+    cursor = mock_get_db_connection.return_value.cursor.return_value.__enter__.return_value
+    cursor.fetchmany.side_effect = [[(1,), (2,)], [(3,)], []]
+    rows = get_daily_data(date(2025, 2, 7), fetch_size=2, watermark=42)
+    mock_get_db_connection.assert_not_called()
+    assert list(rows) == [(1,), (2,), (3,)]
+    cursor.fetchmany.assert_called_with(2)
+    cursor.fetchall.assert_not_called()
+    mock_get_db_connection.return_value.close.assert_not_called()
+
+
+@patch("archive_pipeline.get_connection")
+def test_get_db_connection_reuses_a_healthy_connection(mock_get_connection, monkeypatch):
+    """the schema is set once per connection, and a dropped connection is replaced"""
+    monkeypatch.setitem(_STATE, "conn", None)
+    first = get_db_connection()
+    assert get_db_connection() is first
+    assert mock_get_connection.call_count == 1
+
+    first.cursor.return_value.__enter__.return_value.execute.side_effect = OSError
+    get_db_connection()
+    assert mock_get_connection.call_count == 2
+    first.close.assert_called_once()
+
+
+@patch("archive_pipeline.purge_archived")
+@patch("archive_pipeline.get_watermark", return_value=42)
+@patch("archive_pipeline.get_daily_data")
+@patch("archive_pipeline.export_day", side_effect=RuntimeError("upload failed"))
+@patch("boto3.client")
+def test_handler_keeps_plant_status_when_the_export_fails(mock_client, mock_export_day,
+                                                          mock_get_daily_data, mock_watermark,
+                                                          mock_purge, monkeypatch):
+    """a failed upload is raised before today's readings are purged"""
+    monkeypatch.setenv("AWS_ACCESS_ID", "testing")
+    monkeypatch.setenv("AWS_ACCESS_SECRET", "testing")
+    with pytest.raises(RuntimeError):
+        handler({}, None)
+    mock_purge.assert_not_called()
+
+
+@patch("archive_pipeline.query_db", return_value=[(None,)])
+def test_get_watermark_of_an_empty_day(mock_query_db):
+    """a day without readings has nothing to export or purge"""
+    assert get_watermark(date(2025, 2, 7)) == 0
+    assert mock_query_db.call_args[0][1] == [datetime(2025, 2, 7), datetime(2025, 2, 8)]
+
+
+@patch("archive_pipeline.get_db_connection")
+def test_purge_archived_deletes_in_committed_batches(mock_get_db_connection):
+    """batches are deleted up to the watermark until one comes back short"""
+    conn = mock_get_db_connection.return_value
+    cursor = conn.cursor.return_value.__enter__.return_value
+    deleted = iter([2, 2, 1])
+    cursor.execute.side_effect = lambda query, params: setattr(cursor, "rowcount", next(deleted))
+    assert purge_archived(*day_range(date(2025, 2, 7)), 42, batch_size=2) == 5
+    query, params = cursor.execute.call_args[0]
+    assert "TRUNCATE" not in query
+    assert "plant_status_id <= %s" in query
+    assert params == [2, datetime(2025, 2, 7), datetime(2025, 2, 8), 42]
+    assert conn.commit.call_count == 3
+
+
+@patch("archive_pipeline.get_db_connection")
+def test_purge_archived_skips_gaps(mock_get_db_connection):
+    """ids in a gap were never exported, so they are left in plant_status"""
+    cursor = mock_get_db_connection.return_value.cursor.return_value.__enter__.return_value
+    cursor.rowcount = 0
+    purge_archived(DATETIME_MIN, datetime(2025, 2, 7), 150, gaps=[[91, 91], [120, 121]])
+    query, params = cursor.execute.call_args[0]
+    assert query.count("plant_status_id NOT BETWEEN %s AND %s") == 2
+    assert params[-4:] == [91, 91, 120, 121]
+
+
+@patch("archive_pipeline.get_leftover_watermark", return_value=0)
+@patch("archive_pipeline.purge_archived")
+@patch("archive_pipeline.export_day", return_value=[])
+@patch("archive_pipeline.get_daily_data")
+@patch("archive_pipeline.get_watermark", return_value=42)
+@patch("boto3.client")
+def test_handler_purges_what_it_exported(mock_client, mock_watermark, mock_get_daily_data,
+                                         mock_export_day, mock_purge, mock_leftovers,
+                                         monkeypatch):
+    """today's export and purge share one watermark"""
+    monkeypatch.setenv("AWS_ACCESS_ID", "testing")
+    monkeypatch.setenv("AWS_ACCESS_SECRET", "testing")
+    handler({}, None)
+    today = datetime.now().date()
+    assert mock_get_daily_data.call_args[0][2] == 42
+    mock_purge.assert_called_once_with(*day_range(today), 42)
+
+
+@patch("archive_pipeline.purge_archived")
+@patch("archive_pipeline.compact_day")
+@patch("archive_pipeline.segment_days", return_value=[date(2025, 2, 5), date(2025, 2, 6)])
+@patch("archive_pipeline.write_segments")
+@patch("archive_pipeline.get_leftover_data")
+@patch("archive_pipeline.get_leftover_watermark", return_value=90)
+def test_archive_leftovers_merges_earlier_days_then_purges(mock_watermark, mock_get_data,
+                                                            mock_write_segments, mock_days,
+                                                            mock_compact, mock_purge):
+    """readings left above earlier runs' watermarks are compacted into their days and purged"""
+    before = datetime(2025, 2, 7)
+    archive_leftovers(before, None, {"bucket": "test", "chunk_rows": 100})
+    mock_get_data.assert_called_once_with(before, 90, 100)
+    assert mock_write_segments.call_args[0][1] == 0
+    assert [call[0][0] for call in mock_compact.call_args_list] == [date(2025, 2, 5),
+                                                                  date(2025, 2, 6)]
+    mock_purge.assert_called_once_with(DATETIME_MIN, before, 90)
+
+
+@patch("archive_pipeline.purge_archived")
+@patch("archive_pipeline.write_segments")
+@patch("archive_pipeline.get_leftover_watermark", return_value=0)
+def test_archive_leftovers_without_leftovers(mock_watermark, mock_write_segments, mock_purge):
+    """nothing is uploaded or purged when earlier days are fully archived"""
+    archive_leftovers(datetime(2025, 2, 7), None, {"bucket": "test", "chunk_rows": 100})
+    mock_write_segments.assert_not_called()
+    mock_purge.assert_not_called()
+
+
+def test_get_archive_mode(monkeypatch):
+    """the event's mode wins over ARCHIVE_MODE, which defaults to daily"""
+    monkeypatch.delenv("ARCHIVE_MODE", raising=False)
+    assert get_archive_mode(None) == "daily"
+    monkeypatch.setenv("ARCHIVE_MODE", "incremental")
+    assert get_archive_mode({}) == "incremental"
+    assert get_archive_mode({"mode": "daily"}) == "daily"
+
+
+@patch("archive_pipeline.purge_archived")
+@patch("archive_pipeline.compact_day")
+@patch("archive_pipeline.segment_days", return_value=[date(2025, 2, 6), date(2025, 2, 7)])
+@patch("archive_pipeline.write_watermark")
+@patch("archive_pipeline.write_segments")
+@patch("archive_pipeline.get_new_data")
+@patch("archive_pipeline.get_high_water_mark", return_value=150)
+@patch("archive_pipeline.read_gaps", return_value=[])
+@patch("archive_pipeline.read_watermark", return_value=100)
+def test_archive_increment(mock_read, mock_gaps, mock_high, mock_get_new_data,
+                           mock_write_segments, mock_write_watermark, mock_days, mock_compact,
+                           mock_purge):
+    """new rows become segments, finished days are compacted and earlier days purged"""
+    mock_get_new_data.return_value = iter([("row", i) for i in range(101, 151)])
+    mock_write_segments.side_effect = lambda rows, *args: list(rows)
+    s3 = object()
+    settings = {"bucket": "archive", "chunk_rows": 10}
+    archive_increment(s3, settings, today=date(2025, 2, 7))
+    mock_get_new_data.assert_called_once_with([[101, 150]], 10)
+    assert mock_write_segments.call_args[0][1:] == (100, s3, settings)
+    mock_write_watermark.assert_called_once_with(s3, "archive", 150, [])
+    mock_compact.assert_called_once_with(date(2025, 2, 6), s3, settings)
+    mock_purge.assert_called_once_with(DATETIME_MIN, datetime(2025, 2, 7), 150, gaps=[])
+
+
+@patch("archive_pipeline.purge_archived")
+@patch("archive_pipeline.segment_days", return_value=[])
+@patch("archive_pipeline.write_watermark")
+@patch("archive_pipeline.write_segments")
+@patch("archive_pipeline.get_new_data")
+@patch("archive_pipeline.get_high_water_mark", return_value=150)
+@patch("archive_pipeline.read_gaps")
+@patch("archive_pipeline.read_watermark", return_value=100)
+def test_archive_increment_keeps_late_commits_as_gaps(mock_read, mock_gaps, mock_high,
+                                                       mock_get_new_data, mock_write_segments,
+                                                       mock_write_watermark, mock_days,
+                                                       mock_purge):
+    """ids below the watermark that were not exported are re-read later and never purged"""
+    seen = datetime.now().isoformat()
+    mock_gaps.return_value = [[90, 92, seen], [95, 95, "2025-01-01T00:00:00"]]
+    # 91 and 120-121 are still uncommitted; 95 was rolled back long ago.
+    exported = [90, 92] + [i for i in range(101, 151) if i not in (120, 121)]
+    mock_get_new_data.return_value = iter([("row", i) for i in exported])
+    mock_write_segments.side_effect = lambda rows, *args: list(rows)
+    archive_increment(object(), {"bucket": "archive", "chunk_rows": 10},
+                      today=date(2025, 2, 7))
+    mock_get_new_data.assert_called_once_with([[90, 92], [101, 150]], 10)
+    gaps = mock_write_watermark.call_args[0][3]
+    assert [gap[:2] for gap in gaps] == [[91, 91], [120, 121]]
+    assert gaps[0][2] == seen
+    assert mock_purge.call_args[1] == {"gaps": [[91, 91], [120, 121]]}
+
+
+def test_subtract_ranges_keeps_what_was_not_removed():
+    """removed runs split ranges, keeping each part's extra fields"""
+    assert subtract_ranges([[1, 10, "a"], [20, 22, "b"]], [[1, 2], [5, 6], [20, 22]]) == [
+        [3, 4, "a"], [7, 10, "a"]]
+    assert subtract_ranges([[1, 3]], []) == [[1, 3]]
+
+
+def test_strip_ids_records_runs():
+    """the trailing id is dropped from each row and collapsed into [first, last] runs"""
+    exported = []
+    rows = list(strip_ids(iter([("a", 1), ("b", 2), ("c", 4)]), exported))
+    assert rows == [("a",), ("b",), ("c",)]
+    assert exported == [[1, 2], [4, 4]]
+
+
+@patch("archive_pipeline.stream_query", return_value=iter([]))
+def test_get_new_data_seeks_each_range_in_id_order(mock_stream_query):
+    """each range is a BETWEEN on the primary key and the id is selected last"""
+    get_new_data([[90, 92], [101, 150]], 10)
+    query, params, fetch_size = mock_stream_query.call_args[0]
+    assert query.count("ps.plant_status_id BETWEEN %s AND %s") == 2
+    assert "ps.last_watered,\n            ps.plant_status_id" in query
+    assert "ORDER BY" in query
+    assert (params, fetch_size) == ([90, 92, 101, 150], 10)
+
+
+@patch("archive_pipeline.purge_archived")
+@patch("archive_pipeline.segment_days", return_value=[])
+@patch("archive_pipeline.write_watermark")
+@patch("archive_pipeline.write_segments", side_effect=RuntimeError("upload failed"))
+@patch("archive_pipeline.get_new_data")
+@patch("archive_pipeline.get_high_water_mark", return_value=150)
+@patch("archive_pipeline.read_gaps", return_value=[])
+@patch("archive_pipeline.read_watermark", return_value=100)
+def test_archive_increment_keeps_the_watermark_when_upload_fails(
+        mock_read, mock_gaps, mock_high, mock_get_new_data, mock_write_segments,
+        mock_write_watermark, mock_days, mock_purge):
+    """a failed segment upload is retried from the same watermark on the next run"""
+    with pytest.raises(RuntimeError):
+        archive_increment(object(), {"bucket": "archive", "chunk_rows": 10})
+    mock_write_watermark.assert_not_called()
+    mock_purge.assert_not_called()
@@ -0,0 +1,73 @@
+"""Measures plant API extraction throughput against the local mock plants API.
+
+A mock server with the requested number of plants is started in-process for
+each size, unless `--url` points at an already running API.
+
+    python benchmarks/bench_extract.py --plants 50 5000 50000 --latency-ms 20
+"""
+# Built-in
+from os import path
+from collections import Counter
+import argparse
+import asyncio
+import json
+import sys
+import time
+# Installed
+from aiohttp import web
+
+sys.path.append(path.join(path.dirname(path.abspath(__file__)), "..", "pipeline"))
+# pylint: disable=wrong-import-position
+from plants_api import extract_all_plant_data, get_extract_settings, CircuitBreaker
+from mock_plants_api import create_app
+
+
+async def time_extract(url: str, count: int, settings: dict) -> dict:
+    """Extracts `count` plants from `url` and times it."""
+    stats = Counter()
+    started = time.perf_counter()
+    plants = await extract_all_plant_data(range(count), {**settings, "api_url": url},
+                                          stats, CircuitBreaker())
+    elapsed = time.perf_counter() - started
+    return {"seconds": elapsed, "plants": len(plants), "stats": stats}
+
+
+async def run_size(count: int, args: argparse.Namespace, settings: dict) -> dict:
+    """Times the best of `args.repeat` extractions of `count` plants."""
+    runner = None
+    url = args.url
+    if url is None:
+        runner = web.AppRunner(create_app(count, args.latency, args.latency_ms,
+                                          args.error_rate, args.malformed_rate, seed=0))
+        await runner.setup()
+        site = web.TCPSite(runner, "localhost", 0)
+        await site.start()
+        url = f"http://localhost:{runner.addresses[0][1]}/plants/"
+    try:
+        runs = [await time_extract(url, count, settings) for _ in range(args.repeat)]
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+    best = min(runs, key=lambda result: result["seconds"])
+    return {"stage": "extract", "plants": count, "fetched": best["plants"],
+            "seconds": round(best["seconds"], 4),
+            "rows_per_second": round(best["plants"] / best["seconds"], 1),
+            "stats": dict(best["stats"])}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--plants", type=int, nargs="+", default=[50, 5000, 50000])
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--url", help="benchmark this API instead of an in-process mock")
+    parser.add_argument("--latency", default="fixed")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--malformed-rate", type=float, default=0)
+    parser.add_argument("--deadline", type=float, default=600,
+                        help="extraction deadline in seconds, raised so large runs finish")
+    args = parser.parse_args()
+
+    settings = {**get_extract_settings(), "deadline": args.deadline}
+    for count in args.plants:
+        print(json.dumps(asyncio.run(run_size(count, args, settings))))
@@ -0,0 +1,89 @@
+"""Compares plant_status load throughput: executemany against the staged bulk loader.
+
+The bulk loader is timed in both its plain insert and its idempotent merge mode.
+
+Runs against the database configured in .env. Every load is rolled back, so the
+benchmark leaves plant_status unchanged.
+
+    python benchmarks/bench_load.py --rows 50 500 5000 --repeat 3
+"""
+# Built-in
+from os import path
+from datetime import datetime, timedelta
+import argparse
+import json
+import sys
+import time
+# Installed
+from dotenv import load_dotenv
+
+sys.path.append(path.join(path.dirname(path.abspath(__file__)), "..", "pipeline"))
+# pylint: disable=wrong-import-position
+from connections import get_connection
+from loader import build_stage_statements
+
+EXECUTEMANY_SQL = """INSERT INTO plant_status (botanist_id, plant_id, recording_taken, soil_moisture, temperature, last_watered)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    """
+
+
+def make_rows(conn, count: int) -> list[tuple]:
+    """Builds synthetic readings for botanists and plants that exist in the database."""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT TOP 1 botanist_id FROM botanist ORDER BY botanist_id")
+        botanist_id = cursor.fetchone()[0]
+        cursor.execute("SELECT plant_id FROM plant ORDER BY plant_id")
+        plant_ids = [row[0] for row in cursor.fetchall()]
+    start = datetime(2000, 1, 1)
+    return [(botanist_id, plant_ids[i % len(plant_ids)], start + timedelta(minutes=i),
+             50.0, 15.0, start) for i in range(count)]
+
+
+def time_executemany(conn, rows: list[tuple]) -> float:
+    """Seconds taken to insert the rows with executemany."""
+    started = time.perf_counter()
+    with conn.cursor() as cursor:
+        cursor.executemany(EXECUTEMANY_SQL, rows)
+    elapsed = time.perf_counter() - started
+    conn.rollback()
+    return elapsed
+
+
+def time_bulk(conn, rows: list[tuple], mode: str) -> float:
+    """Seconds taken to insert the rows through the staging table."""
+    started = time.perf_counter()
+    with conn.cursor() as cursor:
+        for sql, params in build_stage_statements(rows, mode=mode):
+            cursor.execute(sql, params)
+    elapsed = time.perf_counter() - started
+    conn.rollback()
+    return elapsed
+
+
+def run(row_counts: list[int], repeat: int) -> list[dict]:
+    """Times each load path for each batch size, keeping the best of `repeat` runs."""
+    conn = get_connection()
+    results = []
+    for count in row_counts:
+        rows = make_rows(conn, count)
+        timers = (("executemany", lambda: time_executemany(conn, rows)),
+                  ("bulk_insert", lambda: time_bulk(conn, rows, "insert")),
+                  ("bulk_merge", lambda: time_bulk(conn, rows, "merge")))
+        for method, timer in timers:
+            best = min(timer() for _ in range(repeat))
+            results.append({"stage": "load", "method": method, "rows": count,
+                            "seconds": round(best, 4),
+                            "rows_per_second": round(count / best, 1)})
+    conn.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    load_dotenv()
+    for result in run(args.rows, args.repeat):
+        print(json.dumps(result))
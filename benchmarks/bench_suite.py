@@ -0,0 +1,297 @@
+"""End-to-end benchmark suite for the minutely ETL path, the archive and the alerts.
+
+Every stage runs against local stand-ins, so the suite needs no network or
+database:
+
+- extract: the async extractor against the in-process mock plants API
+- transform: the per-record and the column-wise transform
+- load: `executemany` and the staged bulk loader against a fake connection that
+  charges `--db-latency-ms` per round trip
+- archive: streaming a day to gzipped CSV, Parquet and rollups, uploaded to a fake S3
+  client
+- alert: the plant health checks, on both the plain Python and the pandas path
+
+Each stage is timed `--repeat` times per size. One JSON line is printed per
+stage, method and size, with rows/s at the median and p50/p99 run latency.
+Comparing against a previous run with `--baseline` flags, and exits non-zero
+on, any throughput drop larger than `--tolerance`.
+
+    python benchmarks/bench_suite.py --rows 50 5000 > baseline.jsonl
+    python benchmarks/bench_suite.py --rows 50 5000 --baseline baseline.jsonl
+"""
+# Built-in
+from os import path
+from datetime import date, datetime, timezone
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import statistics
+import sys
+import time
+# Installed
+import pandas as pd
+from aiohttp.test_utils import TestServer
+from botocore.exceptions import ClientError
+
+ROOT = path.join(path.dirname(path.abspath(__file__)), "..")
+for directory in ("pipeline", path.join("archive", "lambda_function"), "plant_health"):
+    sys.path.append(path.join(ROOT, directory))
+# pylint: disable=wrong-import-position
+from pipeline import validate_and_transform, upload_data
+from batch_transform import transform_batch
+from loader import bulk_upload_data, forget_readings
+from archive_export import export_day
+from plant_health_report import get_alert_data, get_alert_data_rows
+from mock_plants_api import create_app, make_plant, BOTANISTS
+from bench_extract import time_extract
+
+EXTRACT_SETTINGS = {"max_concurrency": 25, "connection_limit": 25, "dns_cache_ttl": 300,
+                    "keepalive_timeout": 75, "connect_timeout": 3, "request_timeout": 8,
+                    "deadline": 600, "max_retries": 3, "retry_budget": 50,
+                    "backoff_base": 0.25, "backoff_cap": 4}
+
+
+class FakeCursor:
+    """Cursor that charges a fixed latency per database round trip."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        """One round trip."""
+        self.conn.round_trip()
+
+    def executemany(self, sql, rows):
+        """pymssql sends one statement per row."""
+        for _ in rows:
+            self.conn.round_trip()
+
+    def fetchone(self):
+        """The loader's inserted count; nothing is stored, so it is always zero."""
+        return (0,)
+
+
+class FakeS3:
+    """S3 client stand-in that accepts the archive's uploads and discards them."""
+
+    def __init__(self):
+        self.uploaded = 0
+
+    def create_multipart_upload(self, **kwargs) -> dict:
+        """Starts an upload."""
+        return {"UploadId": "bench"}
+
+    def upload_part(self, Body: bytes, PartNumber: int, **kwargs) -> dict:  # pylint: disable=invalid-name
+        """Counts the part's bytes."""
+        self.uploaded += len(Body)
+        return {"ETag": str(PartNumber)}
+
+    def put_object(self, Body: bytes, **kwargs) -> dict:  # pylint: disable=invalid-name
+        """Counts the object's bytes."""
+        self.uploaded += len(Body)
+        return {}
+
+    def get_object(self, Key: str, **kwargs) -> dict:  # pylint: disable=invalid-name
+        """Nothing is kept, so the manifest is always new."""
+        raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+
+    def complete_multipart_upload(self, **kwargs) -> dict:
+        """Nothing to assemble."""
+        return {}
+
+    def abort_multipart_upload(self, **kwargs) -> dict:
+        """Nothing to discard."""
+        return {}
+
+
+class FakeConnection:
+    """Stand-in for a pymssql connection that only models round-trip latency."""
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.round_trips = 0
+
+    def round_trip(self):
+        """Waits for one simulated round trip."""
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def cursor(self, *args, **kwargs):
+        """Returns a new fake cursor."""
+        return FakeCursor(self)
+
+    def commit(self):
+        """Commits are one more round trip."""
+        self.round_trip()
+
+    def rollback(self):
+        """Nothing to undo."""
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of the samples."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarise(stage: str, method: str, rows: int, durations: list[float]) -> dict:
+    """One result line: throughput at the median and run latency percentiles."""
+    median = statistics.median(durations)
+    return {"stage": stage, "method": method, "rows": rows, "repeat": len(durations),
+            "rows_per_second": round(rows / median, 1) if median else None,
+            "p50_ms": round(percentile(durations, 50) * 1000, 3),
+            "p99_ms": round(percentile(durations, 99) * 1000, 3)}
+
+
+def time_calls(function, repeat: int, setup=None) -> list[float]:
+    """Durations of `repeat` calls to `function`, running `setup` untimed before each."""
+    durations = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def make_payloads(count: int) -> list[dict]:
+    """API payloads for plants 0 to count - 1, as served by the mock API."""
+    rng = random.Random(0)
+    now = datetime.now(timezone.utc)
+    return [make_plant(plant_id, now, rng) for plant_id in range(count)]
+
+
+def bench_extract(count: int, args: argparse.Namespace) -> list[dict]:
+    """Extraction from the mock API."""
+    async def run() -> list[float]:
+        app = create_app(count, args.latency, args.latency_ms, seed=0)
+        async with TestServer(app) as server:
+            url = str(server.make_url("/plants/"))
+            return [(await time_extract(url, count, EXTRACT_SETTINGS))["seconds"]
+                    for _ in range(args.repeat)]
+
+    return [summarise("extract", "async", count, asyncio.run(run()))]
+
+
+def bench_transform(count: int, args: argparse.Namespace) -> list[dict]:
+    """Per-record against column-wise validation and transformation."""
+    payloads = make_payloads(count)
+    botanist_map = {botanist["email"]: i for i, botanist in enumerate(BOTANISTS)}
+    plant_ids = set(range(count))
+    return [
+        summarise("transform", "per_record", count, time_calls(
+            lambda: [validate_and_transform(plant, botanist_map) for plant in payloads],
+            args.repeat)),
+        summarise("transform", "batch", count, time_calls(
+            lambda: transform_batch(payloads, botanist_map, plant_ids), args.repeat))
+    ]
+
+
+def bench_load(count: int, args: argparse.Namespace) -> list[dict]:
+    """executemany against the staged bulk loader, over a fake connection."""
+    botanist_map = {botanist["email"]: i for i, botanist in enumerate(BOTANISTS)}
+    rows, _ = transform_batch(make_payloads(count), botanist_map)
+    conn = FakeConnection(args.db_latency_ms)
+    results = [summarise("load", "executemany", count, time_calls(
+        lambda: upload_data(conn, rows), args.repeat))]
+    for mode in ("insert", "merge"):
+        results.append(summarise("load", f"bulk_{mode}", count, time_calls(
+            lambda: bulk_upload_data(conn, rows, mode=mode), args.repeat,
+            setup=forget_readings)))
+    return results
+
+
+def alert_rows(count: int) -> list[dict]:
+    """plant_status rows as the plant health report reads them, three per plant."""
+    rows = []
+    for plant in make_payloads(max(1, count // 3)):
+        for minutes in range(3):
+            rows.append({"plant_name": f"{plant['name']} {plant['plant_id']}",
+                         "recording_taken": datetime(2025, 2, 7, 12, minutes),
+                         "soil_moisture": plant["soil_moisture"],
+                         "temperature": plant["temperature"],
+                         "last_watered": datetime(2025, 2, 6, 9)})
+    return rows
+
+
+def bench_archive(count: int, args: argparse.Namespace) -> list[dict]:
+    """Streaming a day of readings to the archive, in each format."""
+    rows = [(i // 3, row["plant_name"], "Gertrude Jekyll", "Split", "Europe/Zagreb", "HR",
+             row["recording_taken"], row["soil_moisture"], row["temperature"],
+             row["last_watered"]) for i, row in enumerate(alert_rows(count))]
+    settings = {"bucket": "bench", "chunk_rows": 5000, "part_size": 8 * 1024 * 1024,
+                "upload_threads": 4}
+    return [summarise("archive", fmt, len(rows), time_calls(
+        lambda fmt=fmt: export_day(rows, date(2025, 2, 7), FakeS3(),
+                                   {**settings, "formats": {fmt}}), args.repeat))
+            for fmt in ("csv", "parquet", "rollups")]
+
+
+def bench_alert(count: int, args: argparse.Namespace) -> list[dict]:
+    """Plant health alerts, without and with pandas."""
+    rows = alert_rows(count)
+
+    def with_pandas():
+        df = pd.DataFrame(rows).sort_values(
+            by=['plant_name', 'recording_taken'], ascending=[True, False])
+        return get_alert_data(df)
+
+    return [summarise("alert", "rows", len(rows),
+                      time_calls(lambda: get_alert_data_rows(rows), args.repeat)),
+            summarise("alert", "pandas", len(rows), time_calls(with_pandas, args.repeat))]
+
+
+STAGES = {"extract": bench_extract, "transform": bench_transform, "load": bench_load,
+          "archive": bench_archive, "alert": bench_alert}
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float) -> list[dict]:
+    """Marks results whose throughput dropped more than `tolerance` below the baseline."""
+    previous = {(line["stage"], line["method"], line["rows"]): line for line in baseline}
+    for result in results:
+        before = previous.get((result["stage"], result["method"], result["rows"]))
+        if before is None or not before["rows_per_second"] or not result["rows_per_second"]:
+            continue
+        change = result["rows_per_second"] / before["rows_per_second"] - 1
+        result["change"] = round(change, 3)
+        result["regression"] = change < -tolerance
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--rows", type=int, nargs="+", default=[50, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency", default="fixed", help="mock API latency distribution")
+    parser.add_argument("--latency-ms", type=float, default=0, help="mock API mean latency")
+    parser.add_argument("--db-latency-ms", type=float, default=1,
+                        help="latency charged per fake database round trip")
+    parser.add_argument("--baseline", help="JSON lines from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="largest accepted drop in rows/s, as a fraction")
+    args = parser.parse_args()
+
+    # Log records would be timed along with the stages.
+    logging.disable(logging.CRITICAL)
+    results = [result for stage in args.stages for count in args.rows
+               for result in STAGES[stage](count, args)]
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            results = compare(results, [json.loads(line) for line in file if line.strip()],
+                              args.tolerance)
+    for result in results:
+        print(json.dumps(result))
+    if any(result.get("regression") for result in results):
+        sys.exit(1)
@@ -0,0 +1,97 @@
+"""Reports the cold-start import cost of each Lambda handler module.
+
+Each handler is imported in a fresh interpreter with `-X importtime`. The report
+gives the total import time, the slowest top-level imports, and any heavy module
+that should only be loaded on the code path that needs it.
+
+    python benchmarks/import_time.py --check
+"""
+# Built-in
+from os import path
+import argparse
+import json
+import subprocess
+import sys
+
+ROOT = path.join(path.dirname(path.abspath(__file__)), "..")
+
+# Lambda name: (directory, handler module, modules that must not load at import time)
+LAMBDAS = {
+    "pipeline": ("pipeline", "pipeline", ("requests", "boto3")),
+    "archive": (path.join("archive", "lambda_function"), "archive_pipeline",
+                ("boto3", "botocore", "pyarrow")),
+    "plant_health": ("plant_health", "plant_health_report", ("pandas", "boto3"))
+}
+
+# Import-time budget per Lambda, in milliseconds.
+BUDGETS_MS = {"pipeline": 2000, "archive": 500, "plant_health": 500}
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """Parses `-X importtime` output into (module, depth, cumulative microseconds)."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), depth, int(cumulative)))
+    return imports
+
+
+def profile_imports(directory: str, module: str) -> list[tuple[str, int, int]]:
+    """Imports `module` from `directory` in a fresh interpreter and profiles it."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=path.join(ROOT, directory), capture_output=True,
+                            text=True, check=True)
+    return parse_importtime(result.stderr)
+
+
+def handler_imports(imports: list[tuple[str, int, int]],
+                    module: str) -> tuple[int, list[tuple[str, int, int]]]:
+    """The handler module's cumulative import time and its direct imports.
+
+    `-X importtime` lists a module's imports before the module itself, so the
+    direct imports are the depth-1 entries since the previous top-level entry.
+    """
+    children = []
+    for entry in imports:
+        if entry[1] == 1:
+            children.append(entry)
+        elif entry[1] == 0:
+            if entry[0] == module:
+                return entry[2], children
+            children = []
+    raise ValueError(f"{module} was not imported")
+
+
+def import_report(name: str, top: int = 5) -> dict:
+    """Summarises the import profile of one Lambda against its budget."""
+    directory, module, deferred = LAMBDAS[name]
+    imports = profile_imports(directory, module)
+    cumulative, children = handler_imports(imports, module)
+    slowest = sorted(children, key=lambda entry: entry[2], reverse=True)[:top]
+    loaded = {entry[0].split(".")[0] for entry in imports}
+    milliseconds = round(cumulative / 1000, 1)
+    return {"stage": "import", "lambda": name, "module": module,
+            "milliseconds": milliseconds,
+            "budget_milliseconds": BUDGETS_MS[name],
+            "within_budget": milliseconds <= BUDGETS_MS[name],
+            "slowest": [{"module": entry[0], "milliseconds": round(entry[2] / 1000, 1)}
+                        for entry in slowest],
+            "deferred_loaded": sorted(loaded.intersection(deferred))}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lambdas", nargs="+", choices=LAMBDAS, default=list(LAMBDAS))
+    parser.add_argument("--check", action="store_true",
+                        help="exit non-zero if a Lambda is over budget or loads a deferred module")
+    args = parser.parse_args()
+
+    reports = [import_report(name) for name in args.lambdas]
+    for report in reports:
+        print(json.dumps(report))
+    if args.check and any(not report["within_budget"] or report["deferred_loaded"]
+                          for report in reports):
+        sys.exit(1)
@@ -0,0 +1,144 @@
+"""A local stand-in for the LMNH plants API, for offline load and benchmark testing.
+
+Serves `GET /plants/{plant_id}` in the shape of the real API for IDs 0 to
+`--plants - 1` and a 404 error payload beyond that. Latency, transient error
+rate and the share of malformed readings are configurable.
+
+    python benchmarks/mock_plants_api.py --plants 5000 --latency lognormal --latency-ms 40
+
+Point the extractors at it with:
+
+    PLANTS_API_URL=http://localhost:8080/plants/
+"""
+# Built-in
+from datetime import datetime, timedelta, timezone
+import argparse
+import asyncio
+import math
+import random
+# Installed
+from aiohttp import web
+
+BOTANISTS = (
+    {"name": "Gertrude Jekyll", "email": "gertrude.jekyll@lnhm.co.uk", "phone": "001-481-273-3691x127"},
+    {"name": "Carl Linnaeus", "email": "carl.linnaeus@lnhm.co.uk", "phone": "(146)994-1635x35992"},
+    {"name": "Eliza Andrews", "email": "eliza.andrews@lnhm.co.uk", "phone": "(846)669-6651x75948"}
+)
+ORIGINS = (
+    ["33.95015", "-118.03917", "South Whittier", "US", "America/Los_Angeles"],
+    ["-33.918861", "18.4233", "Cape Town", "ZA", "Africa/Johannesburg"],
+    ["43.50891", "16.43915", "Split", "HR", "Europe/Zagreb"],
+    ["11.8659", "34.3869", "Ar Ruseris", "SD", "Africa/Khartoum"],
+    ["50.9803", "11.32903", "Weimar", "DE", "Europe/Berlin"]
+)
+SPECIES = (
+    ("Venus flytrap", "Dionaea muscipula"),
+    ("Sundew", "Drosera capensis"),
+    ("Corpse flower", "Amorphophallus titanum"),
+    ("Rafflesia arnoldii", "Rafflesia arnoldii"),
+    ("Black bat flower", "Tacca chantrieri")
+)
+ERROR_STATUSES = (429, 500, 503)
+
+
+def make_plant(plant_id: int, now: datetime, rng: random.Random) -> dict:
+    """A plant payload. Master data is fixed per plant_id, the reading is random."""
+    fixed = random.Random(plant_id)
+    name, scientific_name = fixed.choice(SPECIES)
+    watered = now - timedelta(hours=rng.uniform(0, 36))
+    return {
+        "plant_id": plant_id,
+        "name": name,
+        "scientific_name": scientific_name,
+        "origin_location": fixed.choice(ORIGINS),
+        "botanist": fixed.choice(BOTANISTS),
+        "images": {"original_url": f"http://example.com/image{plant_id}.jpg"},
+        "recording_taken": now.strftime("%Y-%m-%d %H:%M:%S"),
+        "last_watered": watered.strftime("%a, %d %b %Y %H:%M:%S GMT"),
+        "soil_moisture": rng.uniform(15, 100),
+        "temperature": rng.uniform(8, 32)
+    }
+
+
+# Each malformation mirrors a way real readings have been rejected by the transform.
+MALFORMATIONS = {
+    "missing_plant_id": lambda plant: plant.pop("plant_id"),
+    "bad_recording_taken": lambda plant: plant.update(recording_taken="not a date"),
+    "bad_last_watered": lambda plant: plant.update(last_watered=None),
+    "soil_moisture_out_of_range": lambda plant: plant.update(soil_moisture=150.0),
+    "temperature_out_of_range": lambda plant: plant.update(temperature=-273.15),
+    "unknown_botanist": lambda plant: plant.update(
+        botanist={"name": "Nobody", "email": "nobody@example.com", "phone": ""})
+}
+
+
+def malform(plant: dict, rng: random.Random) -> dict:
+    """Corrupts one field of the payload."""
+    MALFORMATIONS[rng.choice(sorted(MALFORMATIONS))](plant)
+    return plant
+
+
+def latency_sampler(distribution: str, mean_ms: float, rng: random.Random):
+    """Returns a function drawing response delays in seconds with the given mean."""
+    mean = mean_ms / 1000
+    if mean <= 0:
+        return lambda: 0
+    samplers = {
+        "fixed": lambda: mean,
+        "uniform": lambda: rng.uniform(0, 2 * mean),
+        "exponential": lambda: rng.expovariate(1 / mean),
+        # sigma=1 gives a long tail; mu is chosen so the mean stays at mean_ms.
+        "lognormal": lambda: rng.lognormvariate(math.log(mean) - 0.5, 1)
+    }
+    return samplers[distribution]
+
+
+def create_app(plants: int = 50, latency: str = "fixed", latency_ms: float = 0,
+               error_rate: float = 0, malformed_rate: float = 0,
+               seed: int = None) -> web.Application:
+    """Builds the mock API application."""
+    rng = random.Random(seed)
+    delay = latency_sampler(latency, latency_ms, rng)
+
+    async def get_plant(request: web.Request) -> web.Response:
+        try:
+            plant_id = int(request.match_info["plant_id"])
+        except ValueError:
+            plant_id = -1
+        await asyncio.sleep(delay())
+        if rng.random() < error_rate:
+            return web.json_response({"error": "Service unavailable"},
+                                     status=rng.choice(ERROR_STATUSES))
+        if not 0 <= plant_id < plants:
+            return web.json_response({"error": "plant not found",
+                                      "plant_id": request.match_info["plant_id"]},
+                                     status=404)
+        plant = make_plant(plant_id, datetime.now(timezone.utc), rng)
+        if rng.random() < malformed_rate:
+            plant = malform(plant, rng)
+        return web.json_response(plant)
+
+    app = web.Application()
+    app.router.add_get("/plants/{plant_id}", get_plant)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--plants", type=int, default=50)
+    parser.add_argument("--latency", choices=("fixed", "uniform", "exponential", "lognormal"),
+                        default="fixed")
+    parser.add_argument("--latency-ms", type=float, default=0,
+                        help="mean response delay in milliseconds")
+    parser.add_argument("--error-rate", type=float, default=0,
+                        help="share of requests answered with 429, 500 or 503")
+    parser.add_argument("--malformed-rate", type=float, default=0,
+                        help="share of plants returned with one corrupted field")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    web.run_app(create_app(args.plants, args.latency, args.latency_ms, args.error_rate,
+                           args.malformed_rate, args.seed),
+                host=args.host, port=args.port)
@@ -0,0 +1,55 @@
+"""Tests for the ETL benchmark suite."""
+from argparse import Namespace
+
+import pytest
+
+from bench_suite import (STAGES, FakeConnection, percentile, summarise, compare)
+
+
+def test_percentile_nearest_rank():
+    """Percentiles pick an observed sample."""
+    samples = [0.5, 0.1, 0.4, 0.2, 0.3]
+    assert percentile(samples, 50) == 0.3
+    assert percentile(samples, 99) == 0.5
+    assert percentile([0.7], 99) == 0.7
+
+
+def test_summarise():
+    """Throughput is taken at the median run."""
+    result = summarise("load", "bulk_merge", 100, [0.1, 0.2, 0.4])
+    assert result == {"stage": "load", "method": "bulk_merge", "rows": 100, "repeat": 3,
+                      "rows_per_second": 500.0, "p50_ms": 200.0, "p99_ms": 400.0}
+
+
+def test_compare_flags_regressions():
+    """Only drops larger than the tolerance are regressions."""
+    baseline = [{"stage": "load", "method": "a", "rows": 50, "rows_per_second": 100},
+                {"stage": "load", "method": "b", "rows": 50, "rows_per_second": 100}]
+    results = [{"stage": "load", "method": "a", "rows": 50, "rows_per_second": 85},
+               {"stage": "load", "method": "b", "rows": 50, "rows_per_second": 70},
+               {"stage": "load", "method": "c", "rows": 50, "rows_per_second": 10}]
+    compared = compare(results, baseline, 0.2)
+    assert [result.get("regression") for result in compared] == [False, True, None]
+    assert compared[1]["change"] == -0.3
+
+
+def test_fake_connection_counts_round_trips():
+    """executemany costs one round trip per row."""
+    conn = FakeConnection(0)
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.executemany("INSERT", [(1,), (2,)])
+    conn.commit()
+    assert conn.round_trips == 4
+
+
+@pytest.mark.parametrize("stage", STAGES)
+def test_every_stage_runs(stage):
+    """Each stage produces result lines with throughput and latency percentiles."""
+    args = Namespace(repeat=2, latency="fixed", latency_ms=0, db_latency_ms=0)
+    results = STAGES[stage](6, args)
+    assert results
+    for result in results:
+        assert result["stage"] == stage
+        assert result["repeat"] == 2
+        assert result["p50_ms"] <= result["p99_ms"]
@@ -0,0 +1,28 @@
+"""Checks each Lambda's cold-start imports against its startup budget."""
+import pytest
+
+from import_time import LAMBDAS, parse_importtime, handler_imports, import_report
+
+SAMPLE = """import time: self [us] | cumulative | imported package
+import time:       421 |        421 |   _io
+import time:       500 |       1526 | _frozen_importlib_external
+import time:       300 |        300 |     json.decoder
+import time:       200 |        500 |   json
+import time:       100 |        600 | handler
+"""
+
+
+def test_parse_importtime():
+    """Each entry keeps its name, nesting depth and cumulative time."""
+    imports = parse_importtime(SAMPLE)
+    assert imports[0] == ("_io", 1, 421)
+    assert imports[2] == ("json.decoder", 2, 300)
+    assert handler_imports(imports, "handler") == (600, [("json", 1, 500)])
+
+
+@pytest.mark.parametrize("name", LAMBDAS)
+def test_lambda_import_budget(name):
+    """Heavy modules stay deferred and the handler imports within budget."""
+    report = import_report(name)
+    assert report["deferred_loaded"] == []
+    assert report["within_budget"], report
@@ -0,0 +1,86 @@
+"""Tests for the mock plants API and extraction against it."""
+import asyncio
+import random
+from datetime import datetime
+
+import aiohttp
+import pytest
+from aiohttp.test_utils import TestServer
+
+from mock_plants_api import create_app, make_plant, malform, latency_sampler, ERROR_STATUSES
+from bench_extract import time_extract
+
+
+async def get_json(app, path: str) -> tuple[int, dict]:
+    """Serves the app and makes one request to it."""
+    async with TestServer(app) as server, aiohttp.ClientSession() as session:
+        async with session.get(server.make_url(path)) as response:
+            return response.status, await response.json()
+
+
+def test_plant_payload_has_api_shape():
+    """Plants carry the master data and reading fields the pipeline reads."""
+    status, plant = asyncio.run(get_json(create_app(plants=3), "/plants/2"))
+    assert status == 200
+    assert plant["plant_id"] == 2
+    assert set(plant) == {"plant_id", "name", "scientific_name", "origin_location", "botanist",
+                          "images", "recording_taken", "last_watered", "soil_moisture",
+                          "temperature"}
+    assert set(plant["botanist"]) == {"name", "email", "phone"}
+    assert len(plant["origin_location"]) == 5
+    datetime.strptime(plant["recording_taken"], "%Y-%m-%d %H:%M:%S")
+    datetime.strptime(plant["last_watered"], "%a, %d %b %Y %H:%M:%S %Z")
+
+
+def test_master_data_is_stable_per_plant():
+    """The same plant always has the same name, origin and botanist."""
+    now = datetime(2025, 2, 7)
+    first, second = (make_plant(7, now, random.Random(seed)) for seed in (1, 2))
+    for field in ("name", "scientific_name", "origin_location", "botanist"):
+        assert first[field] == second[field]
+
+
+@pytest.mark.parametrize("path", ["/plants/3", "/plants/-1", "/plants/abc"])
+def test_unknown_plant_is_not_found(path):
+    """IDs outside the configured plant count return the API's error payload."""
+    status, body = asyncio.run(get_json(create_app(plants=3), path))
+    assert status == 404
+    assert "error" in body
+
+
+def test_error_rate():
+    """Transient errors are answered with a retryable status."""
+    status, body = asyncio.run(get_json(create_app(plants=3, error_rate=1), "/plants/1"))
+    assert status in ERROR_STATUSES
+    assert "error" in body
+
+
+def test_malformed_plants_differ_from_clean_ones():
+    """A malformed plant has one field removed or corrupted."""
+    now = datetime(2025, 2, 7)
+    clean = make_plant(1, now, random.Random(0))
+    assert malform(make_plant(1, now, random.Random(0)), random.Random(0)) != clean
+
+
+@pytest.mark.parametrize("distribution", ["fixed", "uniform", "exponential", "lognormal"])
+def test_latency_sampler_mean(distribution):
+    """Every distribution keeps roughly the configured mean."""
+    sample = latency_sampler(distribution, 10, random.Random(0))
+    delays = [sample() for _ in range(20000)]
+    assert sum(delays) / len(delays) == pytest.approx(0.01, rel=0.1)
+
+
+def test_extract_from_mock_api():
+    """The async extractor fetches every plant when pointed at the mock."""
+    settings = {"max_concurrency": 5, "connection_limit": 5, "dns_cache_ttl": 10,
+                "keepalive_timeout": 1, "connect_timeout": 1, "request_timeout": 1,
+                "deadline": 10, "max_retries": 3, "retry_budget": 10,
+                "backoff_base": 0.01, "backoff_cap": 0.02}
+
+    async def run():
+        async with TestServer(create_app(plants=20)) as server:
+            return await time_extract(str(server.make_url("/plants/")), 20, settings)
+
+    result = asyncio.run(run())
+    assert result["plants"] == 20
+    assert result["stats"]["requests"] == 20
@@ -86,6 +86,18 @@ def plant_names():
     return plant_names
 
 
+@st.cache_data
+def get_plant_ids(_conn, params) -> list[int]:
+    """Looks up the ids of the named plants, as used in the archive's partition keys"""
+    if not params:
+        return []
+    q = """SELECT plant_id
+            FROM plant
+            WHERE plant_name IN (""" + ", ".join(["%s"] * len(params)) + ")"
+    ids = fetch_data(_conn, q, tuple(params))
+    return [] if ids.empty else sorted(ids["plant_id"].tolist())
+
+
 @st.cache_data
 def get_latest_temp_and_moisture(_conn, params):
     """Queries the data for the most recent readings"""
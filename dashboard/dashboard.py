@@ -1,5 +1,8 @@
 """This module configures the streamlit dashboard"""
 from os import environ as ENV
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import json
 
 from boto3 import client
 import pandas as pd
@@ -8,8 +11,10 @@ from pymssql import Connection
 from dotenv import load_dotenv
 from datetime import date, timedelta
 
-from dash_queries import get_connection_rds, plant_names, get_latest_temp_and_moisture, get_average_temp_data, get_last_watered_data, get_avg_moisture_data, get_temp_over_time, get_moisture_over_time, get_unique_origins, get_botanists
+from dash_queries import get_connection_rds, plant_names, get_plant_ids, get_latest_temp_and_moisture, get_average_temp_data, get_last_watered_data, get_avg_moisture_data, get_temp_over_time, get_moisture_over_time, get_unique_origins, get_botanists
 from dash_graphs import temp_and_moist_chart, display_average_temperature, scatter_last_watered, average_soil_moisture, temperature_over_time, soil_moisture_over_time, botanist_attending_plants
+
+MANIFEST_KEY = "manifest.json"
 # s3 functions
 
 
@@ -18,28 +23,127 @@ def get_connection_s3():
                   aws_secret_access_key=ENV["SECRET_KEY"])
 
 
-def list_objects(s3_client, bucket_name: str) -> list[str]:
-    objects = s3_client.list_objects_v2(Bucket=bucket_name)
-    return [o["Key"] for o in objects.get('Contents', [])]
+@st.cache_data(ttl=300)
+def list_objects(_s3_client, bucket_name: str, prefix: str = "") -> list[str]:
+    """Lists every key under the prefix, across as many pages as it takes"""
+    pages = _s3_client.get_paginator("list_objects_v2").paginate(
+        Bucket=bucket_name, Prefix=prefix)
+    return [o["Key"] for page in pages for o in page.get('Contents', [])]
+
+
+@st.cache_data(ttl=300)
+def get_manifest(_s3_client, bucket_name: str) -> dict:
+    """Reads the archive's manifest of days, empty if the archive has not written one"""
+    try:
+        obj = _s3_client.get_object(Bucket=bucket_name, Key=MANIFEST_KEY)
+    except _s3_client.exceptions.NoSuchKey:
+        return {"days": {}}
+    return json.loads(obj['Body'].read())
 
 
-def read_s3_file(s3_client, bucket_name: str, file_key: str) -> pd.DataFrame:
+def get_day_keys(s3_client, bucket_name: str, day: date) -> list[str]:
+    """The archive objects of a day, from the manifest or else by listing its prefixes"""
+    entry = get_manifest(s3_client, bucket_name)["days"].get(f"{day:%Y-%m-%d}")
+    if entry is not None:
+        return entry["keys"]
+    return (list_objects(s3_client, bucket_name, f"parquet/date={day:%Y-%m-%d}/") +
+            list_objects(s3_client, bucket_name, f"{day:%Y/%m/%d}_hist.csv"))
+
+
+def read_s3_file(s3_client, bucket_name: str, file_key: str,
+                 columns: list[str] = None) -> pd.DataFrame:
     obj = s3_client.get_object(Bucket=bucket_name, Key=file_key)
-    return pd.read_csv(obj['Body'])
-
-
-def get_s3_data(s3_client, date_to_view: str) -> pd.DataFrame:
-    """Gets the data from the S3 bucket according to the date"""
-    bucket_name = ENV["S3_BUCKET"]
-    files = list_objects(s3_client, bucket_name)
-    file_name = f"""{
-        date_to_view.year}/{date_to_view.month:02}/{date_to_view.day:02}_hist.csv"""
-    st.write("Viewing File:", file_name.split('/')[-1])
-    if file_name in files:
-        df = read_s3_file(s3_client, bucket_name, file_name)
+    if file_key.endswith(".parquet"):
+        return pd.read_parquet(BytesIO(obj['Body'].read()), columns=columns)
+    if file_key.endswith(".gz"):
+        return pd.read_csv(BytesIO(obj['Body'].read()), usecols=columns, compression="gzip")
+    return pd.read_csv(obj['Body'], usecols=columns)
+
+
+def read_rollups(s3_client, bucket_name: str, days: list[date],
+                 name: str = "daily") -> pd.DataFrame:
+    """Reads the archive's per-plant "hourly" or "daily" rollups of the days that have them"""
+    manifest_days = get_manifest(s3_client, bucket_name)["days"]
+    keys = [manifest_days[f"{day:%Y-%m-%d}"]["rollups"][name] for day in days
+            if "rollups" in manifest_days.get(f"{day:%Y-%m-%d}", {})]
+    if not keys:
+        return pd.DataFrame()
+    return pd.concat([read_s3_file(s3_client, bucket_name, key) for key in keys],
+                     ignore_index=True)
+
+
+def partition_plant_id(key: str) -> int:
+    """The plant_id of a Parquet partition, from its key"""
+    return int(key.split("plant_id=")[1].split("/")[0])
+
+
+def get_range_keys(s3_client, bucket_name: str, start: date, end: date,
+                   plant_ids: tuple[int]) -> list[str]:
+    """The archive objects to read for each day from start to end inclusive
+
+    A day's Parquet partitions are preferred, only those of the selected
+    plants, falling back to its gzipped CSV, then to the uncompressed CSV of
+    older days.
+    """
+    keys = []
+    for offset in range((end - start).days + 1):
+        day = start + timedelta(days=offset)
+        files = get_day_keys(s3_client, bucket_name, day)
+        parquet_keys = [key for key in files if key.startswith("parquet/")]
+        if parquet_keys:
+            keys += [key for key in parquet_keys if partition_plant_id(key) in plant_ids]
+            continue
+        csv_keys = [key for key in (f"{day:%Y/%m/%d}_hist.csv.gz", f"{day:%Y/%m/%d}_hist.csv")
+                    if key in files]
+        keys += csv_keys[:1]
+    return keys
+
+
+def read_archive_object(s3_client, bucket_name: str, key: str,
+                        plants: tuple[str]) -> pd.DataFrame:
+    """Reads one archive object, keeping only the selected plants' readings while parsing"""
+    obj = s3_client.get_object(Bucket=bucket_name, Key=key)
+    body = BytesIO(obj['Body'].read())
+    if key.endswith(".parquet"):
+        df = pd.read_parquet(body, filters=[("plant_name", "in", list(plants))])
+        df.insert(0, "plant_id", partition_plant_id(key))
+        return df
+    chunks = pd.read_csv(body, compression="gzip" if key.endswith(".gz") else None,
+                         chunksize=50_000)
+    return pd.concat([chunk[chunk["plant_name"].isin(plants)] for chunk in chunks],
+                     ignore_index=True)
+
+
+@st.cache_data(ttl=300)
+def read_date_range(_s3_client, bucket_name: str, start: date, end: date,
+                    plants: tuple[str], plant_ids: tuple[int]) -> pd.DataFrame:
+    """Downloads and filters the selected plants' archive objects of the range concurrently"""
+    if not plants:
+        return pd.DataFrame()
+    keys = get_range_keys(_s3_client, bucket_name, start, end, plant_ids)
+    if not keys:
+        return pd.DataFrame()
+    workers = int(ENV.get("S3_FETCH_THREADS", 16))
+    with ThreadPoolExecutor(max_workers=min(workers, len(keys))) as pool:
+        frames = list(pool.map(
+            lambda key: read_archive_object(_s3_client, bucket_name, key, plants), keys))
+    return pd.concat(frames, ignore_index=True)
+
+
+def get_s3_data(s3_client, dates: tuple[date], plant_name_list: list[str],
+                plant_ids: list[int]) -> pd.DataFrame:
+    """Gets the selected plants' archived readings from the S3 bucket for a date range"""
+    if not plant_name_list:
+        st.write("Select at least one plant to view its archive")
+        return pd.DataFrame()
+    start, end = dates[0], dates[-1]
+    df = read_date_range(s3_client, ENV["S3_BUCKET"], start, end, tuple(plant_name_list),
+                         tuple(plant_ids))
+    if df.empty:
+        st.write("No data available for the selected dates")
         return df
-    else:
-        st.write("No data available for the selected date")
+    st.write("Viewing archive from", f"{start:%Y-%m-%d}", "to", f"{end:%Y-%m-%d}")
+    return df
 
 
 def setup_sidebar(plants: list[str]) -> tuple[list[str], str]:
@@ -61,9 +165,14 @@ def setup_sidebar(plants: list[str]) -> tuple[list[str], str]:
         plant_name_list = st.sidebar.multiselect(
             "Plants:", plants, default=plants)
 
+        yesterday = date.today() - timedelta(days=1)
         time = st.sidebar.date_input(
-            "Date to view:", value=date.today()-timedelta(days=1))
-        return plant_name_list, time
+            "Dates to view:", value=(yesterday - timedelta(days=6), yesterday),
+            max_value=yesterday)
+        # The range has a single date while its end is being picked.
+        if not isinstance(time, tuple):
+            time = (time,)
+        return plant_name_list, time or (yesterday,)
 
 # Pages
 
@@ -88,23 +197,24 @@ def homepage(conn: Connection, plant_name_list: list[str]):
         average_soil_moisture(graph4_data)
 
 
-def historical_data(conn: Connection, plant_name_list: list[str], time: list):
+def historical_data(conn: Connection, plant_name_list: list[str], time: tuple[date]):
     """Dashboard page for historical data"""
 
     st.title("LMNH Botany Department Dashboard")
     st.subheader("Historical Data")
     s3_client = get_connection_s3()
 
-    s3_data_df = get_s3_data(s3_client, time)
+    plant_ids = get_plant_ids(conn, plant_name_list)
+    s3_data_df = get_s3_data(s3_client, time, plant_name_list, plant_ids)
 
     st.write(s3_data_df)
 
     left_col, right_col = st.columns(2)
     with left_col:
-        graph1_data = get_temp_over_time(conn, plant_name_list, time)
+        graph1_data = get_temp_over_time(conn, plant_name_list, time[-1])
         temperature_over_time(graph1_data)
     with right_col:
-        graph2_data = get_moisture_over_time(conn, plant_name_list, time)
+        graph2_data = get_moisture_over_time(conn, plant_name_list, time[-1])
         soil_moisture_over_time(s3_data_df)
 
 
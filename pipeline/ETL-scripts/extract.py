@@ -1,22 +1,49 @@
 """performs extraction on the api as part of a ETL pipeline"""
+from os import environ as ENV, path
+import sys
+
 import requests as req
 
+# The retry policy is shared with the pipeline, one directory up.
+sys.path.append(path.join(path.dirname(path.abspath(__file__)), ".."))
+# pylint: disable=wrong-import-position
+from api_retry import RetryPolicy, CircuitOpenError, get_json, make_retry_policy
 
-def get_plant_data(url, plant_id: int) -> dict:
-    """Fetches plant data by plant_id."""
-    response = req.get(f'{url}{plant_id}')
+API_URL = "https://data-eng-plants-api.herokuapp.com/plants/"
 
-    return response.json()
 
+def get_plant_data(url, plant_id: int, policy: RetryPolicy = None) -> dict:
+    """Fetches plant data by plant_id, retrying transient failures under the shared policy.
+
+    Returns an error payload if the plant is missing or could not be fetched.
+    """
+    try:
+        plant = get_json(f'{url}{plant_id}', policy or make_retry_policy())
+    except (req.RequestException, CircuitOpenError, ValueError) as error:
+        return {"error": repr(error), "plant_id": plant_id}
+    if plant is None:
+        return {"error": "plant not found", "plant_id": plant_id}
+    return plant
 
-def extract_all_plant_data() -> dict:
-    """Fetches all plant data and stores it in a dictionary."""
-    plant_data = {}
-    url = 'https://data-eng-plants-api.herokuapp.com/plants/'
 
-    for plant_id in range(50):
-        print("done")
-        plant_data[plant_id] = get_plant_data(url, plant_id)
+def extract_all_plant_data(max_misses: int = 5) -> dict:
+    """Fetches all plant data and stores it in a dictionary.
+
+    IDs are walked upwards from 0 until `max_misses` in a row return no plant.
+    """
+    plant_data = {}
+    url = ENV.get("PLANTS_API_URL", API_URL)
+    policy = make_retry_policy()
+
+    plant_id, misses = 0, 0
+    while misses < max_misses:
+        plant = get_plant_data(url, plant_id, policy)
+        if plant.get("plant_id") is not None and "error" not in plant:
+            plant_data[plant_id] = plant
+            misses = 0
+        else:
+            misses += 1
+        plant_id += 1
 
     return plant_data
 
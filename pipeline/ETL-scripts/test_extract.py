@@ -1,6 +1,6 @@
 from unittest.mock import patch, MagicMock
 import pytest
-from extract import get_plant_data
+from extract import get_plant_data, extract_all_plant_data
 
 
 @pytest.fixture
@@ -33,10 +33,39 @@ def test_get_plant_data(mock_get, plant_data):
 
     mock_response = MagicMock()
     mock_response.json.return_value = plant_data
+    mock_response.status_code = 200
     mock_get.return_value = mock_response
 
     result = get_plant_data(url, 1)
 
     assert result == plant_data
 
-    mock_get.assert_called_once_with(f"{url}1")
+    mock_get.assert_called_once_with(f"{url}1", timeout=20)
+
+
+@patch("api_retry.time.sleep")
+@patch("requests.get")
+def test_get_plant_data_retries_server_errors(mock_get, mock_sleep, plant_data):
+    """Transient errors are retried; a plant that never answers becomes an error payload"""
+    failing, ok = MagicMock(status_code=503), MagicMock(status_code=200)
+    ok.json.return_value = plant_data
+    mock_get.side_effect = [failing, ok]
+    assert get_plant_data("http://api/", 1) == plant_data
+
+    mock_get.side_effect = None
+    mock_get.return_value = failing
+    assert "error" in get_plant_data("http://api/", 2)
+
+
+@patch("extract.get_plant_data")
+def test_extract_all_plant_data_stops_after_misses(mock_get_plant_data, plant_data):
+    """Discovery skips gaps but stops after max_misses missing IDs in a row"""
+    live_ids = {0, 1, 3, 60}
+    mock_get_plant_data.side_effect = lambda url, plant_id, policy: (
+        {**plant_data, "plant_id": plant_id} if plant_id in live_ids
+        else {"error": "plant not found", "plant_id": plant_id})
+
+    result = extract_all_plant_data(max_misses=3)
+
+    assert list(result) == [0, 1, 3]
+    assert mock_get_plant_data.call_count == 7
@@ -1,6 +1,6 @@
 import pytest
 from datetime import datetime
-from transform import parse_datetime, validate_soil_moisture, validate_temperature
+from transform import parse_datetime, validate_soil_moisture, validate_temperature, validate_and_transform
 
 
 @pytest.mark.parametrize("temp, expected", [
@@ -36,5 +36,13 @@ def test_parse_datetime():
     assert isinstance(parse_datetime(date_str, "%Y-%m-%d %H:%M:%S"), datetime)
 
 
-
-
+def test_validate_and_transform_keeps_zero_readings():
+    """A reading of exactly 0.0 is valid and must not be dropped"""
+    data = {"plant_id": 1,
+            "recording_taken": "2025-02-04 14:20:40",
+            "soil_moisture": 0.0,
+            "temperature": 0.0,
+            "last_watered": "Mon, 03 Feb 2025 13:54:32 GMT",
+            "botanist": {"email": "carl@botany.com"}}
+    result = validate_and_transform(data, {"carl@botany.com": 1})
+    assert result[3:5] == (0.0, 0.0)
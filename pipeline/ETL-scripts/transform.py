@@ -45,7 +45,16 @@ def validate_temperature(temperature: float) -> float:
     return temperature if temperature is not None and -50 <= temperature <= 50 else None
 
 
-def validate_and_transform(data: dict, conn) -> tuple:
+def get_botanist_map(conn) -> dict:
+    """Loads the botanist email->id map once, to be shared by every record."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT botanist_email, botanist_id FROM botanist")
+    botanist_map = {row[0]: row[1] for row in cursor.fetchall()}
+    cursor.close()
+    return botanist_map
+
+
+def validate_and_transform(data: dict, botanist_map: dict) -> tuple:
     """Validates and transforms the API response into a format suitable for the database."""
     plant_id = data.get("plant_id")
     recording_taken = parse_datetime(
@@ -56,15 +65,9 @@ def validate_and_transform(data: dict, conn) -> tuple:
         data.get("last_watered"), "%a, %d %b %Y %H:%M:%S %Z")
 
     botanist_email = data.get("botanist", {}).get("email")
-
-    cursor = conn.cursor()
-    cursor.execute("SELECT botanist_email, botanist_id FROM botanist")
-    botanist_map = {row[0]: row[1] for row in cursor.fetchall()}
-    cursor.close()
-
     botanist_id = botanist_map.get(botanist_email)
 
-    if not all([soil_moisture, temperature, last_watered]) or None in (botanist_id, plant_id, recording_taken):
+    if None in (soil_moisture, temperature, last_watered, botanist_id, plant_id, recording_taken):
         return None
     
     return (botanist_id, plant_id, recording_taken, soil_moisture, temperature, last_watered)
@@ -93,9 +96,10 @@ if __name__ == "__main__":
         }
     }
     data = []
-    for plant in plants:
-        transformed_entry = validate_and_transform(plant)
+    botanist_map = get_botanist_map(conn)
+    for plant in plants.values():
+        transformed_entry = validate_and_transform(plant, botanist_map)
         if transformed_entry is not None:
-            data.append(validate_and_transform(plant))
+            data.append(transformed_entry)
 
     conn.close()
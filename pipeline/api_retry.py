@@ -0,0 +1,153 @@
+"""Retry policy and circuit breaker for calls to the LMNH plants API.
+
+Shared by the asynchronous extractor in plants_api.py and, through
+`get_json`, by the synchronous seed and ETL scripts, so every caller retries
+transient failures the same way.
+"""
+# Built-in
+from os import environ as ENV
+from collections import Counter
+import math
+import random
+import time
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker is refusing calls to the API."""
+
+
+class CircuitBreaker:
+    """Stops calling a failing upstream, letting a single probe through after a cool-down.
+
+    The breaker opens after `failure_threshold` consecutive failures. Once
+    `reset_timeout` seconds have passed it goes half-open and allows one request;
+    a success closes it again and a failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 10, reset_timeout: float = 30,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        """Returns 'closed', 'open' or 'half-open'."""
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        """Checks whether a request may be sent right now."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self):
+        """Closes the breaker after a successful call."""
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        """Counts a failed call, opening the breaker once the threshold is hit."""
+        self.failures += 1
+        if self.probing or self.failures >= self.failure_threshold:
+            self.opened_at = self.clock()
+        self.probing = False
+
+
+class RetryPolicy:
+    """Retry limits, backoff and counters shared by every request in one extract run."""
+
+    def __init__(self, settings: dict, breaker: CircuitBreaker, stats: Counter,
+                 deadline_at: float = math.inf):
+        self.settings = settings
+        self.breaker = breaker
+        self.stats = stats
+        self.deadline_at = deadline_at
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given (zero-based) retry attempt."""
+        ceiling = min(self.settings["backoff_cap"],
+                      self.settings["backoff_base"] * 2 ** attempt)
+        return random.uniform(0, ceiling)
+
+    def can_retry(self, attempt: int, delay: float) -> bool:
+        """Checks the per-request limit, the run's retry budget and the deadline."""
+        if attempt >= self.settings["max_retries"]:
+            return False
+        if self.stats["retries"] >= self.settings["retry_budget"]:
+            self.stats["retry_budget_exhausted"] += 1
+            return False
+        return time.monotonic() + delay < self.deadline_at
+
+
+def get_retry_settings() -> dict:
+    """Reads the retry limits and backoff from the environment."""
+    return {
+        "max_retries": int(ENV.get("EXTRACT_MAX_RETRIES", 3)),
+        "retry_budget": int(ENV.get("EXTRACT_RETRY_BUDGET", 50)),
+        "backoff_base": float(ENV.get("EXTRACT_BACKOFF_BASE", 0.25)),
+        "backoff_cap": float(ENV.get("EXTRACT_BACKOFF_CAP", 4))
+    }
+
+
+def make_retry_policy() -> RetryPolicy:
+    """A policy with its own breaker and counters, for one run of a synchronous script."""
+    return RetryPolicy(get_retry_settings(), CircuitBreaker(), Counter())
+
+
+def get_json(url: str, policy: RetryPolicy, timeout: float = 20) -> dict | None:
+    """GETs a JSON document synchronously, retrying transient failures with jittered backoff.
+
+    Returns None when the API answers 404. Raises the last error once the
+    retries, the retry budget or the deadline run out, and CircuitOpenError
+    when the breaker is refusing calls.
+    """
+    # Imported here so the pipeline Lambda, which only uses the async extractor, never loads it.
+    import requests as req  # pylint: disable=import-outside-toplevel
+    attempt = 0
+    while True:
+        if not policy.breaker.allow_request():
+            policy.stats["circuit_rejected"] += 1
+            raise CircuitOpenError(url)
+        policy.stats["requests"] += 1
+        try:
+            response = req.get(url, timeout=timeout)
+        except req.Timeout as error:
+            policy.stats["timeouts"] += 1
+            last_error = error
+        except req.ConnectionError as error:
+            policy.stats["connection_errors"] += 1
+            last_error = error
+        else:
+            if response.status_code == 404:
+                policy.breaker.record_success()
+                policy.stats["not_found"] += 1
+                return None
+            if response.status_code not in RETRY_STATUSES:
+                policy.breaker.record_success()
+                response.raise_for_status()
+                return response.json()
+            policy.stats["server_errors"] += 1
+            last_error = req.HTTPError(f"{response.status_code} for {url}", response=response)
+
+        policy.breaker.record_failure()
+        delay = policy.backoff(attempt)
+        if not policy.can_retry(attempt, delay):
+            raise last_error
+        policy.stats["retries"] += 1
+        attempt += 1
+        time.sleep(delay)
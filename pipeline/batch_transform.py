@@ -0,0 +1,94 @@
+"""Column-wise validation and transformation of a whole batch of API payloads."""
+# Installed
+import pandas as pd
+
+RECORDING_FORMAT = "%Y-%m-%d %H:%M:%S"
+LAST_WATERED_FORMAT = "%a, %d %b %Y %H:%M:%S %Z"
+SOIL_MOISTURE_RANGE = (0, 100)
+TEMPERATURE_RANGE = (-50, 50)
+
+# Checked in order; a rejected row is reported with the first reason it fails.
+REJECT_REASONS = ("missing_plant_id", "unknown_plant", "bad_recording_taken",
+                  "bad_last_watered", "soil_moisture_out_of_range",
+                  "temperature_out_of_range", "unknown_botanist")
+
+
+def payloads_to_frame(plants: list[dict]) -> pd.DataFrame:
+    """Flattens the API payloads into one column per field."""
+    return pd.DataFrame({
+        "plant_id": [plant.get("plant_id") for plant in plants],
+        "recording_taken": [plant.get("recording_taken") for plant in plants],
+        "soil_moisture": [plant.get("soil_moisture") for plant in plants],
+        "temperature": [plant.get("temperature") for plant in plants],
+        "last_watered": [plant.get("last_watered") for plant in plants],
+        "botanist_email": [(plant.get("botanist") or {}).get("email") for plant in plants]
+    })
+
+
+def parse_datetime_column(column: pd.Series, format_str: str) -> pd.Series:
+    """Parses a column of timestamps with one fixed format, as naive UTC.
+
+    Each distinct string is parsed once, which matters for last_watered as it
+    repeats across readings. Unparseable values become NaT.
+    """
+    parsed = pd.to_datetime(column, format=format_str, errors="coerce", cache=True)
+    if parsed.dt.tz is not None:
+        parsed = parsed.dt.tz_convert(None)
+    return parsed
+
+
+def in_range(column: pd.Series, bounds: tuple) -> pd.Series:
+    """Flags non-null numeric values within the inclusive bounds."""
+    values = pd.to_numeric(column, errors="coerce")
+    return values.between(*bounds)
+
+
+def to_python(column: pd.Series) -> list:
+    """Converts a column to plain Python values the database driver accepts."""
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return [value.to_pydatetime() for value in column]
+    return column.astype(object).tolist()
+
+
+def transform_batch(plants: list[dict], botanist_map: dict,
+                    plant_ids: set = None) -> tuple[list[tuple], list[dict]]:
+    """Validates and transforms a batch of API payloads in one pass over each column.
+
+    Returns the plant_status insert tuples, in the same shape as
+    validate_and_transform, and a report of every rejected payload with the
+    reason it was rejected.
+    """
+    if not plants:
+        return [], []
+    frame = payloads_to_frame(plants)
+    plant_id = pd.to_numeric(frame["plant_id"], errors="coerce")
+    recording_taken = parse_datetime_column(frame["recording_taken"], RECORDING_FORMAT)
+    last_watered = parse_datetime_column(frame["last_watered"], LAST_WATERED_FORMAT)
+    botanist_id = frame["botanist_email"].map(botanist_map)
+
+    checks = {
+        "missing_plant_id": plant_id.notna(),
+        "unknown_plant": (plant_id.isin(plant_ids) if plant_ids is not None
+                          else pd.Series(True, index=frame.index)),
+        "bad_recording_taken": recording_taken.notna(),
+        "bad_last_watered": last_watered.notna(),
+        "soil_moisture_out_of_range": in_range(frame["soil_moisture"], SOIL_MOISTURE_RANGE),
+        "temperature_out_of_range": in_range(frame["temperature"], TEMPERATURE_RANGE),
+        "unknown_botanist": botanist_id.notna()
+    }
+    reason = pd.Series(None, index=frame.index, dtype=object)
+    for name in reversed(REJECT_REASONS):
+        reason = reason.mask(~checks[name], name)
+    valid = reason.isna()
+
+    rows = list(zip(
+        to_python(botanist_id[valid].astype(int)),
+        to_python(plant_id[valid].astype(int)),
+        to_python(recording_taken[valid]),
+        to_python(pd.to_numeric(frame["soil_moisture"][valid])),
+        to_python(pd.to_numeric(frame["temperature"][valid])),
+        to_python(last_watered[valid])
+    ))
+    rejected = [{"reason": reason[index], "payload": plants[index]}
+                for index in frame.index[~valid]]
+    return rows, rejected
@@ -0,0 +1,105 @@
+"""Database connection, HTTP session and event loop kept alive across warm Lambda invocations."""
+# Built-in
+from os import environ as ENV, path
+import asyncio
+import logging
+import sys
+# Installed
+from pymssql import connect, Connection, Error
+from dotenv import load_dotenv
+
+from plants_api import make_session
+
+# logger_config is copied next to this file in the Lambda image; locally it
+# lives in the repository's shared directory.
+try:
+    from logger_config import setup_logging
+except ModuleNotFoundError:
+    sys.path.append(path.join(path.dirname(path.abspath(__file__)), "..", "shared"))
+    from logger_config import setup_logging
+
+_STATE = {"initialised": False, "conn": None, "loop": None, "session": None}
+
+
+def initialise():
+    """Loads the environment and logging configuration once per container."""
+    if _STATE["initialised"]:
+        return
+    load_dotenv()
+    setup_logging("console", level=ENV.get("LOG_LEVEL", "INFO"))
+    _STATE["initialised"] = True
+
+
+def get_connection() -> Connection:
+    """Makes a connection with the SQL Server database."""
+    connection = connect(
+        server=ENV["DB_HOST"],
+        port=ENV["DB_PORT"],
+        user=ENV["DB_USER"],
+        password=ENV["DB_PASSWORD"],
+        database=ENV["DB_NAME"]
+    )
+    logging.info("Established a secure connection to the database.")
+    return connection
+
+
+def is_healthy(conn: Connection) -> bool:
+    """Checks a pooled connection with the cheapest possible round trip."""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+    except (Error, OSError):
+        return False
+    return True
+
+
+def get_db_connection() -> Connection:
+    """Returns the warm connection if it is still healthy, reconnecting otherwise."""
+    conn = _STATE["conn"]
+    if conn is not None:
+        if is_healthy(conn):
+            logging.info("Reusing warm database connection.")
+            return conn
+        logging.warning("Warm database connection is unhealthy, reconnecting.")
+        reset_db_connection()
+    _STATE["conn"] = get_connection()
+    return _STATE["conn"]
+
+
+def reset_db_connection():
+    """Discards the warm connection, e.g. after a failed invocation."""
+    conn, _STATE["conn"] = _STATE["conn"], None
+    if conn is None:
+        return
+    try:
+        conn.rollback()
+        conn.close()
+    except (Error, OSError):
+        pass
+
+
+def run_async(coroutine):
+    """Runs a coroutine on an event loop that survives between invocations.
+
+    asyncio.run would close its loop, and with it any aiohttp session and its
+    pooled connections, at the end of every call.
+    """
+    loop = _STATE["loop"]
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _STATE["loop"], _STATE["session"] = loop, None
+    return loop.run_until_complete(coroutine)
+
+
+def get_http_session(settings: dict):
+    """Returns the warm aiohttp session, creating it on first use.
+
+    Must be called from a coroutine running under run_async, as the session is
+    bound to that event loop.
+    """
+    session = _STATE["session"]
+    if session is None or session.closed:
+        session = make_session(settings)
+        _STATE["session"] = session
+    return session
@@ -0,0 +1,163 @@
+"""Set-based loading of plant_status readings through a staging table."""
+# Built-in
+from os import environ as ENV
+import logging
+# Installed
+from pymssql import Connection
+
+MAX_PARAMS = 2100
+MAX_VALUES_ROWS = 1000
+COLUMNS = ("botanist_id", "plant_id", "recording_taken",
+           "soil_moisture", "temperature", "last_watered")
+
+CREATE_STAGE_SQL = """
+    IF OBJECT_ID('tempdb..#plant_status_stage') IS NOT NULL
+        DROP TABLE #plant_status_stage;
+    CREATE TABLE #plant_status_stage (
+        botanist_id SMALLINT NOT NULL,
+        plant_id INT NOT NULL,
+        recording_taken DATETIME NOT NULL,
+        soil_moisture FLOAT,
+        temperature FLOAT,
+        last_watered DATETIME
+    );
+    """
+
+STAGE_ROWS_SQL = """
+    INSERT INTO #plant_status_stage
+        (botanist_id, plant_id, recording_taken, soil_moisture, temperature, last_watered)
+    VALUES {values};
+    """
+
+INSERT_STAGE_SQL = """
+    INSERT INTO plant_status
+        (botanist_id, plant_id, recording_taken, soil_moisture, temperature, last_watered)
+    SELECT botanist_id, plant_id, recording_taken, soil_moisture, temperature, last_watered
+    FROM #plant_status_stage;
+    SELECT @@ROWCOUNT AS inserted;
+    DROP TABLE #plant_status_stage;
+    """
+
+MERGE_STAGE_SQL = """
+    MERGE plant_status WITH (HOLDLOCK) AS target
+    USING (
+        SELECT botanist_id, plant_id, recording_taken, soil_moisture, temperature, last_watered
+        FROM (
+            SELECT *, ROW_NUMBER() OVER (
+                PARTITION BY plant_id, recording_taken ORDER BY (SELECT NULL)) AS row_num
+            FROM #plant_status_stage) AS staged
+        WHERE row_num = 1) AS source
+    ON target.plant_id = source.plant_id
+        AND target.recording_taken = source.recording_taken
+    WHEN NOT MATCHED BY TARGET THEN
+        INSERT (botanist_id, plant_id, recording_taken, soil_moisture, temperature, last_watered)
+        VALUES (source.botanist_id, source.plant_id, source.recording_taken,
+                source.soil_moisture, source.temperature, source.last_watered);
+    SELECT @@ROWCOUNT AS inserted;
+    DROP TABLE #plant_status_stage;
+    """
+
+LOAD_SQL = {"insert": INSERT_STAGE_SQL, "merge": MERGE_STAGE_SQL}
+
+# Latest recording_taken loaded for each plant, kept across warm invocations.
+_LAST_SEEN = {}
+
+
+def rows_per_statement(columns: int = len(COLUMNS)) -> int:
+    """The most rows one VALUES list can hold within SQL Server's parameter limit."""
+    return min(MAX_VALUES_ROWS, (MAX_PARAMS - 1) // columns)
+
+
+def chunk_rows(data: list[tuple], size: int) -> list[list[tuple]]:
+    """Splits the rows into consecutive chunks of at most `size`."""
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+def get_load_mode() -> str:
+    """'merge' skips readings already in plant_status, 'insert' appends blindly."""
+    return ENV.get("LOAD_MODE", "merge")
+
+
+def skip_seen_readings(data: list[tuple]) -> list[tuple]:
+    """Drops readings no newer than the last one loaded for the same plant.
+
+    The API repeats a plant's last reading until the sensor reports again, so
+    most repeats are filtered here without reaching the database.
+    """
+    fresh, batch_seen = [], set()
+    for row in data:
+        plant_id, recording_taken = row[1], row[2]
+        last_seen = _LAST_SEEN.get(plant_id)
+        if (last_seen is not None and recording_taken <= last_seen) \
+                or (plant_id, recording_taken) in batch_seen:
+            continue
+        batch_seen.add((plant_id, recording_taken))
+        fresh.append(row)
+    return fresh
+
+
+def remember_readings(data: list[tuple]):
+    """Records the newest loaded reading per plant."""
+    for row in data:
+        plant_id, recording_taken = row[1], row[2]
+        if plant_id not in _LAST_SEEN or recording_taken > _LAST_SEEN[plant_id]:
+            _LAST_SEEN[plant_id] = recording_taken
+
+
+def forget_readings():
+    """Clears the last-seen map."""
+    _LAST_SEEN.clear()
+
+
+def build_stage_statements(data: list[tuple], size: int = None,
+                           mode: str = "merge") -> list[tuple[str, tuple]]:
+    """Builds the batches that stage the rows and move them into plant_status.
+
+    Each batch is one multi-row VALUES insert into the staging table. The first
+    batch also creates the table and the last one moves the rows into
+    plant_status, so a run that fits in one chunk is a single round trip. In
+    'merge' mode rows whose (plant_id, recording_taken) already exists are
+    skipped, which makes a retried invocation safe. The last batch returns the
+    number of rows it inserted as a one-row result set.
+    """
+    size = size or rows_per_statement()
+    group = "(" + ", ".join(["%s"] * len(COLUMNS)) + ")"
+    statements = []
+    for chunk in chunk_rows(data, size):
+        sql = STAGE_ROWS_SQL.format(values=", ".join([group] * len(chunk)))
+        params = tuple(value for row in chunk for value in row)
+        statements.append((sql, params))
+
+    first_sql, first_params = statements[0]
+    statements[0] = (CREATE_STAGE_SQL + first_sql, first_params)
+    last_sql, last_params = statements[-1]
+    statements[-1] = (last_sql + LOAD_SQL[mode], last_params)
+    return statements
+
+
+def bulk_upload_data(conn: Connection, data: list[tuple], size: int = None,
+                     mode: str = None) -> int:
+    """Uploads readings through the staging table in a single transaction.
+
+    In 'merge' mode readings already loaded by this warm container are dropped
+    first. Returns the number of rows inserted into plant_status, which the
+    last batch reports in the same round trip that moves them.
+    """
+    mode = mode or get_load_mode()
+    if mode == "merge":
+        fresh = skip_seen_readings(data)
+        if len(fresh) < len(data):
+            logging.info("Skipped %s unchanged readings.", len(data) - len(fresh))
+        data = fresh
+    if not data:
+        return 0
+    statements = build_stage_statements(data, size, mode)
+    with conn.cursor() as cursor:
+        for sql, params in statements:
+            cursor.execute(sql, params)
+        inserted = cursor.fetchone()[0]
+    conn.commit()
+    remember_readings(data)
+    logging.info("Bulk loaded %s of %s rows in %s round trips.",
+                 inserted, len(data), len(statements))
+    return inserted
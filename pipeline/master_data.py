@@ -0,0 +1,164 @@
+"""Registers botanists, plants and their origins that appear in the API but not the database."""
+# Built-in
+from os import path
+import logging
+import sys
+# Installed
+from pymssql import Connection, Error
+
+from quarantine import as_plant_id
+
+# seed_master_data is copied next to this file in the Lambda image; locally it
+# lives in the repository's schema directory.
+try:
+    import seed_master_data
+except ModuleNotFoundError:
+    sys.path.append(path.join(path.dirname(path.abspath(__file__)), "..", "schema"))
+    import seed_master_data
+
+PLANTS_PER_BATCH = 50
+
+COUNTRY_SQL = """
+    INSERT INTO country (country_code)
+    SELECT v.country_code
+    FROM (VALUES {values}) AS v(country_code)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM country AS co WHERE co.country_code = v.country_code);
+    """
+
+CITY_SQL = """
+    INSERT INTO city (city_name, country_id, time_zone)
+    SELECT v.city_name, co.country_id, v.time_zone
+    FROM (VALUES {values}) AS v(city_name, country_code, time_zone)
+    CROSS APPLY (
+        SELECT TOP 1 country_id FROM country
+        WHERE country_code = v.country_code ORDER BY country_id) AS co
+    WHERE NOT EXISTS (
+        SELECT 1 FROM city AS c WHERE c.city_name = v.city_name);
+    """
+
+ORIGIN_LOCATION_SQL = """
+    INSERT INTO origin_location (latitude, longitude, city_id)
+    SELECT v.latitude, v.longitude, c.city_id
+    FROM (VALUES {values}) AS v(latitude, longitude, city_name)
+    CROSS APPLY (
+        SELECT TOP 1 city_id FROM city
+        WHERE city_name = v.city_name ORDER BY city_id) AS c
+    WHERE NOT EXISTS (
+        SELECT 1 FROM origin_location AS ol
+        WHERE ROUND(ol.latitude, 3) = ROUND(v.latitude, 3)
+            AND ROUND(ol.longitude, 3) = ROUND(v.longitude, 3));
+    """
+
+PLANT_SQL = """
+    INSERT INTO plant
+        (plant_id, plant_name, plant_scientific_name, origin_location_id, image_link)
+    SELECT v.plant_id, v.plant_name, v.plant_scientific_name, ol.origin_location_id, v.image_link
+    FROM (VALUES {values})
+        AS v(plant_id, plant_name, plant_scientific_name, latitude, longitude, image_link)
+    CROSS APPLY (
+        SELECT TOP 1 origin_location_id FROM origin_location
+        WHERE ROUND(latitude, 3) = ROUND(v.latitude, 3)
+            AND ROUND(longitude, 3) = ROUND(v.longitude, 3)
+        ORDER BY origin_location_id) AS ol
+    WHERE NOT EXISTS (
+        SELECT 1 FROM plant AS p WHERE p.plant_id = v.plant_id);
+    """
+
+BOTANIST_SQL = """
+    INSERT INTO botanist (botanist_name, botanist_email, botanist_phone)
+    SELECT v.botanist_name, v.botanist_email, v.botanist_phone
+    FROM (VALUES {values}) AS v(botanist_name, botanist_email, botanist_phone)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM botanist AS b WHERE b.botanist_email = v.botanist_email);
+    """
+
+
+def find_unregistered(plants: list[dict], reference: dict) -> dict:
+    """Selects the API records whose plant or botanist is missing from the reference data.
+
+    Records without a usable plant_id or a complete origin location cannot be
+    registered and are skipped; the transform quarantines them.
+    """
+    unregistered = {}
+    for plant in plants:
+        plant_id = as_plant_id(plant.get("plant_id"))
+        if plant_id is None:
+            continue
+        email = (plant.get("botanist") or {}).get("email")
+        if plant_id in reference["plant_ids"] and (not email or email in reference["botanists"]):
+            continue
+        if len(plant.get("origin_location") or []) == 5:
+            unregistered[plant_id] = plant
+    return unregistered
+
+
+def values_statement(template: str, rows: list[tuple]) -> tuple[str, list]:
+    """Fills a `VALUES {values}` template with one placeholder group per row."""
+    if not rows:
+        return "", []
+    group = "(" + ", ".join(["%s"] * len(rows[0])) + ")"
+    params = [value for row in rows for value in row]
+    return template.format(values=", ".join([group] * len(rows))), params
+
+
+def build_registration_batch(api_data: dict) -> tuple[str, list]:
+    """Builds one T-SQL batch that inserts every missing master-data row.
+
+    The row tuples come from the seed_master_data extractors. Foreign keys are
+    resolved inside the batch by joining on natural keys (country code, city
+    name, rounded coordinates), so a single round trip covers every table.
+    """
+    countries = seed_master_data.extract_country_data(api_data)
+    cities = seed_master_data.extract_city_data(
+        api_data, {country[0]: country[0] for country in countries})
+    origins = seed_master_data.extract_origin_location_data(
+        api_data, {city[0]: city[0] for city in cities})
+    plants = seed_master_data.extract_plant_data(api_data, {})
+    botanists = seed_master_data.extract_botany_data(api_data)
+
+    coordinates = [plant.get("origin_location")[:2] for plant in api_data.values()]
+    plant_rows = [(plant_id, name, scientific_name, float(latitude), float(longitude), image_link)
+                  for (plant_id, name, scientific_name, _, image_link), (latitude, longitude)
+                  in zip(plants, coordinates)]
+    origin_rows = [(float(latitude), float(longitude), city_name)
+                   for latitude, longitude, city_name in origins]
+
+    sql, params = [], []
+    for template, rows in ((COUNTRY_SQL, countries), (CITY_SQL, cities),
+                           (ORIGIN_LOCATION_SQL, origin_rows), (PLANT_SQL, plant_rows),
+                           (BOTANIST_SQL, botanists)):
+        statement, statement_params = values_statement(template, rows)
+        sql.append(statement)
+        params.extend(statement_params)
+    return "".join(sql), params
+
+
+def register_master_data(conn: Connection, plants: list[dict], reference: dict) -> bool:
+    """Inserts any unknown botanists, plants and origins in one batch.
+
+    Batches hold at most PLANTS_PER_BATCH records, keeping them under SQL
+    Server's 2100 parameter limit; a normal run needs just one. Returns True
+    if anything was registered, meaning the reference data should be reloaded.
+    A failed batch is rolled back and logged; the affected readings are then
+    dropped by the transform step as before.
+    """
+    unregistered = find_unregistered(plants, reference)
+    if not unregistered:
+        return False
+    plant_ids = list(unregistered)
+    try:
+        with conn.cursor() as cursor:
+            for start in range(0, len(plant_ids), PLANTS_PER_BATCH):
+                chunk = {plant_id: unregistered[plant_id]
+                         for plant_id in plant_ids[start:start + PLANTS_PER_BATCH]}
+                sql, params = build_registration_batch(chunk)
+                cursor.execute(sql, tuple(params))
+        conn.commit()
+    except Error as error:
+        conn.rollback()
+        logging.error("Could not register master data for plants %s: %s",
+                      sorted(unregistered), error)
+        return False
+    logging.info("Registered master data for plants %s.", sorted(unregistered))
+    return True
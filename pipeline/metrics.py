@@ -0,0 +1,105 @@
+"""Per-run stage timers and counters, emitted once as a CloudWatch Embedded Metric Format record."""
+# Built-in
+from os import environ as ENV
+from collections import Counter
+from contextlib import contextmanager
+import json
+import time
+
+
+class RunMetrics:
+    """Collects stage timings (milliseconds) and counters for one handler invocation.
+
+    Timers accumulate, so a stage run once per micro-batch reports its total.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.timers = Counter()
+        self.counters = Counter()
+
+    @contextmanager
+    def timer(self, stage: str):
+        """Adds the time spent in the block to the stage's timer."""
+        started = self.clock()
+        try:
+            yield
+        finally:
+            self.timers[stage] += (self.clock() - started) * 1000
+
+    def count(self, counts: dict, prefix: str = ""):
+        """Adds each count, optionally prefixing its name."""
+        self.counters.update({f"{prefix}{name}": value for name, value in counts.items()})
+
+    def to_emf(self, namespace: str, dimensions: dict, timestamp: float = None) -> dict:
+        """Builds the Embedded Metric Format record for this run."""
+        timers = {f"{stage}_ms": round(value, 3) for stage, value in self.timers.items()}
+        metrics = ([{"Name": name, "Unit": "Milliseconds"} for name in timers] +
+                   [{"Name": name, "Unit": "Count"} for name in self.counters])
+        timestamp = time.time() if timestamp is None else timestamp
+        return {
+            "_aws": {
+                "Timestamp": int(timestamp * 1000),
+                "CloudWatchMetrics": [{"Namespace": namespace,
+                                       "Dimensions": [list(dimensions)],
+                                       "Metrics": metrics}]
+            },
+            **dimensions,
+            **timers,
+            **self.counters
+        }
+
+    def emit(self, dimensions: dict) -> dict:
+        """Prints the run's record to stdout, where Lambda ships it to CloudWatch as metrics."""
+        record = self.to_emf(ENV.get("METRICS_NAMESPACE", "LMNH/Pipeline"), dimensions)
+        print(json.dumps(record, separators=(",", ":")), flush=True)
+        return record
+
+
+class CountingCursor:
+    """Cursor proxy counting the statements sent to the database."""
+
+    def __init__(self, cursor, counters: Counter):
+        self.cursor = cursor
+        self.counters = counters
+
+    def __enter__(self):
+        self.cursor.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self.cursor.__exit__(*exc)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def execute(self, *args, **kwargs):
+        """One round trip."""
+        self.counters["db_round_trips"] += 1
+        return self.cursor.execute(*args, **kwargs)
+
+    def executemany(self, sql, rows, *args, **kwargs):
+        """pymssql sends one statement per row."""
+        rows = list(rows)
+        self.counters["db_round_trips"] += len(rows)
+        return self.cursor.executemany(sql, rows, *args, **kwargs)
+
+
+class CountingConnection:
+    """Connection proxy counting database round trips into `metrics`."""
+
+    def __init__(self, conn, metrics: RunMetrics):
+        self.conn = conn
+        self.metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def cursor(self, *args, **kwargs):
+        """A cursor whose statements are counted."""
+        return CountingCursor(self.conn.cursor(*args, **kwargs), self.metrics.counters)
+
+    def commit(self):
+        """Commits are a round trip of their own."""
+        self.metrics.counters["db_round_trips"] += 1
+        return self.conn.commit()
@@ -1,53 +1,37 @@
 # Built-in
-from os import environ as ENV
+from os import environ as ENV, path
 from datetime import datetime
-import asyncio
+from collections import Counter
 import logging
+import random
+import sys
 # Installed
-import requests as req
-import aiohttp
-from pymssql import connect, Connection
-from dotenv import load_dotenv
-
-from logger_config import setup_logging
-
-
-async def get_plant_data(session, url, plant_id: int) -> dict:
-    """Fetches plant data by plant_id."""
-    print(url, plant_id)
-    response = await session.get(url + str(plant_id))
-    plant = await response.json()
-    return plant
-
-
-async def extract_all_plant_data() -> list:
-    """Fetches all plant data and stores it in a list."""
-
-    url = 'https://data-eng-plants-api.herokuapp.com/plants/'
-
-    async with aiohttp.ClientSession() as session:
-        tasks = [get_plant_data(session, url, plant_id)
-                 for plant_id in range(50)]
-        logging.info("Extracted all plant data.")
-        plants = await asyncio.gather(*tasks)
-        return plants
-
-
-def get_connection():
-    """Makes a connection with the SQL Server database."""
-    connection = connect(
-        server=ENV["DB_HOST"],
-        port=ENV["DB_PORT"],
-        user=ENV["DB_USER"],
-        password=ENV["DB_PASSWORD"],
-        database=ENV["DB_NAME"]
-    )
-    logging.info("Established a secure connection to the database.")
-    return connection
+from pymssql import Connection
+
+from connections import (initialise, get_db_connection,
+                         reset_db_connection, run_async, get_http_session)
+from plants_api import get_extract_settings, get_extract_deadline
+from plant_ids import extract_discovered_plant_data
+from reference_data import get_reference_data, invalidate_reference_data
+from master_data import register_master_data
+from loader import bulk_upload_data
+from batch_transform import transform_batch
+from quarantine import quarantine_rejected
+from streaming import stream_pipeline
+from metrics import RunMetrics, CountingConnection
+
+# logger_config is copied next to this file in the Lambda image; locally it
+# lives in the repository's shared directory.
+try:
+    from logger_config import flush_logging
+except ModuleNotFoundError:
+    sys.path.append(path.join(path.dirname(path.abspath(__file__)), "..", "shared"))
+    from logger_config import flush_logging
 
 
 def fetch_latest_plant_status(url: str, plant_id: int) -> dict:
     """Fetches the latest plant status from the API."""
+    import requests as req  # pylint: disable=import-outside-toplevel
     response = req.get(f"{url}{plant_id}")
     if response.status_code == 200:
         return response.json()
@@ -69,9 +53,11 @@ def validate_temperature(temperature: float) -> float:
     return temperature if temperature is not None and -50 <= temperature <= 50 else None
 
 
-def validate_and_transform(data: dict, conn) -> tuple:
-    """Validates and transforms the API response into a format suitable for the database."""
-    plant_id = int(data.get("plant_id"))
+def validate_and_transform(data: dict, botanist_map: dict, plant_ids: set = None) -> tuple:
+    """Validates and transforms the API response into a format suitable for the database.
+
+    When `plant_ids` is given, readings for plants not in it are dropped.
+    """
     plant_id = int(data.get("plant_id"))
     recording_taken = parse_datetime(
         data.get("recording_taken"), "%Y-%m-%d %H:%M:%S")
@@ -81,15 +67,11 @@ def validate_and_transform(data: dict, conn) -> tuple:
         data.get("last_watered"), "%a, %d %b %Y %H:%M:%S %Z")
 
     botanist_email = data.get("botanist", {}).get("email")
-
-    cursor = conn.cursor()
-    cursor.execute("SELECT botanist_email, botanist_id FROM botanist")
-    botanist_map = {row[0]: row[1] for row in cursor.fetchall()}
-    cursor.close()
-
     botanist_id = botanist_map.get(botanist_email)
 
-    if not all([soil_moisture, temperature, last_watered]) or None in (botanist_id, plant_id, recording_taken):
+    if None in (soil_moisture, temperature, last_watered, botanist_id, plant_id, recording_taken):
+        return None
+    if plant_ids is not None and plant_id not in plant_ids:
         return None
 
     return (botanist_id, plant_id, recording_taken, soil_moisture, temperature, last_watered)
@@ -105,25 +87,91 @@ def upload_data(conn: Connection, data: list[tuple]):
     conn.commit()
 
 
+def log_payload_sample(plants: list[dict]):
+    """Logs a random sample of the raw payloads, only when debug logging is on."""
+    if not logging.getLogger().isEnabledFor(logging.DEBUG):
+        return
+    size = min(int(ENV.get("PAYLOAD_LOG_SAMPLE", 5)), len(plants))
+    for plant in random.sample(plants, size):
+        logging.debug("Plant payload: %s", plant)
+
+
+def process_plants(conn: Connection, plants: list[dict],
+                   metrics: RunMetrics = None) -> Counter:
+    """Registers, transforms, loads and quarantines one batch of API payloads.
+
+    Each stage is timed into `metrics`, along with the fetched, transformed,
+    inserted and rejected counts, which are also returned.
+    """
+    metrics = metrics or RunMetrics()
+    log_payload_sample(plants)
+    emails = {plant.get("botanist", {}).get("email") for plant in plants}
+    with metrics.timer("reference"):
+        reference = get_reference_data(conn, botanist_emails=emails - {None})
+    with metrics.timer("register"):
+        if register_master_data(conn, plants, reference):
+            invalidate_reference_data()
+            reference = get_reference_data(conn)
+    with metrics.timer("transform"):
+        data, rejected = transform_batch(
+            plants, reference["botanists"], reference["plant_ids"])
+    with metrics.timer("load"):
+        inserted = bulk_upload_data(conn, data)
+    with metrics.timer("quarantine"):
+        reasons = quarantine_rejected(conn, rejected)
+    totals = Counter(fetched=len(plants), transformed=len(data),
+                     inserted=inserted, rejected=len(rejected))
+    metrics.count(totals)
+    metrics.count(reasons, prefix="rejected_")
+    return totals
+
+
+def get_pipeline_mode() -> str:
+    """'batch' extracts everything before loading, 'stream' loads while extracting."""
+    return ENV.get("PIPELINE_MODE", "batch")
+
+
+async def extract_plants(settings: dict, stats: Counter) -> list[dict]:
+    """Fetches every discovered plant through the warm HTTP session."""
+    return await extract_discovered_plant_data(
+        settings, stats, session=get_http_session(settings))
+
+
+async def stream_plants(settings: dict, stats: Counter, conn: Connection,
+                        metrics: RunMetrics = None) -> Counter:
+    """Streams plants through the warm HTTP session into micro-batched loads."""
+    return await stream_pipeline(settings, lambda batch: process_plants(conn, batch, metrics),
+                                 stats, session=get_http_session(settings))
+
+
 def handler(event, context):
-    load_dotenv()
-    setup_logging("console")
-    plants = asyncio.run(extract_all_plant_data())
-
-    data = []
-    conn = get_connection()
-    _ = [logging.info("Plant data %s: %s", i, plant)
-         for i, plant in enumerate(plants)]
-    for plant in plants:
-        transformed_entry = validate_and_transform(plant, conn)
-        if transformed_entry is not None:
-            data.append(transformed_entry)
-            logging.info("Transformed plant data: %s", transformed_entry)
-    upload_data(conn, data)
-    logging.info("Plant data successfully uploaded to database.")
-    conn.close()
+    initialise()
+    settings = get_extract_settings()
+    settings["deadline"] = get_extract_deadline(context, settings)
+    fetch_stats = Counter()
+    metrics = RunMetrics()
+    mode = get_pipeline_mode()
+
+    try:
+        with metrics.timer("total"):
+            with metrics.timer("connect"):
+                conn = CountingConnection(get_db_connection(), metrics)
+            if mode == "stream":
+                totals = run_async(stream_plants(settings, fetch_stats, conn, metrics))
+                metrics.count({"batches": totals["batches"]})
+            else:
+                with metrics.timer("extract"):
+                    plants = run_async(extract_plants(settings, fetch_stats))
+                process_plants(conn, plants, metrics)
+    except Exception:
+        metrics.count({"failed": 1})
+        reset_db_connection()
+        raise
+    finally:
+        metrics.count(fetch_stats, prefix="api_")
+        metrics.emit({"Service": "pipeline", "Mode": mode})
+        flush_logging()
     return "Upload complete!"
 
-
 if __name__ == "__main__":
     handler(None, None)
@@ -0,0 +1,138 @@
+"""Learns which plant IDs the API serves, so each run only requests useful IDs."""
+# Built-in
+from os import environ as ENV, path, replace
+from collections import Counter
+import asyncio
+import json
+import logging
+import time
+
+from plants_api import extract_all_plant_data, stream_plant_data
+
+BOOTSTRAP_IDS = range(50)
+
+
+def get_discovery_settings() -> dict:
+    """Reads the ID discovery parameters from the environment."""
+    return {
+        "state_path": ENV.get("PLANT_ID_STATE_PATH", "/tmp/plant_ids.json"),
+        "max_misses": int(ENV.get("PLANT_ID_MAX_MISSES", 5)),
+        "dead_ttl": float(ENV.get("PLANT_ID_DEAD_TTL", 3600))
+    }
+
+
+def new_state() -> dict:
+    """An empty discovery state."""
+    return {"live_ids": [], "dead_ids": {}}
+
+
+def load_state(state_path: str) -> dict:
+    """Loads the discovery state saved by a previous invocation."""
+    if not path.exists(state_path):
+        return new_state()
+    try:
+        with open(state_path, "r", encoding="utf-8") as file:
+            state = json.load(file)
+    except (OSError, ValueError) as error:
+        logging.warning("Ignoring unreadable plant ID state %s: %s",
+                        state_path, error)
+        return new_state()
+    return {"live_ids": [int(plant_id) for plant_id in state.get("live_ids", [])],
+            "dead_ids": {int(plant_id): expires_at
+                         for plant_id, expires_at in state.get("dead_ids", {}).items()}}
+
+
+def save_state(state: dict, state_path: str):
+    """Writes the discovery state atomically, so a killed run never leaves half a file."""
+    temp_path = state_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump({"live_ids": sorted(state["live_ids"]),
+                   "dead_ids": {str(plant_id): expires_at
+                                for plant_id, expires_at in state["dead_ids"].items()}},
+                  file)
+    replace(temp_path, state_path)
+
+
+def is_dead(state: dict, plant_id: int, now: float) -> bool:
+    """Checks whether an ID is cached as not existing."""
+    return state["dead_ids"].get(plant_id, 0) > now
+
+
+def probe_window(state: dict, start: int, max_misses: int, now: float) -> list[int]:
+    """The `max_misses` IDs from `start` that are not cached as dead."""
+    return [plant_id for plant_id in range(start, start + max_misses)
+            if not is_dead(state, plant_id, now)]
+
+
+def plan_plant_ids(state: dict, max_misses: int, now: float) -> tuple[list[int], list[int]]:
+    """Chooses which IDs to request this run.
+
+    Returns the IDs up to the highest live ID that are not cached as dead, plus
+    a probe window of up to `max_misses` IDs past it. Dead IDs are re-checked
+    once their entry expires. With no state yet, the bootstrap range is used.
+    """
+    candidates = range(max(state["live_ids"]) + 1) if state["live_ids"] else BOOTSTRAP_IDS
+    known = [plant_id for plant_id in candidates if not is_dead(state, plant_id, now)]
+    top = max([*known, *state["live_ids"]], default=-1)
+    return known, probe_window(state, top + 1, max_misses, now)
+
+
+def update_state(state: dict, found: set, missing: set, dead_ttl: float, now: float):
+    """Records which IDs answered and which the API says do not exist.
+
+    IDs that failed for any other reason (timeouts, server errors) keep their
+    previous status. Expired dead entries are dropped.
+    """
+    state["live_ids"] = sorted((set(state["live_ids"]) | found) - missing)
+    for plant_id in missing:
+        state["dead_ids"][plant_id] = now + dead_ttl
+    state["dead_ids"] = {plant_id: expires_at
+                         for plant_id, expires_at in state["dead_ids"].items()
+                         if expires_at > now and plant_id not in found}
+
+
+async def extract_discovered_plant_data(settings: dict, stats: Counter = None,
+                                        discovery: dict = None,
+                                        sink: asyncio.Queue = None,
+                                        session=None) -> list[dict]:
+    """Fetches the plants the API is known to serve, probing past the highest ID.
+
+    Probing continues in windows of `max_misses` IDs until a whole window comes
+    back empty, so a batch of new plants is picked up within a single run.
+    When `sink` is given the payloads are streamed onto it as they arrive and
+    an empty list is returned. A long-lived aiohttp `session` is reused if given.
+    """
+    discovery = discovery or get_discovery_settings()
+    stats = Counter() if stats is None else stats
+    state = load_state(discovery["state_path"])
+    started = time.monotonic()
+
+    known, window = plan_plant_ids(state, discovery["max_misses"], time.time())
+    plant_ids = known + window
+    plants, found, missing = [], set(), set()
+    while plant_ids:
+        remaining = settings["deadline"] - (time.monotonic() - started)
+        if remaining <= 0:
+            break
+        batch_settings = {**settings, "deadline": remaining}
+        if sink is None:
+            plants.extend(await extract_all_plant_data(
+                plant_ids, batch_settings, stats, missing=missing, session=session,
+                found=found))
+        else:
+            found.update(await stream_plant_data(
+                plant_ids, batch_settings, sink, stats, missing=missing, session=session))
+        if not found.intersection(window):
+            break
+        window = probe_window(state, max(found) + 1,
+                              discovery["max_misses"], time.time())
+        plant_ids = window
+
+    update_state(state, found, missing, discovery["dead_ttl"], time.time())
+    try:
+        save_state(state, discovery["state_path"])
+    except OSError as error:
+        logging.warning("Could not save plant ID state: %s", error)
+    logging.info("Plant ID discovery: %s live, %s dead.",
+                 len(state["live_ids"]), len(state["dead_ids"]))
+    return plants
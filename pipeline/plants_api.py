@@ -0,0 +1,253 @@
+"""Asynchronous extraction of plant readings from the LMNH plants API."""
+# Built-in
+from os import environ as ENV
+from collections import Counter
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+import time
+# Installed
+import aiohttp
+# Local
+from api_retry import (CircuitBreaker, CircuitOpenError,
+                       RetryPolicy, RETRY_STATUSES, get_retry_settings)
+
+API_URL = "https://data-eng-plants-api.herokuapp.com/plants/"
+DEFAULT_PLANT_IDS = range(50)
+
+
+def get_extract_settings() -> dict:
+    """Reads the extraction tuning parameters from the environment."""
+    return {
+        "api_url": ENV.get("PLANTS_API_URL", API_URL),
+        "max_concurrency": int(ENV.get("EXTRACT_MAX_CONCURRENCY", 25)),
+        "connection_limit": int(ENV.get("EXTRACT_CONNECTION_LIMIT", 25)),
+        "dns_cache_ttl": int(ENV.get("EXTRACT_DNS_CACHE_TTL", 300)),
+        "keepalive_timeout": float(ENV.get("EXTRACT_KEEPALIVE_TIMEOUT", 75)),
+        "connect_timeout": float(ENV.get("EXTRACT_CONNECT_TIMEOUT", 3)),
+        "request_timeout": float(ENV.get("EXTRACT_REQUEST_TIMEOUT", 8)),
+        "deadline": float(ENV.get("EXTRACT_DEADLINE", 40)),
+        **get_retry_settings()
+    }
+
+
+def make_session(settings: dict) -> aiohttp.ClientSession:
+    """Creates a client session with a bounded, keep-alive connection pool."""
+    connector = aiohttp.TCPConnector(
+        limit=settings["connection_limit"],
+        ttl_dns_cache=settings["dns_cache_ttl"],
+        keepalive_timeout=settings["keepalive_timeout"]
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=settings["request_timeout"],
+        connect=settings["connect_timeout"]
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+@asynccontextmanager
+async def session_scope(settings: dict, session: aiohttp.ClientSession = None):
+    """Uses the given long-lived session, or a new one closed on exit."""
+    if session is not None:
+        yield session
+        return
+    async with make_session(settings) as new_session:
+        yield new_session
+
+
+async def fetch_json(session: aiohttp.ClientSession, url: str,
+                     semaphore: asyncio.Semaphore, policy: RetryPolicy) -> dict | None:
+    """GETs a JSON document, retrying transient failures with jittered backoff.
+
+    Returns None when the API answers 404. Raises the last error once the
+    retries, the retry budget or the deadline run out, and CircuitOpenError
+    when the breaker is refusing calls.
+    """
+    attempt = 0
+    while True:
+        if not policy.breaker.allow_request():
+            policy.stats["circuit_rejected"] += 1
+            raise CircuitOpenError(url)
+        policy.stats["requests"] += 1
+        try:
+            async with semaphore:
+                async with session.get(url) as response:
+                    if response.status == 404:
+                        policy.breaker.record_success()
+                        policy.stats["not_found"] += 1
+                        return None
+                    if response.status in RETRY_STATUSES:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, response.history,
+                            status=response.status, message=response.reason)
+                    response.raise_for_status()
+                    payload = await response.json(content_type=None)
+        except asyncio.TimeoutError as error:
+            policy.stats["timeouts"] += 1
+            last_error = error
+        except aiohttp.ClientResponseError as error:
+            if error.status not in RETRY_STATUSES:
+                policy.breaker.record_success()
+                raise
+            policy.stats["server_errors"] += 1
+            last_error = error
+        except aiohttp.ClientError as error:
+            policy.stats["connection_errors"] += 1
+            last_error = error
+        else:
+            policy.breaker.record_success()
+            return payload
+
+        policy.breaker.record_failure()
+        delay = policy.backoff(attempt)
+        if not policy.can_retry(attempt, delay):
+            raise last_error
+        policy.stats["retries"] += 1
+        attempt += 1
+        await asyncio.sleep(delay)
+
+
+class ErrorPayloadError(ValueError):
+    """Raised when the API answers with an error payload instead of a reading."""
+
+
+async def get_plant_data(session: aiohttp.ClientSession, url: str, plant_id: int,
+                         semaphore: asyncio.Semaphore, policy: RetryPolicy) -> dict | None:
+    """Fetches plant data by plant_id, returning None only if the API 404s on it.
+
+    An error payload raises ErrorPayloadError, so the plant is counted as
+    failed for this run rather than as not existing. Readings that are merely
+    malformed, such as one without a plant_id, are returned for the transform
+    to quarantine.
+    """
+    plant = await fetch_json(session, f"{url}{plant_id}", semaphore, policy)
+    if plant is None:
+        return None
+    if not isinstance(plant, dict) or "error" in plant:
+        policy.stats["error_payloads"] += 1
+        raise ErrorPayloadError(f"Plant {plant_id} returned an error payload: {plant}")
+    if "plant_id" not in plant:
+        policy.stats["malformed_payloads"] += 1
+    return plant
+
+
+API_BREAKER = CircuitBreaker()
+
+
+async def extract_all_plant_data(plant_ids=None, settings: dict = None,
+                                 stats: Counter = None,
+                                 breaker: CircuitBreaker = None,
+                                 missing: set = None,
+                                 session: aiohttp.ClientSession = None,
+                                 found: set = None) -> list[dict]:
+    """Fetches all plant data, returning whatever completed before the deadline.
+
+    Requests are limited to `max_concurrency` at a time and share one connection
+    pool. Any request still running when `deadline` seconds have passed is
+    cancelled, so a single slow plant can no longer hold up the whole run.
+    Request, retry and timeout counts are added to `stats` when it is given,
+    IDs the API reports as not existing are added to `missing` and IDs that
+    returned a reading to `found`. A long-lived `session` is reused if given.
+    """
+    settings = settings or get_extract_settings()
+    plant_ids = DEFAULT_PLANT_IDS if plant_ids is None else plant_ids
+    stats = Counter() if stats is None else stats
+    policy = RetryPolicy(settings, breaker or API_BREAKER, stats,
+                         time.monotonic() + settings["deadline"])
+    semaphore = asyncio.Semaphore(settings["max_concurrency"])
+    url = settings.get("api_url", API_URL)
+
+    async with session_scope(settings, session) as session:
+        tasks = {plant_id: asyncio.create_task(
+            get_plant_data(session, url, plant_id, semaphore, policy))
+            for plant_id in plant_ids}
+        if not tasks:
+            return []
+        _, pending = await asyncio.wait(tasks.values(),
+                                        timeout=settings["deadline"])
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    plants = []
+    for plant_id, task in tasks.items():
+        if task.cancelled():
+            continue
+        if task.exception() is not None:
+            stats["failed"] += 1
+            logging.warning("Failed to fetch plant %s: %r",
+                            plant_id, task.exception())
+            continue
+        if task.result() is not None:
+            plants.append(task.result())
+            if found is not None:
+                found.add(plant_id)
+        elif missing is not None:
+            missing.add(plant_id)
+
+    stats["fetched"] += len(plants)
+    stats["deadline_cancelled"] += len(pending)
+    if pending:
+        logging.warning("Extract deadline of %ss reached, %s of %s plants not fetched.",
+                        settings["deadline"], len(pending), len(tasks))
+    logging.info("Extracted %s plants.", len(plants))
+    return plants
+
+
+async def stream_plant_data(plant_ids, settings: dict, sink: asyncio.Queue,
+                            stats: Counter = None, breaker: CircuitBreaker = None,
+                            missing: set = None,
+                            session: aiohttp.ClientSession = None) -> set:
+    """Fetches plants with a fixed pool of workers, putting each payload on `sink` as it arrives.
+
+    Only `max_concurrency` fetches exist at any time and `sink` should be
+    bounded, so memory stays flat however many IDs are requested and a slow
+    consumer slows the fetches down. Workers still running at the deadline are
+    cancelled. Returns the IDs that were fetched.
+    """
+    stats = Counter() if stats is None else stats
+    policy = RetryPolicy(settings, breaker or API_BREAKER, stats,
+                         time.monotonic() + settings["deadline"])
+    semaphore = asyncio.Semaphore(settings["max_concurrency"])
+    url = settings.get("api_url", API_URL)
+    remaining_ids = iter(plant_ids)
+    found = set()
+
+    async def worker(session: aiohttp.ClientSession):
+        for plant_id in remaining_ids:
+            try:
+                plant = await get_plant_data(session, url, plant_id, semaphore, policy)
+            except (aiohttp.ClientError, asyncio.TimeoutError,
+                    CircuitOpenError, ValueError) as error:
+                stats["failed"] += 1
+                logging.warning("Failed to fetch plant %s: %r", plant_id, error)
+                continue
+            if plant is None:
+                if missing is not None:
+                    missing.add(plant_id)
+                continue
+            found.add(plant_id)
+            await sink.put(plant)
+
+    async with session_scope(settings, session) as session:
+        workers = [asyncio.create_task(worker(session))
+                   for _ in range(settings["max_concurrency"])]
+        _, pending = await asyncio.wait(workers, timeout=settings["deadline"])
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    stats["fetched"] += len(found)
+    if pending:
+        stats["deadline_cancelled"] += len(pending)
+        logging.warning("Extract deadline of %ss reached while streaming.",
+                        settings["deadline"])
+    return found
+
+
+def get_extract_deadline(context, settings: dict, reserve: float = 15) -> float:
+    """Caps the extract deadline so transform and load still fit in the Lambda timeout."""
+    if context is None or not hasattr(context, "get_remaining_time_in_millis"):
+        return settings["deadline"]
+    remaining = context.get_remaining_time_in_millis() / 1000 - reserve
+    return max(1.0, min(settings["deadline"], remaining))
@@ -0,0 +1,64 @@
+"""Keeps rejected API readings, with the reason they were rejected, for data-quality reporting."""
+# Built-in
+from collections import Counter
+import json
+import logging
+# Installed
+from pymssql import Connection
+
+from loader import chunk_rows, rows_per_statement
+
+QUARANTINE_SQL = """
+    INSERT INTO plant_status_rejected (plant_id, reason, recording_taken, payload)
+    SELECT incoming.plant_id, incoming.reason, incoming.recording_taken, incoming.payload
+    FROM (VALUES {values}) AS incoming (plant_id, reason, recording_taken, payload)
+    WHERE NOT EXISTS (
+        SELECT 1
+        FROM plant_status_rejected AS existing WITH (UPDLOCK, HOLDLOCK)
+        WHERE existing.reason = incoming.reason
+            AND existing.recording_taken = incoming.recording_taken
+            AND (existing.plant_id = incoming.plant_id
+                 OR (existing.plant_id IS NULL AND incoming.plant_id IS NULL)));
+    """
+
+
+def as_plant_id(value) -> int | None:
+    """The payload's plant_id as an int, or None if it is missing or malformed."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def quarantine_rows(rejected: list[dict]) -> list[tuple]:
+    """Builds plant_status_rejected rows from the transform's rejection report.
+
+    Only the first rejection of each (plant_id, recording_taken, reason) is kept.
+    """
+    rows = {}
+    for entry in rejected:
+        row = (as_plant_id(entry["payload"].get("plant_id")),
+               entry["reason"],
+               str(entry["payload"].get("recording_taken"))[:30],
+               json.dumps(entry["payload"], default=str, separators=(",", ":")))
+        rows.setdefault(row[:3], row)
+    return list(rows.values())
+
+
+def quarantine_rejected(conn: Connection, rejected: list[dict]) -> Counter:
+    """Writes every rejected reading in one committed batch and returns counts per reason.
+
+    The API serves the same bad reading every minute until it changes, so a
+    reading already quarantined for the same reason is not inserted again.
+    """
+    reasons = Counter(entry["reason"] for entry in rejected)
+    if not rejected:
+        return reasons
+    rows = quarantine_rows(rejected)
+    with conn.cursor() as cursor:
+        for chunk in chunk_rows(rows, rows_per_statement(4)):
+            sql = QUARANTINE_SQL.format(values=", ".join(["(%s, %s, %s, %s)"] * len(chunk)))
+            cursor.execute(sql, tuple(value for row in chunk for value in row))
+    conn.commit()
+    logging.info("Quarantined %s readings: %s", len(rejected), dict(reasons))
+    return reasons
@@ -0,0 +1,55 @@
+"""Caches the botanist and plant lookup tables between rows, runs and warm invocations."""
+# Built-in
+from os import environ as ENV
+import logging
+import time
+
+REFERENCE_QUERY = """
+    SELECT botanist_email, botanist_id FROM botanist;
+    SELECT plant_id FROM plant;
+    """
+
+_CACHE = {"loaded_at": None, "botanists": {}, "plant_ids": set()}
+
+
+def get_reference_ttl() -> float:
+    """Seconds a loaded copy of the reference tables stays valid."""
+    return float(ENV.get("REFERENCE_TTL", 900))
+
+
+def load_reference_data(conn) -> dict:
+    """Loads the botanist email->id map and the known plant IDs in one round trip."""
+    with conn.cursor() as cursor:
+        cursor.execute(REFERENCE_QUERY)
+        botanists = {row[0]: row[1] for row in cursor.fetchall()}
+        cursor.nextset()
+        plant_ids = {row[0] for row in cursor.fetchall()}
+    logging.info("Loaded %s botanists and %s plants from the database.",
+                 len(botanists), len(plant_ids))
+    return {"botanists": botanists, "plant_ids": plant_ids}
+
+
+def invalidate_reference_data():
+    """Forces the next lookup to reload the reference tables."""
+    _CACHE["loaded_at"] = None
+
+
+def get_reference_data(conn, botanist_emails=(), plant_ids=(),
+                       ttl: float = None, now: float = None) -> dict:
+    """Returns the cached reference tables, reloading them at most once per call.
+
+    The cache is reloaded when it is older than `ttl` seconds or when any of the
+    given botanist emails or plant IDs is not in it, so a new botanist is picked
+    up on the next run without a query for every row.
+    """
+    ttl = get_reference_ttl() if ttl is None else ttl
+    now = time.monotonic() if now is None else now
+
+    stale = _CACHE["loaded_at"] is None or now - _CACHE["loaded_at"] > ttl
+    unknown = (set(botanist_emails) - set(_CACHE["botanists"])
+               or set(plant_ids) - _CACHE["plant_ids"])
+    if stale or unknown:
+        if unknown and not stale:
+            logging.info("Reloading reference data for unknown keys: %s", unknown)
+        _CACHE.update(load_reference_data(conn), loaded_at=now)
+    return {"botanists": _CACHE["botanists"], "plant_ids": _CACHE["plant_ids"]}
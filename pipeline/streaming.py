@@ -0,0 +1,88 @@
+"""Streams fetched plants into micro-batched transform-and-load while extraction continues."""
+# Built-in
+from os import environ as ENV
+from collections import Counter
+import asyncio
+import logging
+import time
+
+from plant_ids import extract_discovered_plant_data
+
+END_OF_STREAM = None
+
+
+def get_stream_settings() -> dict:
+    """Reads the micro-batch flush thresholds from the environment."""
+    return {
+        "batch_size": int(ENV.get("STREAM_BATCH_SIZE", 200)),
+        "flush_interval": float(ENV.get("STREAM_FLUSH_INTERVAL", 2))
+    }
+
+
+async def next_batch(queue: asyncio.Queue, batch_size: int,
+                     flush_interval: float) -> tuple[list[dict], bool]:
+    """Collects plants until the batch is full or `flush_interval` has passed since the first.
+
+    Returns the batch and whether the end of the stream was reached.
+    """
+    batch = []
+    first = await queue.get()
+    if first is END_OF_STREAM:
+        return batch, True
+    batch.append(first)
+    flush_at = time.monotonic() + flush_interval
+    while len(batch) < batch_size:
+        try:
+            plant = await asyncio.wait_for(queue.get(),
+                                           max(0, flush_at - time.monotonic()))
+        except asyncio.TimeoutError:
+            return batch, False
+        if plant is END_OF_STREAM:
+            return batch, True
+        batch.append(plant)
+    return batch, False
+
+
+async def stream_pipeline(settings: dict, process, stats: Counter = None,
+                          stream_settings: dict = None, session=None) -> Counter:
+    """Runs extraction and loading concurrently.
+
+    Fetched plants flow through a bounded queue and are handed to `process` in
+    micro-batches, flushed by size or by time. `process` does the blocking
+    database work in a worker thread, so fetching continues meanwhile. It is
+    given a list of payloads and returns a Counter, and the Counters of all
+    batches are summed into the result.
+    """
+    stream_settings = stream_settings or get_stream_settings()
+    queue = asyncio.Queue(maxsize=stream_settings["batch_size"] * 2)
+    totals = Counter()
+
+    async def produce():
+        cancelled = False
+        try:
+            await extract_discovered_plant_data(settings, stats, sink=queue,
+                                                session=session)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            # Nobody is consuming once cancelled, so a put could block forever.
+            if not cancelled:
+                await queue.put(END_OF_STREAM)
+
+    producer = asyncio.create_task(produce())
+    try:
+        finished = False
+        while not finished:
+            batch, finished = await next_batch(queue, stream_settings["batch_size"],
+                                               stream_settings["flush_interval"])
+            if batch:
+                totals += await asyncio.to_thread(process, batch)
+                totals["batches"] += 1
+        await producer
+    finally:
+        # A failed batch must not leave the producer running on the shared loop.
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+    logging.info("Streamed %s batches: %s", totals["batches"], dict(totals))
+    return totals
@@ -0,0 +1,54 @@
+"""Tests for the shared plants API retry policy and its synchronous client."""
+from unittest.mock import patch, MagicMock
+from collections import Counter
+
+import pytest
+import requests
+
+from api_retry import RetryPolicy, CircuitBreaker, CircuitOpenError, get_json, get_retry_settings
+
+SETTINGS = {"max_retries": 3, "retry_budget": 50, "backoff_base": 0.01, "backoff_cap": 0.1}
+
+
+@patch("api_retry.time.sleep")
+@patch("requests.get")
+def test_get_json_retries_transient_failures(mock_get, mock_sleep):
+    """A timeout and a 503 are retried before the JSON body is returned."""
+    ok = MagicMock(status_code=200)
+    ok.json.return_value = {"plant_id": 1}
+    mock_get.side_effect = [requests.Timeout(), MagicMock(status_code=503), ok]
+    stats = Counter()
+
+    assert get_json("http://api/1", RetryPolicy(SETTINGS, CircuitBreaker(), stats)) == {
+        "plant_id": 1}
+    assert stats["timeouts"] == 1 and stats["server_errors"] == 1 and stats["retries"] == 2
+    assert mock_sleep.call_count == 2
+
+
+@patch("requests.get", return_value=MagicMock(status_code=404))
+def test_get_json_returns_none_for_missing_plants(mock_get):
+    """A 404 is an answer, not a failure, so it is neither retried nor counted by the breaker."""
+    breaker = CircuitBreaker(failure_threshold=1)
+    assert get_json("http://api/99", RetryPolicy(SETTINGS, breaker, Counter())) is None
+    assert mock_get.call_count == 1
+    assert breaker.state == "closed"
+
+
+@patch("api_retry.time.sleep")
+@patch("requests.get", return_value=MagicMock(status_code=500))
+def test_get_json_shares_the_breaker_and_budget(mock_get, mock_sleep):
+    """Once the breaker opens, later requests of the run fail without calling the API."""
+    policy = RetryPolicy({**SETTINGS, "retry_budget": 1}, CircuitBreaker(failure_threshold=2),
+                         Counter())
+    with pytest.raises(requests.HTTPError):
+        get_json("http://api/1", policy)
+    assert policy.stats["retries"] == 1
+    with pytest.raises(CircuitOpenError):
+        get_json("http://api/2", policy)
+    assert mock_get.call_count == 2
+
+
+def test_get_retry_settings(monkeypatch):
+    """The retry limits come from the same variables as the async extractor's."""
+    monkeypatch.setenv("EXTRACT_MAX_RETRIES", "5")
+    assert get_retry_settings()["max_retries"] == 5
@@ -0,0 +1,61 @@
+"""Tests for the column-wise batch transform."""
+from datetime import datetime
+
+import pytest
+
+from batch_transform import transform_batch
+from pipeline import validate_and_transform
+
+
+@pytest.fixture
+def payload():
+    """A valid API payload."""
+    return {
+        "botanist": {"email": "gertrude.jekyll@lnhm.co.uk", "name": "Gertrude Jekyll"},
+        "last_watered": "Mon, 03 Feb 2025 13:54:32 GMT",
+        "name": "Venus flytrap",
+        "plant_id": 1,
+        "recording_taken": "2025-02-03 16:28:40",
+        "soil_moisture": 90.8972845511811,
+        "temperature": 12.0375669599007
+    }
+
+
+@pytest.fixture
+def botanist_map():
+    """Botanist email->id map."""
+    return {"gertrude.jekyll@lnhm.co.uk": 2}
+
+
+def test_transform_batch_matches_per_record_transform(payload, botanist_map):
+    """Valid rows come out exactly as validate_and_transform builds them."""
+    payloads = [payload, {**payload, "plant_id": 2, "temperature": -3.5}]
+    rows, rejected = transform_batch(payloads, botanist_map, {1, 2})
+    assert rows == [validate_and_transform(p, botanist_map) for p in payloads]
+    assert rows[0] == (2, 1, datetime(2025, 2, 3, 16, 28, 40), 90.8972845511811,
+                       12.0375669599007, datetime(2025, 2, 3, 13, 54, 32))
+    assert all(type(value) is int for value in rows[0][:2])
+    assert rejected == []
+
+
+@pytest.mark.parametrize("change, reason", [
+    ({"plant_id": None}, "missing_plant_id"),
+    ({"plant_id": 99}, "unknown_plant"),
+    ({"recording_taken": "yesterday"}, "bad_recording_taken"),
+    ({"last_watered": None}, "bad_last_watered"),
+    ({"soil_moisture": 101}, "soil_moisture_out_of_range"),
+    ({"temperature": None}, "temperature_out_of_range"),
+    ({"botanist": {"email": "new@lnhm.co.uk"}}, "unknown_botanist"),
+    ({"plant_id": 99, "temperature": 80}, "unknown_plant"),
+])
+def test_transform_batch_reports_reasons(payload, botanist_map, change, reason):
+    """Each rejected payload is reported with the first check it fails."""
+    bad = {**payload, **change}
+    rows, rejected = transform_batch([payload, bad], botanist_map, {1})
+    assert len(rows) == 1
+    assert rejected == [{"reason": reason, "payload": bad}]
+
+
+def test_transform_batch_empty(botanist_map):
+    """An empty batch transforms to nothing."""
+    assert transform_batch([], botanist_map) == ([], [])
@@ -0,0 +1,52 @@
+"""Tests for the warm connection manager."""
+from unittest.mock import patch, MagicMock
+
+import pytest
+from pymssql import Error
+
+import connections
+from connections import get_db_connection, reset_db_connection, run_async, get_http_session
+
+
+@pytest.fixture(autouse=True)
+def cold_container():
+    """Each test starts as a cold Lambda container."""
+    connections._STATE.update(conn=None, loop=None, session=None)  # pylint: disable=protected-access
+    yield
+    reset_db_connection()
+
+
+@patch("connections.get_connection")
+def test_healthy_connection_is_reused(mock_get_connection):
+    """A second invocation reuses the connection after a cheap health check."""
+    first = get_db_connection()
+    second = get_db_connection()
+    assert first is second
+    mock_get_connection.assert_called_once()
+    first.cursor.return_value.__enter__.return_value.execute.assert_called_with("SELECT 1")
+
+
+@patch("connections.get_connection")
+def test_unhealthy_connection_is_replaced(mock_get_connection):
+    """A connection that fails the health check is closed and replaced."""
+    broken, fresh = MagicMock(), MagicMock()
+    broken.cursor.return_value.__enter__.return_value.execute.side_effect = Error("gone")
+    mock_get_connection.side_effect = [broken, fresh]
+    get_db_connection()
+    assert get_db_connection() is fresh
+    broken.close.assert_called_once()
+
+
+def test_http_session_survives_between_invocations():
+    """The aiohttp session and its event loop are reused by later invocations."""
+    settings = {"connection_limit": 1, "dns_cache_ttl": 1, "keepalive_timeout": 1,
+                "connect_timeout": 1, "request_timeout": 1}
+
+    async def current_session():
+        return get_http_session(settings)
+
+    first = run_async(current_session())
+    second = run_async(current_session())
+    assert first is second
+    assert not first.closed
+    run_async(first.close())
@@ -0,0 +1,86 @@
+"""Tests for the staged bulk loader."""
+from unittest.mock import MagicMock
+from datetime import datetime
+
+import pytest
+
+from loader import (rows_per_statement, build_stage_statements, bulk_upload_data,
+                    skip_seen_readings, forget_readings)
+
+
+@pytest.fixture(autouse=True)
+def clear_last_seen():
+    """Each test starts with an empty last-seen map."""
+    forget_readings()
+
+
+@pytest.fixture
+def rows():
+    """Seven transformed plant_status rows."""
+    taken = datetime(2025, 2, 3, 16, 28, 40)
+    return [(1, plant_id, taken, 50.0, 12.0, taken) for plant_id in range(7)]
+
+
+def test_rows_per_statement_respects_parameter_limit():
+    """A chunk never exceeds 2100 parameters or 1000 VALUES rows."""
+    assert rows_per_statement() == 349
+    assert rows_per_statement(1) == 1000
+
+
+def test_single_chunk_is_one_batch(rows):
+    """Creating, staging and merging fit in one round trip for small loads."""
+    statements = build_stage_statements(rows)
+    assert len(statements) == 1
+    sql, params = statements[0]
+    assert "CREATE TABLE #plant_status_stage" in sql
+    assert "DROP TABLE #plant_status_stage" in sql
+    assert sql.count("%s") == len(params) == 42
+
+
+def test_rows_are_chunked(rows):
+    """Only the last chunk moves the staged rows into plant_status."""
+    statements = build_stage_statements(rows, size=3)
+    assert [len(params) for _, params in statements] == [18, 18, 6]
+    assert ["MERGE plant_status" in sql for sql, _ in statements] == [False, False, True]
+
+
+def test_bulk_upload_data(rows):
+    """All chunks are executed and committed once, returning the inserted count."""
+    conn = MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    cursor.fetchone.return_value = (7,)
+    assert bulk_upload_data(conn, rows, size=3, mode="insert") == 7
+    assert cursor.execute.call_count == 3
+    conn.commit.assert_called_once()
+    assert bulk_upload_data(conn, []) == 0
+
+
+def test_merge_mode_skips_existing_keys(rows):
+    """Merge mode only inserts (plant_id, recording_taken) pairs not already loaded."""
+    sql, _ = build_stage_statements(rows, mode="merge")[-1]
+    assert "MERGE plant_status" in sql
+    assert "WHEN NOT MATCHED BY TARGET THEN" in sql
+
+
+@pytest.mark.parametrize("mode", ["insert", "merge"])
+def test_inserted_count_is_read_before_the_stage_is_dropped(rows, mode):
+    """@@ROWCOUNT is selected in the same batch, before DROP TABLE resets it."""
+    sql, _ = build_stage_statements(rows, mode=mode)[-1]
+    assert sql.index("SELECT @@ROWCOUNT") < sql.rindex("DROP TABLE #plant_status_stage")
+
+
+def test_skip_seen_readings(rows):
+    """Repeated and older readings are dropped before reaching the database."""
+    conn = MagicMock()
+    bulk_upload_data(conn, rows[:3], mode="merge")
+    later = (1, 3, datetime(2025, 2, 3, 16, 29, 40), 51.0, 12.0, rows[0][5])
+    assert skip_seen_readings(rows + rows[:1] + [later]) == rows[3:] + [later]
+
+
+def test_merge_mode_retry_makes_no_round_trips(rows):
+    """Retrying an invocation that already loaded its readings sends nothing."""
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value.fetchone.return_value = (7,)
+    assert bulk_upload_data(conn, rows, mode="merge") == 7
+    assert bulk_upload_data(conn, rows, mode="merge") == 0
+    conn.commit.assert_called_once()
@@ -0,0 +1,83 @@
+"""Tests for registering unknown master data during the load."""
+from unittest.mock import MagicMock
+
+import pytest
+from pymssql import Error
+
+from master_data import find_unregistered, build_registration_batch, register_master_data
+
+
+@pytest.fixture
+def plants():
+    """API records for one known and one new plant."""
+    return [
+        {"plant_id": 1, "name": "Venus flytrap", "scientific_name": None,
+         "origin_location": ["33.95015", "-118.03917", "South Whittier", "US",
+                             "America/Los_Angeles"],
+         "botanist": {"name": "Gertrude Jekyll", "email": "gertrude@botany.com",
+                      "phone": "123"}},
+        {"plant_id": 60, "name": "Sundew", "scientific_name": "Drosera capensis",
+         "origin_location": ["-33.918861", "18.423300", "Cape Town", "ZA",
+                             "Africa/Johannesburg"],
+         "botanist": {"name": "Carl Linnaeus", "email": "carl@botany.com",
+                      "phone": "987"},
+         "images": {"original_url": "http://example.com/image2.jpg"}}
+    ]
+
+
+@pytest.fixture
+def reference():
+    """Reference data that knows plant 1 and its botanist."""
+    return {"botanists": {"gertrude@botany.com": 1}, "plant_ids": {1}}
+
+
+def test_find_unregistered(plants, reference):
+    """Only records with an unknown plant or botanist are selected."""
+    assert list(find_unregistered(plants, reference)) == [60]
+    plants[0]["botanist"]["email"] = "new@botany.com"
+    assert list(find_unregistered(plants, reference)) == [1, 60]
+
+
+def test_find_unregistered_skips_malformed_records(plants, reference):
+    """A null botanist is treated as no botanist, and a bad plant_id is left to the quarantine."""
+    plants[1]["botanist"] = None
+    plants.append({**plants[0], "plant_id": "abc"})
+    plants.append({key: value for key, value in plants[0].items() if key != "plant_id"})
+    assert list(find_unregistered(plants, reference)) == [60]
+    sql, _ = build_registration_batch(find_unregistered(plants, reference))
+    assert "INSERT INTO botanist" not in sql
+
+
+def test_build_registration_batch(plants):
+    """Every table is covered by one parameterised batch."""
+    sql, params = build_registration_batch({60: plants[1]})
+    for table in ("country", "city", "origin_location", "plant", "botanist"):
+        assert f"INSERT INTO {table}" in sql
+    assert sql.count("%s") == len(params)
+    assert params == ["ZA",
+                      "Cape Town", "ZA", "Africa/Johannesburg",
+                      -33.918861, 18.4233, "Cape Town",
+                      60, "Sundew", "Drosera capensis", -33.918861, 18.4233,
+                      "http://example.com/image2.jpg",
+                      "Carl Linnaeus", "carl@botany.com", "987"]
+
+
+def test_register_master_data(plants, reference):
+    """Unknown records are inserted in a single execute and committed."""
+    conn = MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    assert register_master_data(conn, plants, reference)
+    cursor.execute.assert_called_once()
+    conn.commit.assert_called_once()
+
+    conn.reset_mock()
+    assert not register_master_data(conn, plants[:1], reference)
+    conn.cursor.assert_not_called()
+
+
+def test_register_master_data_rolls_back(plants, reference):
+    """A failed batch is rolled back and reported as nothing registered."""
+    conn = MagicMock()
+    conn.cursor.return_value.__enter__.return_value.execute.side_effect = Error("too long")
+    assert not register_master_data(conn, plants, reference)
+    conn.rollback.assert_called_once()
@@ -0,0 +1,100 @@
+"""Tests for the per-run metrics record."""
+from unittest.mock import patch, MagicMock
+from collections import Counter
+from itertools import count
+import json
+
+import pytest
+
+from metrics import RunMetrics, CountingConnection
+from pipeline import process_plants, log_payload_sample, handler
+
+
+def test_timers_accumulate():
+    """A stage timed twice reports its total time in milliseconds."""
+    metrics = RunMetrics(clock=count().__next__)
+    with metrics.timer("load"):
+        pass
+    with metrics.timer("load"):
+        pass
+    assert metrics.timers["load"] == 2000
+
+
+def test_to_emf_declares_every_metric():
+    """Timers and counters are emitted as metrics of one EMF record."""
+    metrics = RunMetrics(clock=count().__next__)
+    with metrics.timer("extract"):
+        pass
+    metrics.count({"retries": 2}, prefix="api_")
+    record = metrics.to_emf("LMNH/Pipeline", {"Service": "pipeline"}, timestamp=1.5)
+    assert record["_aws"] == {
+        "Timestamp": 1500,
+        "CloudWatchMetrics": [{"Namespace": "LMNH/Pipeline",
+                               "Dimensions": [["Service"]],
+                               "Metrics": [{"Name": "extract_ms", "Unit": "Milliseconds"},
+                                           {"Name": "api_retries", "Unit": "Count"}]}]}
+    assert record["Service"] == "pipeline"
+    assert record["extract_ms"] == 1000
+    assert record["api_retries"] == 2
+
+
+def test_emit_prints_one_json_line(capsys):
+    """The record is a single JSON line on stdout."""
+    RunMetrics().emit({"Service": "pipeline"})
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["Service"] == "pipeline"
+
+
+def test_counting_connection_counts_round_trips():
+    """Statements, executemany rows and commits each count as a round trip."""
+    metrics = RunMetrics()
+    conn = CountingConnection(MagicMock(), metrics)
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.executemany("INSERT", [(1,), (2,)])
+        cursor.fetchall()
+    conn.commit()
+    conn.rollback()
+    assert metrics.counters["db_round_trips"] == 4
+
+
+@patch("pipeline.quarantine_rejected", return_value=Counter(unknown_plant=1))
+@patch("pipeline.bulk_upload_data", return_value=1)
+@patch("pipeline.transform_batch", return_value=([("row",)], [{"reason": "unknown_plant"}]))
+@patch("pipeline.register_master_data", return_value=False)
+@patch("pipeline.get_reference_data", return_value={"botanists": {}, "plant_ids": set()})
+def test_process_plants_records_stages(*_):
+    """Every stage is timed and the batch counts are recorded."""
+    metrics = RunMetrics()
+    totals = process_plants(MagicMock(), [{"plant_id": 1}, {"plant_id": 2}], metrics)
+    assert totals == Counter(fetched=2, transformed=1, inserted=1, rejected=1)
+    assert set(metrics.timers) == {"reference", "register", "transform", "load", "quarantine"}
+    assert metrics.counters == Counter(fetched=2, transformed=1, inserted=1, rejected=1,
+                                       rejected_unknown_plant=1)
+
+
+def test_payloads_are_only_logged_in_debug(caplog):
+    """Raw payloads are sampled at debug level and skipped otherwise."""
+    plants = [{"plant_id": i} for i in range(20)]
+    with caplog.at_level("INFO"):
+        log_payload_sample(plants)
+    assert not caplog.records
+    with caplog.at_level("DEBUG"):
+        log_payload_sample(plants)
+    assert len(caplog.records) == 5
+
+
+@patch("pipeline.reset_db_connection")
+@patch("pipeline.process_plants", side_effect=KeyError("plant_id"))
+@patch("pipeline.run_async", return_value=[])
+@patch("pipeline.get_db_connection")
+@patch("pipeline.initialise")
+def test_handler_resets_the_connection_on_any_failure(mock_initialise, mock_get_db_connection,
+                                                     mock_run_async, mock_process_plants,
+                                                     mock_reset, capsys):
+    """A non-database error can still leave a transaction open, so the connection is dropped."""
+    with pytest.raises(KeyError):
+        handler(None, None)
+    mock_reset.assert_called_once()
+    assert json.loads(capsys.readouterr().out)["failed"] == 1
@@ -0,0 +1,65 @@
+"""Tests for plant ID discovery."""
+from unittest.mock import patch
+import asyncio
+
+import pytest
+
+from plant_ids import (plan_plant_ids, update_state, load_state, save_state,
+                       new_state, extract_discovered_plant_data)
+
+
+@pytest.fixture
+def state():
+    """Discovery state with a dead gap at ID 2."""
+    return {"live_ids": [0, 1, 3], "dead_ids": {2: 500.0}}
+
+
+def test_plan_skips_fresh_dead_ids_and_probes(state):
+    """Dead IDs are skipped until they expire and the probe window follows the top ID."""
+    assert plan_plant_ids(state, 3, now=100) == ([0, 1, 3], [4, 5, 6])
+    assert plan_plant_ids(state, 3, now=600) == ([0, 1, 2, 3], [4, 5, 6])
+
+
+def test_plan_bootstraps_empty_state():
+    """Without any state the bootstrap range is requested."""
+    known, window = plan_plant_ids(new_state(), 5, now=0)
+    assert known == list(range(50))
+    assert window == [50, 51, 52, 53, 54]
+
+
+def test_update_state(state):
+    """Found IDs become live, missing IDs are cached as dead with a TTL."""
+    update_state(state, found={2, 4}, missing={1, 5}, dead_ttl=60, now=1000)
+    assert state["live_ids"] == [0, 2, 3, 4]
+    assert state["dead_ids"] == {1: 1060, 5: 1060}
+
+
+def test_state_round_trip(tmp_path, state):
+    """State written by one invocation is read back by the next."""
+    state_path = str(tmp_path / "plant_ids.json")
+    save_state(state, state_path)
+    assert load_state(state_path) == state
+    assert load_state(str(tmp_path / "missing.json")) == new_state()
+
+
+def test_discovery_probes_until_a_window_is_empty(tmp_path):
+    """New plants past the last known ID are found within one run."""
+    live_ids = {0, 1, 3, 4, 5, 6, 7}
+
+    async def fake_extract(plant_ids, settings, stats, missing=None, session=None,
+                           found=None):
+        missing.update(set(plant_ids) - live_ids)
+        found.update(set(plant_ids) & live_ids)
+        return [{"plant_id": plant_id} for plant_id in plant_ids if plant_id in live_ids]
+
+    state_path = str(tmp_path / "plant_ids.json")
+    save_state({"live_ids": [0, 1, 3], "dead_ids": {}}, state_path)
+    discovery = {"state_path": state_path, "max_misses": 2, "dead_ttl": 60}
+    with patch("plant_ids.extract_all_plant_data", fake_extract):
+        plants = asyncio.run(extract_discovered_plant_data(
+            {"deadline": 5}, discovery=discovery))
+
+    assert [plant["plant_id"] for plant in plants] == [0, 1, 3, 4, 5, 6, 7]
+    saved = load_state(state_path)
+    assert saved["live_ids"] == [0, 1, 3, 4, 5, 6, 7]
+    assert set(saved["dead_ids"]) == {2, 8, 9}
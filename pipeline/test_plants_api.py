@@ -0,0 +1,182 @@
+"""Tests for the asynchronous plants API extractor."""
+from unittest.mock import patch, MagicMock
+from collections import Counter
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from plants_api import (extract_all_plant_data, get_extract_deadline, fetch_json,
+                        make_session, CircuitBreaker, CircuitOpenError, RetryPolicy,
+                        stream_plant_data, get_extract_settings, get_plant_data,
+                        ErrorPayloadError, API_URL)
+
+
+@pytest.fixture
+def settings():
+    """Extraction settings with a short deadline."""
+    return {
+        "max_concurrency": 2,
+        "connection_limit": 2,
+        "dns_cache_ttl": 10,
+        "keepalive_timeout": 1,
+        "connect_timeout": 1,
+        "request_timeout": 1,
+        "deadline": 0.2,
+        "max_retries": 3,
+        "retry_budget": 10,
+        "backoff_base": 0.01,
+        "backoff_cap": 0.02
+    }
+
+
+async def fake_get_plant_data(session, url, plant_id, semaphore, policy):
+    """Returns a plant payload, except plant 2 which never responds in time."""
+    async with semaphore:
+        if plant_id == 2:
+            await asyncio.sleep(5)
+        if plant_id == 3:
+            raise ValueError("bad payload")
+        return {"plant_id": plant_id}
+
+
+@patch("plants_api.get_plant_data", fake_get_plant_data)
+def test_extract_returns_partial_results_at_deadline(settings):
+    """Slow and failing plants are dropped, the rest are returned in order."""
+    plants = asyncio.run(extract_all_plant_data([0, 1, 2, 3, 4], settings))
+    assert plants == [{"plant_id": 0}, {"plant_id": 1}, {"plant_id": 4}]
+
+
+@patch("plants_api.get_plant_data", fake_get_plant_data)
+def test_extract_no_plant_ids(settings):
+    """An empty ID list makes no requests."""
+    assert asyncio.run(extract_all_plant_data([], settings)) == []
+
+
+def test_get_extract_deadline_respects_lambda_time(settings):
+    """The deadline shrinks to leave time for transform and load."""
+    settings["deadline"] = 40
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = 30_000
+    assert get_extract_deadline(context, settings) == 15
+    assert get_extract_deadline(None, settings) == 40
+
+
+def test_circuit_breaker_opens_and_half_opens():
+    """The breaker opens at the threshold and lets one probe through after the cool-down."""
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10,
+                             clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+    now[0] = 10
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+async def fetch_from_flaky_server(settings, breaker, statuses):
+    """Serves the given statuses in turn, then fetches once through fetch_json."""
+    responses = iter(statuses)
+
+    async def plant(request):
+        status = next(responses)
+        return web.json_response({"plant_id": 1}, status=status)
+
+    app = web.Application()
+    app.router.add_get("/plants/1", plant)
+    stats = Counter()
+    policy = RetryPolicy(settings, breaker, stats, time.monotonic() + 5)
+    async with TestServer(app) as server:
+        async with make_session(settings) as session:
+            try:
+                result = await fetch_json(session, str(server.make_url("/plants/1")),
+                                          asyncio.Semaphore(1), policy)
+            except Exception as error:  # pylint: disable=broad-except
+                result = error
+    return result, stats
+
+
+def test_fetch_json_retries_server_errors(settings):
+    """Transient 5xx responses are retried until the API recovers."""
+    result, stats = asyncio.run(fetch_from_flaky_server(
+        settings, CircuitBreaker(), [500, 503, 200]))
+    assert result == {"plant_id": 1}
+    assert stats["retries"] == 2
+    assert stats["server_errors"] == 2
+
+
+def test_fetch_json_not_found_is_not_retried(settings):
+    """A 404 means the plant does not exist and returns None straight away."""
+    result, stats = asyncio.run(fetch_from_flaky_server(
+        settings, CircuitBreaker(), [404]))
+    assert result is None
+    assert stats["requests"] == 1
+
+
+def test_fetch_json_stops_when_circuit_opens(settings):
+    """Repeated failures open the breaker and stop further calls."""
+    result, stats = asyncio.run(fetch_from_flaky_server(
+        settings, CircuitBreaker(failure_threshold=2), [500, 500, 500]))
+    assert isinstance(result, CircuitOpenError)
+    assert stats["requests"] == 2
+    assert stats["circuit_rejected"] == 1
+
+
+@patch("plants_api.get_plant_data", fake_get_plant_data)
+def test_stream_plant_data_puts_plants_on_sink(settings):
+    """Fetched plants are streamed onto the queue; failures and slow plants are skipped."""
+    async def run():
+        sink = asyncio.Queue()
+        found = await stream_plant_data([0, 1, 2, 3, 4], settings, sink)
+        return found, [sink.get_nowait() for _ in range(sink.qsize())]
+
+    found, streamed = asyncio.run(run())
+    assert found == {0, 1, 4}
+    assert sorted(plant["plant_id"] for plant in streamed) == [0, 1, 4]
+
+
+@pytest.mark.parametrize("payload, expected", [
+    ({"error": "Service unavailable"}, ErrorPayloadError),
+    ({"name": "Venus flytrap"}, {"name": "Venus flytrap"}),
+    (None, None)])
+def test_get_plant_data_separates_errors_from_missing_plants(payload, expected):
+    """Only a 404 means missing; error payloads raise and malformed readings pass through."""
+    policy = RetryPolicy({}, CircuitBreaker(), Counter())
+
+    async def run():
+        with patch("plants_api.fetch_json", return_value=payload):
+            return await get_plant_data(None, "url/", 7, asyncio.Semaphore(1), policy)
+
+    if expected is ErrorPayloadError:
+        with pytest.raises(ErrorPayloadError):
+            asyncio.run(run())
+    else:
+        assert asyncio.run(run()) == expected
+
+
+def test_extract_reports_found_and_missing(settings):
+    """Failed plants are neither found nor missing, so discovery keeps their status."""
+    async def fake_fetch(session, url, plant_id, semaphore, policy):
+        if plant_id == 5:
+            return None
+        return await fake_get_plant_data(session, url, plant_id, semaphore, policy)
+
+    found, missing = set(), set()
+    with patch("plants_api.get_plant_data", fake_fetch):
+        asyncio.run(extract_all_plant_data([0, 3, 5], settings, missing=missing, found=found))
+    assert (found, missing) == ({0}, {5})
+
+
+def test_api_url_is_configurable(monkeypatch):
+    """PLANTS_API_URL points extraction at another API, such as the local mock."""
+    monkeypatch.delenv("PLANTS_API_URL", raising=False)
+    assert get_extract_settings()["api_url"] == API_URL
+    monkeypatch.setenv("PLANTS_API_URL", "http://localhost:8080/plants/")
+    assert get_extract_settings()["api_url"] == "http://localhost:8080/plants/"
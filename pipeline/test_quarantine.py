@@ -0,0 +1,57 @@
+"""Tests for the rejected-readings quarantine."""
+from unittest.mock import MagicMock
+import json
+
+from quarantine import quarantine_rows, quarantine_rejected
+
+
+def rejected_entry(reason: str, plant_id=1) -> dict:
+    """A rejection report entry for a payload with the given plant_id."""
+    return {"reason": reason,
+            "payload": {"plant_id": plant_id, "recording_taken": "2025-02-03 16:28:40",
+                        "temperature": 80}}
+
+
+def test_quarantine_rows():
+    """Rows keep the reason, the raw recording time and the full payload."""
+    rows = quarantine_rows([rejected_entry("temperature_out_of_range"),
+                            rejected_entry("missing_plant_id", plant_id="abc")])
+    assert rows[0][:3] == (1, "temperature_out_of_range", "2025-02-03 16:28:40")
+    assert json.loads(rows[0][3])["temperature"] == 80
+    assert rows[1][0] is None
+
+
+def test_quarantine_rows_drops_repeats():
+    """A reading rejected twice for the same reason becomes one row."""
+    rows = quarantine_rows([rejected_entry("unknown_botanist"),
+                            rejected_entry("unknown_botanist"),
+                            rejected_entry("bad_last_watered")])
+    assert [row[1] for row in rows] == ["unknown_botanist", "bad_last_watered"]
+
+
+def test_quarantine_skips_readings_already_quarantined():
+    """The insert only adds readings not yet in plant_status_rejected."""
+    conn = MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    quarantine_rejected(conn, [rejected_entry("unknown_botanist")])
+    assert "WHERE NOT EXISTS" in cursor.execute.call_args[0][0]
+
+
+def test_quarantine_rejected_writes_once():
+    """All rejections go to the database in one execute with per-reason counts."""
+    conn = MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    counts = quarantine_rejected(conn, [rejected_entry("unknown_botanist"),
+                                        rejected_entry("unknown_botanist", 2),
+                                        rejected_entry("bad_last_watered", 3)])
+    assert counts == {"unknown_botanist": 2, "bad_last_watered": 1}
+    cursor.execute.assert_called_once()
+    assert len(cursor.execute.call_args[0][1]) == 12
+    conn.commit.assert_called_once()
+
+
+def test_quarantine_nothing_rejected():
+    """A clean run does not touch the database."""
+    conn = MagicMock()
+    assert not quarantine_rejected(conn, [])
+    conn.cursor.assert_not_called()
@@ -0,0 +1,44 @@
+"""Tests for the botanist and plant reference-data cache."""
+from unittest.mock import MagicMock
+from itertools import cycle
+
+import pytest
+
+from reference_data import get_reference_data, invalidate_reference_data
+
+
+@pytest.fixture
+def conn():
+    """A connection whose cursor returns the botanist and plant tables."""
+    cursor = MagicMock()
+    cursor.fetchall.side_effect = cycle([
+        [("carl@botany.com", 1), ("gertrude@botany.com", 2)],
+        [(1,), (2,)]])
+    connection = MagicMock()
+    connection.cursor.return_value.__enter__.return_value = cursor
+    invalidate_reference_data()
+    return connection
+
+
+def test_reference_data_loaded_once_while_fresh(conn):
+    """Repeated lookups inside the TTL reuse the cached tables."""
+    first = get_reference_data(conn, {"carl@botany.com"}, ttl=60, now=0)
+    second = get_reference_data(conn, {"gertrude@botany.com"}, ttl=60, now=30)
+    assert first["botanists"] == {"carl@botany.com": 1, "gertrude@botany.com": 2}
+    assert second["plant_ids"] == {1, 2}
+    assert conn.cursor.call_count == 1
+
+
+def test_reference_data_reloads_when_stale(conn):
+    """The cache reloads once the TTL has passed."""
+    get_reference_data(conn, ttl=60, now=0)
+    get_reference_data(conn, ttl=60, now=61)
+    assert conn.cursor.call_count == 2
+
+
+def test_reference_data_reloads_for_unknown_email(conn):
+    """An unknown email triggers exactly one reload."""
+    get_reference_data(conn, ttl=60, now=0)
+    result = get_reference_data(conn, {"new@botany.com"}, ttl=60, now=1)
+    assert conn.cursor.call_count == 2
+    assert "new@botany.com" not in result["botanists"]
@@ -0,0 +1,83 @@
+"""Tests for the streaming extract-transform-load mode."""
+from unittest.mock import patch
+from collections import Counter
+import asyncio
+
+from streaming import next_batch, stream_pipeline, END_OF_STREAM
+
+
+def test_next_batch_flushes_on_size():
+    """A full batch is returned without waiting for the flush interval."""
+    async def run():
+        queue = asyncio.Queue()
+        for plant_id in range(5):
+            queue.put_nowait({"plant_id": plant_id})
+        return await next_batch(queue, batch_size=3, flush_interval=10)
+
+    batch, finished = asyncio.run(run())
+    assert [plant["plant_id"] for plant in batch] == [0, 1, 2]
+    assert not finished
+
+
+def test_next_batch_flushes_on_time_and_end():
+    """A partial batch is flushed after the interval, and the end marker stops the stream."""
+    async def run():
+        queue = asyncio.Queue()
+        queue.put_nowait({"plant_id": 0})
+        partial = await next_batch(queue, batch_size=3, flush_interval=0.01)
+        queue.put_nowait({"plant_id": 1})
+        queue.put_nowait(END_OF_STREAM)
+        return partial, await next_batch(queue, batch_size=3, flush_interval=10)
+
+    partial, last = asyncio.run(run())
+    assert partial == ([{"plant_id": 0}], False)
+    assert last == ([{"plant_id": 1}], True)
+
+
+def test_stream_pipeline_loads_in_micro_batches():
+    """Every streamed plant reaches `process`, in batches no larger than the batch size."""
+    async def fake_extract(settings, stats, sink=None, session=None):
+        for plant_id in range(7):
+            await sink.put({"plant_id": plant_id})
+        return []
+
+    batches = []
+
+    def process(batch):
+        batches.append([plant["plant_id"] for plant in batch])
+        return Counter(transformed=len(batch))
+
+    with patch("streaming.extract_discovered_plant_data", fake_extract):
+        totals = asyncio.run(stream_pipeline(
+            {}, process, stream_settings={"batch_size": 3, "flush_interval": 1}))
+
+    assert sorted(sum(batches, [])) == list(range(7))
+    assert all(len(batch) <= 3 for batch in batches)
+    assert totals["transformed"] == 7
+    assert totals["batches"] == len(batches)
+
+
+def test_stream_pipeline_cancels_producer_when_process_fails():
+    """A failing batch cancels the producer instead of leaving it pending on the loop."""
+    async def endless_extract(settings, stats, sink=None, session=None):
+        plant_id = 0
+        while True:
+            await sink.put({"plant_id": plant_id})
+            plant_id += 1
+
+    def process(batch):
+        raise RuntimeError("database unavailable")
+
+    async def run():
+        try:
+            await stream_pipeline({}, process,
+                                  stream_settings={"batch_size": 2, "flush_interval": 1})
+        except RuntimeError:
+            pass
+        current = asyncio.current_task()
+        return [task for task in asyncio.all_tasks() if task is not current]
+
+    with patch("streaming.extract_discovered_plant_data", endless_extract):
+        pending = asyncio.run(run())
+
+    assert pending == []
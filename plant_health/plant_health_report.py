@@ -2,24 +2,28 @@
 
 import json
 import logging
-from os import environ as ENV
-import pandas as pd
+import sys
+from os import environ as ENV, path
+from datetime import timedelta
+from itertools import groupby
+from operator import itemgetter
+from typing import TYPE_CHECKING
 from pymssql import connect, Connection
-from boto3 import client
 
+# logger_config is copied next to this file in the Lambda image; locally it
+# lives in the repository's shared directory.
+try:
+    from logger_config import setup_logging, flush_logging
+except ModuleNotFoundError:
+    sys.path.append(path.join(path.dirname(path.abspath(__file__)), "..", "shared"))
+    from logger_config import setup_logging, flush_logging
 
-def setup_logging(level=20):
-    """Setup the basicConfig."""
+if TYPE_CHECKING:
+    import pandas as pd
 
-    log_format = "{asctime} - {levelname} - {message}"
-    log_datefmt = "%Y-%m-%d %H:%M"
-    logging.basicConfig(
-        level=level,
-        format=log_format,
-        style="{",
-        datefmt=log_datefmt
-    )
-    logging.info("Logging to console.")
+WATER_THRESHOLD = timedelta(hours=24)
+SOIL_MOISTURE_SAFE = (20.0, 98.0)
+TEMPERATURE_SAFE = (9.0, 30.0)
 
 
 def get_connection() -> Connection:
@@ -56,52 +60,74 @@ def get_plant_data(conn: Connection) -> list[dict]:
     return result
 
 
+def get_pandas_min_rows() -> int:
+    """Batch size from which alerts are grouped with pandas rather than plain Python."""
+    return int(ENV.get("ALERT_PANDAS_MIN_ROWS", 250000))
+
+
 def is_out_of_range(values, range_min, range_max) -> bool:
     """Calculate if the values provided are out of range."""
 
-    return all(v < range_min or v > range_max for v in values)
+    return all(v is not None and (v < range_min or v > range_max) for v in values)
 
 
-def get_alert_data(df: pd.DataFrame):
-    """Retrieves plant information marked as warning."""
+def get_plant_alerts(plant_name: str, readings: list[dict]) -> list[dict]:
+    """Checks one plant's most recent readings, newest first, against the safe ranges."""
 
-    water_threshold = pd.Timedelta(hours=24)
-    soil_moisture_safe = (20.0, 98.0)
-    temperature_safe = (9.0, 30.0)
     alert_data = []
-
-    for plant_name, group in df.groupby('plant_name'):
-        most_recent = group.head(1)
-        time_delta = most_recent['recording_taken'].values[0] - \
-            most_recent['last_watered'].values[0]
-        if time_delta > water_threshold:
+    most_recent = readings[0]
+    if most_recent['recording_taken'] and most_recent['last_watered']:
+        time_delta = timedelta(seconds=(most_recent['recording_taken'] -
+                                        most_recent['last_watered']).total_seconds())
+        if time_delta > WATER_THRESHOLD:
             alert_data.append({
                 'plant_name': plant_name,
                 'issue': 'needs_water',
                 'time_delta': time_delta
             })
 
-        if len(group) >= 3:
-            recent_group = group.head(3)
-            last_three_soil_moisture = recent_group['soil_moisture'].values
-            last_three_temperature = recent_group['temperature'].values
-
-            if is_out_of_range(last_three_soil_moisture, *soil_moisture_safe):
-                avg_soil_moisture = last_three_soil_moisture.mean()
-                alert_data.append({
-                    'plant_name': plant_name,
-                    'issue': 'soil_moisture',
-                    'average_value': round(float(avg_soil_moisture), 2),
-                    'values': [round(value, 2) for value in last_three_soil_moisture]
-                })
-            if is_out_of_range(last_three_temperature, *temperature_safe):
-                avg_temp = last_three_temperature.mean()
+    if len(readings) >= 3:
+        recent = readings[:3]
+        for issue, safe_range in (('soil_moisture', SOIL_MOISTURE_SAFE),
+                                  ('temperature', TEMPERATURE_SAFE)):
+            values = [float(reading[issue]) if reading[issue] is not None else None
+                      for reading in recent]
+            if is_out_of_range(values, *safe_range):
                 alert_data.append({
                     'plant_name': plant_name,
-                    'issue': 'temperature',
-                    'average_value': round(float(avg_temp), 2),
-                    'values': [round(value, 2) for value in last_three_temperature]
+                    'issue': issue,
+                    'average_value': round(sum(values) / len(values), 2),
+                    'values': [round(value, 2) for value in values]
                 })
+    return alert_data
+
+
+def get_alert_data_rows(plant_data: list[dict]) -> list[dict]:
+    """Retrieves plant information marked as warning, without pandas.
+
+    Used for the usual small batches, where importing pandas would cost more than
+    the grouping itself.
+    """
+
+    readings = {}
+    for row in sorted(plant_data, key=lambda row: row['recording_taken'], reverse=True):
+        readings.setdefault(row['plant_name'], []).append(row)
+    alert_data = [alert for plant_name in sorted(readings)
+                  for alert in get_plant_alerts(plant_name, readings[plant_name][:3])]
+
+    _ = [logging.warning(data) for data in alert_data]
+    return alert_data
+
+
+def get_alert_data(df: "pd.DataFrame"):
+    """Retrieves plant information marked as warning."""
+
+    recent = df.groupby('plant_name', sort=False).head(3).sort_values(
+        by='plant_name', kind='stable')
+    records = recent.astype(object).where(recent.notna(), None).to_dict('records')
+    alert_data = []
+    for plant_name, readings in groupby(records, key=itemgetter('plant_name')):
+        alert_data.extend(get_plant_alerts(plant_name, list(readings)))
 
     _ = [logging.warning(data) for data in alert_data]
     return alert_data
@@ -243,6 +269,7 @@ def format_alert_data_sms(alert_data):
 def send_email(body: str, to_address: list[str]):
     """Sends the plant data by email using AWS SES."""
 
+    from boto3 import client  # pylint: disable=import-outside-toplevel
     ses_client = client('ses', region_name='eu-west-2')
     response = ses_client.send_email(
         Source='trainee.zander.rackevic@sigmalabs.co.uk',
@@ -270,6 +297,7 @@ def send_email(body: str, to_address: list[str]):
 def send_sms(message):
     """Send an SNS message."""
 
+    from boto3 import client  # pylint: disable=import-outside-toplevel
     sns_client = client('sns')
     topic_arn = 'arn:aws:sns:eu-west-2:129033205317:c15-cacareco-plant-health-alerts'
 
@@ -284,30 +312,37 @@ def send_sms(message):
 def handler(event=None, context=None):
     """AWS Lambda handler function."""
 
-    setup_logging()
-
-    conn = get_connection()
-    plant_data = get_plant_data(conn)
-    conn.close()
-
-    df = pd.DataFrame(plant_data)
-    df_sorted = df.sort_values(
-        by=['plant_name', 'recording_taken'], ascending=[True, False])
-    warning_data = get_alert_data(df_sorted)
-
-    email_body = format_alert_data_html(warning_data)
-    sms_body = format_alert_data_sms(warning_data)
-
-    send_email(
-        email_body, ['trainee.zander.rackevic@sigmalabs.co.uk',
-                     'trainee.benjamin.smith@sigmalabs.co.uk',
-                     'trainee.tess.piastra@sigmalabs.co.uk',
-                     'trainee.abdulrahman.dahir@sigmalabs.co.uk',
-                     'ruy.zambrano@sigmalabs.co.uk',
-                     'dan.keefe@sigmalabs.co.uk'])
-    send_sms(sms_body)
+    setup_logging("console")
+
+    try:
+        conn = get_connection()
+        plant_data = get_plant_data(conn)
+        conn.close()
+
+        if len(plant_data) < get_pandas_min_rows():
+            warning_data = get_alert_data_rows(plant_data)
+        else:
+            import pandas as pd  # pylint: disable=import-outside-toplevel
+            df = pd.DataFrame(plant_data)
+            df_sorted = df.sort_values(
+                by=['plant_name', 'recording_taken'], ascending=[True, False])
+            warning_data = get_alert_data(df_sorted)
+
+        email_body = format_alert_data_html(warning_data)
+        sms_body = format_alert_data_sms(warning_data)
+
+        send_email(
+            email_body, ['trainee.zander.rackevic@sigmalabs.co.uk',
+                         'trainee.benjamin.smith@sigmalabs.co.uk',
+                         'trainee.tess.piastra@sigmalabs.co.uk',
+                         'trainee.abdulrahman.dahir@sigmalabs.co.uk',
+                         'ruy.zambrano@sigmalabs.co.uk',
+                         'dan.keefe@sigmalabs.co.uk'])
+        send_sms(sms_body)
+    finally:
+        flush_logging()
 
     return {
         'status_code': 200,
-        'data': json.dumps(warning_data)
+        'data': json.dumps(warning_data, default=str)
     }
@@ -0,0 +1,55 @@
+"""Tests for the plant health alert checks."""
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from plant_health_report import get_alert_data, get_alert_data_rows, is_out_of_range
+
+NOW = datetime(2025, 2, 7, 12, 0)
+
+
+def reading(plant_name: str, minutes_ago: int, soil_moisture: float = 50.0,
+            temperature: float = 15.0, watered_hours_ago: int = 1) -> dict:
+    """A plant_status row as returned by get_plant_data."""
+    return {"plant_name": plant_name,
+            "recording_taken": NOW - timedelta(minutes=minutes_ago),
+            "soil_moisture": soil_moisture,
+            "temperature": temperature,
+            "last_watered": NOW - timedelta(hours=watered_hours_ago)}
+
+
+PLANT_DATA = [
+    reading("Rose", 1, soil_moisture=10.0), reading("Rose", 2, soil_moisture=12.0),
+    reading("Rose", 3, soil_moisture=15.554), reading("Rose", 4),
+    reading("Cactus", 1, temperature=35.0, watered_hours_ago=48),
+    reading("Cactus", 2, temperature=36.0), reading("Cactus", 3, temperature=31.0),
+    reading("Fern", 1), reading("Fern", 2, soil_moisture=None)
+]
+
+
+def pandas_alerts(plant_data: list[dict]) -> list[dict]:
+    """Alerts computed the way the handler does for large batches."""
+    df = pd.DataFrame(plant_data).sort_values(
+        by=['plant_name', 'recording_taken'], ascending=[True, False])
+    return get_alert_data(df)
+
+
+def test_is_out_of_range_ignores_missing_values():
+    """A missing reading is never counted as out of range."""
+    assert is_out_of_range([1, 2, 3], 5, 10)
+    assert not is_out_of_range([1, None, 3], 5, 10)
+
+
+def test_fast_path_alerts():
+    """Plain Python grouping flags each issue against the newest readings."""
+    alerts = get_alert_data_rows(PLANT_DATA)
+    assert [(alert["plant_name"], alert["issue"]) for alert in alerts] == [
+        ("Cactus", "needs_water"), ("Cactus", "temperature"), ("Rose", "soil_moisture")]
+    assert alerts[0]["time_delta"] == timedelta(hours=47, minutes=59)
+    assert alerts[1]["average_value"] == 34.0
+    assert alerts[2]["values"] == [10.0, 12.0, 15.55]
+
+
+def test_fast_path_matches_pandas_path():
+    """Both paths raise the same alerts for the same readings."""
+    assert get_alert_data_rows(PLANT_DATA) == pandas_alerts(PLANT_DATA)
@@ -1,4 +1,4 @@
-# Run using bash connect.sh [seed|reset]
+# Run using bash connect.sh [seed|reset|migrate]
 
 source ../.env
 
@@ -10,6 +10,13 @@ if [ "_$1_" == "_reset_" ]; then
     sqlcmd -S "$DB_HOST,$DB_PORT" -U "$DB_USER" -P "$DB_PASSWORD" -d "$DB_NAME" -i "schema.sql"
     echo "Database schema has been reset."
 
+elif [ "_$1_" == "_migrate_" ]; then
+    # Bring a deployed database up to schema.sql without dropping its data
+    for migration in migrate_*.sql; do
+        sqlcmd -S "$DB_HOST,$DB_PORT" -U "$DB_USER" -P "$DB_PASSWORD" -d "$DB_NAME" -b -i "$migration" || exit 1
+    done
+    echo "Database has been migrated."
+
 elif [ "_$1_" == "_seed_" ]; then
     # Run the seed_master_data.py
     python3 seed_master_data.py
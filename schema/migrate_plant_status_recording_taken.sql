@@ -0,0 +1,17 @@
+-- Adds ix_plant_status_recording_taken to a deployed plant_status, which
+-- schema.sql only creates on a reset. Safe to run more than once.
+-- The archive's daily [start, end) range query seeks this index instead of
+-- scanning plant_status.
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.indexes
+    WHERE name = 'ix_plant_status_recording_taken'
+        AND object_id = OBJECT_ID('plant_status'))
+BEGIN
+    CREATE INDEX ix_plant_status_recording_taken
+        ON plant_status (recording_taken)
+        INCLUDE (plant_id, botanist_id, soil_moisture, temperature, last_watered);
+
+    PRINT 'Created ix_plant_status_recording_taken.';
+END;
@@ -0,0 +1,26 @@
+-- Adds plant_status_rejected to a deployed database, which schema.sql only
+-- creates on a reset. Safe to run more than once.
+
+IF OBJECT_ID('plant_status_rejected', 'U') IS NULL
+BEGIN
+    CREATE TABLE plant_status_rejected (
+        rejected_id BIGINT IDENTITY(1,1) PRIMARY KEY,
+        plant_id INT,
+        reason VARCHAR(40) NOT NULL,
+        recording_taken VARCHAR(30),
+        payload NVARCHAR(MAX) NOT NULL,
+        rejected_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+
+    PRINT 'Created plant_status_rejected.';
+END;
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.indexes
+    WHERE name = 'ix_plant_status_rejected_reading'
+        AND object_id = OBJECT_ID('plant_status_rejected'))
+BEGIN
+    CREATE INDEX ix_plant_status_rejected_reading
+        ON plant_status_rejected (plant_id, recording_taken, reason);
+END;
@@ -0,0 +1,31 @@
+-- Adds uq_plant_status_reading to a deployed plant_status, which schema.sql
+-- only creates on a reset. Safe to run more than once.
+-- Duplicate readings are removed first, keeping the earliest plant_status_id
+-- of each (plant_id, recording_taken). The table is locked until the
+-- constraint exists, so the minutely load cannot insert a new duplicate in
+-- between; it waits and then carries on.
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.key_constraints
+    WHERE name = 'uq_plant_status_reading'
+        AND parent_object_id = OBJECT_ID('plant_status'))
+BEGIN
+    BEGIN TRANSACTION;
+
+    WITH ranked AS (
+        SELECT ROW_NUMBER() OVER (
+                PARTITION BY plant_id, recording_taken
+                ORDER BY plant_status_id) AS row_num
+        FROM plant_status WITH (TABLOCKX, HOLDLOCK)
+    )
+    DELETE FROM ranked
+    WHERE row_num > 1;
+
+    PRINT CONCAT(@@ROWCOUNT, ' duplicate readings removed from plant_status.');
+
+    ALTER TABLE plant_status
+        ADD CONSTRAINT uq_plant_status_reading UNIQUE (plant_id, recording_taken);
+
+    COMMIT TRANSACTION;
+END;
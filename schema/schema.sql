@@ -1,3 +1,4 @@
+IF OBJECT_ID('plant_status_rejected', 'U') IS NOT NULL DROP TABLE plant_status_rejected;
 IF OBJECT_ID('plant_status', 'U') IS NOT NULL DROP TABLE plant_status;
 IF OBJECT_ID('botanist', 'U') IS NOT NULL DROP TABLE botanist;
 IF OBJECT_ID('plant', 'U') IS NOT NULL DROP TABLE plant;
@@ -51,5 +52,24 @@ CREATE TABLE plant_status (
     temperature FLOAT,
     last_watered DATETIME,
     FOREIGN KEY (botanist_id) REFERENCES botanist(botanist_id),
-    FOREIGN KEY (plant_id) REFERENCES plant(plant_id)
+    FOREIGN KEY (plant_id) REFERENCES plant(plant_id),
+    CONSTRAINT uq_plant_status_reading UNIQUE (plant_id, recording_taken)
 );
+
+-- Covers the archive's daily [start, end) range query without touching the base table.
+CREATE INDEX ix_plant_status_recording_taken
+    ON plant_status (recording_taken)
+    INCLUDE (plant_id, botanist_id, soil_moisture, temperature, last_watered);
+
+CREATE TABLE plant_status_rejected (
+    rejected_id BIGINT IDENTITY(1,1) PRIMARY KEY,
+    plant_id INT,
+    reason VARCHAR(40) NOT NULL,
+    recording_taken VARCHAR(30),
+    payload NVARCHAR(MAX) NOT NULL,
+    rejected_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Lets the quarantine skip readings it has already kept.
+CREATE INDEX ix_plant_status_rejected_reading
+    ON plant_status_rejected (plant_id, recording_taken, reason);
@@ -3,12 +3,20 @@
 # Imports
 
 # Built-in
-from os import environ as ENV
+from os import environ as ENV, path
+import sys
 # Installed
-import requests as req
 from pymssql import connect
 from dotenv import load_dotenv
 
+# api_retry is copied next to this file in the Lambda image; locally it lives
+# in the repository's pipeline directory.
+try:
+    from api_retry import RetryPolicy, CircuitOpenError, get_json, make_retry_policy
+except ModuleNotFoundError:
+    sys.path.append(path.join(path.dirname(path.abspath(__file__)), "..", "pipeline"))
+    from api_retry import RetryPolicy, CircuitOpenError, get_json, make_retry_policy
+
 
 def get_connection():
     """Makes a connection with the SQL Server database."""
@@ -21,23 +29,44 @@ def get_connection():
     )
 
 
-def get_plant_data(url, plant_id: int) -> dict:
-    """Fetches plant data by plant_id."""
-    response = req.get(f'{url}{plant_id}', timeout=20)
-    if response.status_code == 200:
-        return response.json()
-    return {}
+API_URL = "https://data-eng-plants-api.herokuapp.com/plants/"
+
+
+def get_plant_data(url, plant_id: int, policy: RetryPolicy = None) -> dict:
+    """Fetches plant data by plant_id, empty if it is missing or could not be fetched.
+
+    Transient failures are retried under the shared api_retry policy.
+    """
+    # Imported here so the pipeline Lambda, which only reuses the extractors, never loads it.
+    import requests as req  # pylint: disable=import-outside-toplevel
+    try:
+        plant = get_json(f'{url}{plant_id}', policy or make_retry_policy())
+    except (req.RequestException, CircuitOpenError, ValueError):
+        return {}
+    if not isinstance(plant, dict) or "error" in plant:
+        return {}
+    return plant
+
 
+def extract_all_api_data(max_misses: int = 5) -> dict:
+    """Fetches all plant data and stores it in a dictionary.
 
-def extract_all_api_data() -> dict:
-    """Fetches all plant data and stores it in a dictionary."""
+    IDs are walked upwards from 0 until `max_misses` in a row return no plant.
+    Every request shares one retry budget and circuit breaker.
+    """
     plant_data = {}
-    url = 'https://data-eng-plants-api.herokuapp.com/plants/'
+    url = ENV.get("PLANTS_API_URL", API_URL)
+    policy = make_retry_policy()
 
-    for plant_id in range(50):
-        plant_info = get_plant_data(url, plant_id)
+    plant_id, misses = 0, 0
+    while misses < max_misses:
+        plant_info = get_plant_data(url, plant_id, policy)
         if plant_info:
             plant_data[plant_id] = plant_info
+            misses = 0
+        else:
+            misses += 1
+        plant_id += 1
 
     return plant_data
 
@@ -129,7 +158,7 @@ def extract_botany_data(api_data_dict: dict) -> list:
     seen_emails = set()
 
     for plant in api_data_dict.values():
-        botanist = plant.get('botanist', {})
+        botanist = plant.get('botanist') or {}
         name = botanist.get('name')
         email = botanist.get('email')
         phone = botanist.get('phone')
@@ -1,6 +1,8 @@
 """Test 'seed_master_data.py' using pytest"""
 from unittest.mock import patch, MagicMock
+from collections import Counter
 import pytest
+from api_retry import RetryPolicy, CircuitBreaker
 from seed_master_data import (
     get_plant_data, extract_country_data, extract_city_data,
     extract_origin_location_data, extract_plant_data, extract_botany_data,
@@ -146,3 +148,31 @@ def test_load_into_db(mock_connect):
     load_into_db(mock_conn, data, query)
     mock_cursor.executemany.assert_called_once_with(query, data)
     mock_conn.commit.assert_called_once()
+
+
+@patch("api_retry.time.sleep")
+@patch("requests.get")
+def test_get_plant_data_retries_server_errors(mock_get, mock_sleep, sample_api_data):
+    """tests 'get_plant_data' retries a 5xx response before succeeding"""
+    url = "https://data-eng-plants-api.herokuapp.com/plants/"
+    failed = MagicMock(status_code=500)
+    ok = MagicMock(status_code=200)
+    ok.json.return_value = sample_api_data[1]
+    mock_get.side_effect = [failed, ok]
+
+    assert get_plant_data(url, 1) == sample_api_data[1]
+    assert mock_get.call_count == 2
+    mock_sleep.assert_called_once()
+
+
+@patch("api_retry.time.sleep")
+@patch("requests.get")
+def test_get_plant_data_gives_up(mock_get, mock_sleep):
+    """tests 'get_plant_data' returns an empty dict once retries run out"""
+    mock_get.return_value = MagicMock(status_code=503)
+    settings = {"max_retries": 2, "retry_budget": 50, "backoff_base": 0.1, "backoff_cap": 1}
+    policy = RetryPolicy(settings, CircuitBreaker(), Counter())
+
+    assert get_plant_data("url/", 1, policy) == {}
+    assert mock_get.call_count == 3
+    assert mock_sleep.call_count == 2
@@ -0,0 +1,171 @@
+"""Manages the configuration of logging operations across project.
+
+Every Lambda image copies this file in from the repository root.
+
+Records are handed to a background thread through a queue, so logging never
+blocks the caller on I/O. Records below WARNING can be sampled and rate limited
+per logger. Call flush_logging() before a Lambda handler returns so queued
+records are written before the container is frozen.
+"""
+
+from os import environ as ENV
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import atexit
+import json
+import logging
+import queue
+import random
+import time
+
+_LISTENER = {"listener": None}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as a single JSON line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps({
+            "timestamp": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }, default=str)
+
+
+def match_logger(name: str, settings: dict):
+    """The setting for the logger, or its nearest configured parent."""
+    while name:
+        if name in settings:
+            return settings[name]
+        name = name.rpartition(".")[0]
+    return settings.get("root")
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps only a fraction of the records below WARNING from each configured logger."""
+
+    def __init__(self, rates: dict, rng=random.random):
+        super().__init__()
+        self.rates = rates
+        self.rng = rng
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = match_logger(record.name, self.rates)
+        return record.levelno >= logging.WARNING or rate is None or self.rng() < rate
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets at most `per_second` records below WARNING through per logger, with bursts of that size."""
+
+    def __init__(self, per_second: float, clock=time.monotonic):
+        super().__init__()
+        self.per_second = per_second
+        self.clock = clock
+        self.buckets = {}
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        now = self.clock()
+        tokens, last = self.buckets.get(record.name, (self.per_second, now))
+        tokens = min(self.per_second, tokens + (now - last) * self.per_second)
+        if tokens < 1:
+            self.buckets[record.name] = (tokens, now)
+            self.dropped += 1
+            return False
+        self.buckets[record.name] = (tokens - 1, now)
+        return True
+
+
+def parse_sample_rates(value: str) -> dict:
+    """Parses 'logger=rate,other.logger=rate' into a dict."""
+    rates = {}
+    for item in filter(None, value.split(",")):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+def flush_logging():
+    """Writes out every queued record, then resumes background logging."""
+    listener = _LISTENER["listener"]
+    if listener is not None:
+        listener.stop()
+        listener.start()
+
+
+def stop_logging():
+    """Writes out queued records and stops the background thread."""
+    listener, _LISTENER["listener"] = _LISTENER["listener"], None
+    if listener is not None:
+        listener.stop()
+
+
+def setup_logging(output: str, filename="lmnh_plants.log", level=20,
+                  json_format: bool = None, sample_rates: dict = None,
+                  rate_limit: float = None, max_bytes: int = 10_000_000,
+                  backup_count: int = 5):
+    """Routes the root logger through a queue to a console or rotating file handler.
+
+    Any handlers already on the root logger, such as the Lambda runtime's, are
+    replaced. Tracebacks are part of the message, formatted before queueing.
+    Unset options are read from the environment: LOG_FORMAT=json, LOG_SAMPLE_RATES
+    ('logger=rate,...') and LOG_RATE_LIMIT (records per second per logger).
+    """
+    if json_format is None:
+        json_format = ENV.get("LOG_FORMAT", "text") == "json"
+    if sample_rates is None:
+        sample_rates = parse_sample_rates(ENV.get("LOG_SAMPLE_RATES", ""))
+    if rate_limit is None and ENV.get("LOG_RATE_LIMIT"):
+        rate_limit = float(ENV["LOG_RATE_LIMIT"])
+
+    if output == "file":
+        target = RotatingFileHandler(filename, maxBytes=max_bytes,
+                                     backupCount=backup_count, encoding="utf-8")
+    else:
+        target = logging.StreamHandler()
+    target.setFormatter(JsonFormatter() if json_format else logging.Formatter(
+        "{asctime} - {levelname} - {message}", datefmt="%Y-%m-%d %H:%M", style="{"))
+
+    stop_logging()
+    handler = QueueHandler(queue.SimpleQueue())
+    if sample_rates:
+        handler.addFilter(SamplingFilter(sample_rates))
+    if rate_limit:
+        handler.addFilter(RateLimitFilter(rate_limit))
+    listener = QueueListener(handler.queue, target, respect_handler_level=True)
+    listener.start()
+    _LISTENER["listener"] = listener
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+        existing.close()
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    if output == "file":
+        logging.info("Logging to file: %s", filename)
+    else:
+        logging.info("Logging to console.")
+
+
+atexit.register(stop_logging)
+
+
+if __name__ == '__main__':
+
+    setup_logging("console")
+    # Suggested use: Import setup_logging
+    # call setup_logging("console" or "file")
+    # then call logging.{levelname: (debug,info,warning,error)}("Message here")
+    # and call flush_logging() at the end of a Lambda handler
+
+    # DO NOT USE f-strings WHEN LOGGING!!!
+    #   Use lazy-formatting i.e.:
+    #       logging.info("Here is a variable: %s", my_variable)
+    #   This ensures pylint doesn't shout at us
+
+    # Use level=10 in setup_logging() when configuring (at the start of the file) to set to debug mode
+    #   Debugging requires level=10 ; logging.debug("Message goes here.")
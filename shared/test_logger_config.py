@@ -0,0 +1,86 @@
+"""Tests for the shared queue-based logging setup."""
+import json
+import logging
+
+import pytest
+
+import logger_config
+from logger_config import (JsonFormatter, SamplingFilter, RateLimitFilter, parse_sample_rates,
+                           setup_logging, flush_logging, stop_logging)
+
+
+def make_record(name: str = "root", level: int = logging.INFO, msg: str = "hello %s",
+                args: tuple = ("world",)) -> logging.LogRecord:
+    """A log record as a logger would create it."""
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+@pytest.fixture
+def root_logger():
+    """Restores the root logger after a test reconfigures it."""
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield root
+    stop_logging()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def test_json_formatter():
+    """Each record becomes one JSON object with the message already formatted."""
+    entry = json.loads(JsonFormatter().format(make_record(level=logging.WARNING)))
+    assert entry["level"] == "WARNING"
+    assert entry["logger"] == "root"
+    assert entry["message"] == "hello world"
+
+
+def test_sampling_filter_applies_to_logger_and_children():
+    """Configured loggers are sampled below WARNING; others pass untouched."""
+    sampler = SamplingFilter({"noisy": 0.0}, rng=lambda: 0.5)
+    assert not sampler.filter(make_record("noisy"))
+    assert not sampler.filter(make_record("noisy.child"))
+    assert sampler.filter(make_record("noisy", logging.WARNING))
+    assert sampler.filter(make_record("quiet"))
+
+
+def test_rate_limit_filter_refills_over_time():
+    """Bursts beyond the rate are dropped until tokens refill."""
+    now = [0.0]
+    limiter = RateLimitFilter(2, clock=lambda: now[0])
+    assert [limiter.filter(make_record()) for _ in range(3)] == [True, True, False]
+    assert limiter.filter(make_record(level=logging.ERROR))
+    now[0] = 1.0
+    assert limiter.filter(make_record())
+    assert limiter.dropped == 1
+
+
+def test_parse_sample_rates():
+    """Rates are read from a comma-separated environment value."""
+    assert parse_sample_rates("root=0.1, botocore=0") == {"root": 0.1, "botocore": 0.0}
+    assert parse_sample_rates("") == {}
+
+
+def test_file_logging_is_queued_json_and_rotates(root_logger, tmp_path):
+    """Records reach the rotating file as JSON once the queue is flushed."""
+    filename = tmp_path / "plants.log"
+    setup_logging("file", filename=str(filename), json_format=True, max_bytes=500,
+                  backup_count=2, sample_rates={}, rate_limit=None)
+    for i in range(20):
+        logging.info("Reading %s", i)
+    flush_logging()
+    lines = filename.read_text(encoding="utf-8").splitlines()
+    assert json.loads(lines[-1])["message"] == "Reading 19"
+    assert (tmp_path / "plants.log.1").exists()
+    assert not (tmp_path / "plants.log.3").exists()
+
+
+def test_setup_replaces_previous_handlers(root_logger):
+    """Calling setup twice leaves a single queue handler on the root logger."""
+    setup_logging("console", sample_rates={}, rate_limit=None)
+    setup_logging("console", sample_rates={}, rate_limit=None)
+    assert len(root_logger.handlers) == 1
+    assert logger_config._LISTENER["listener"] is not None  # pylint: disable=protected-access
+